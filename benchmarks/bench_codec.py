@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import codec
+from modules import models
+
+# ================================================================================
+#                       BENCHMARK: CODEC x CTYPES (SERIALIZAÇÃO DE REGISTROS)
+# ================================================================================
+# Para cada modelo, monta um bloco com N registros e compara o caminho ctypes (objeto
+# criado pelo __init__/from_buffer_copy) com o codec pré-compilado:
+#   escrita    bytes(Modelo(*valores)) no bloco  x  pack_into no bloco pré-alocado
+#   leitura    from_buffer_copy + todos os campos  x  unpack_from (ou iter_unpack) + valores
+#   um campo   from_buffer_copy + 1 campo  x  Visao reposicionada lendo só esse campo
+# Antes de medir, confere que os dois caminhos produzem os mesmos bytes (layout dos .dat).
+#
+# Uso: python -m benchmarks.bench_codec --registros 200000 [--json]
+
+MODELOS = {
+    "funcionarios": (models.Funcionario, lambda i: (i, f"Nome {i}", "123.000.000-00", "01/01/1990", 2500.0 + i)),
+    "pacientes": (models.Paciente, lambda i: (i, f"Nome {i}", "123.111.222-33", "15/05/1985", "Rua Exemplo, 123")),
+    "vacinas": (models.Vacina, lambda i: (i, "Butantan", f"LOTE-{i}", "31/12/2030", "Vacina Viral")),
+    "aplicacoes": (models.AplicacaoVacina, lambda i: (i, i % 100, i % 20, i % 50, "20/01/2026")),
+}
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    funcao()
+    return time.perf_counter() - inicio
+
+def _ler_ctypes(struct_class, bloco, tamanho, nomes):
+    for deslocamento in range(0, len(bloco), tamanho):
+        registro = struct_class.from_buffer_copy(bloco, deslocamento)
+        [valor.decode("utf-8", errors="replace") if isinstance(valor, bytes) else valor
+         for valor in (getattr(registro, nome) for nome in nomes)]
+
+def _ler_codec(c, bloco):
+    valores = c.valores
+    for tupla in c.iter_unpack(bloco):
+        valores(tupla)
+
+def _um_campo_ctypes(struct_class, bloco, tamanho, nome):
+    for deslocamento in range(0, len(bloco), tamanho):
+        getattr(struct_class.from_buffer_copy(bloco, deslocamento), nome)
+
+def _um_campo_codec(c, bloco, tamanho, nome):
+    visao = c.visao()
+    mover = visao.mover
+    for deslocamento in range(0, len(bloco), tamanho):
+        getattr(mover(bloco, deslocamento), nome)
+
+def medir(nome, registros):
+    struct_class, gerar = MODELOS[nome]
+    c = codec.obter(struct_class)
+    tamanho = c.tamanho
+    linhas = [gerar(i) for i in range(1, registros + 1)]
+    # O codec recebe os textos já em bytes (como chegam de um .dat ou de outra tupla crua)
+    cruas = [tuple(valor.encode("utf-8") if isinstance(valor, str) else valor for valor in linha) for linha in linhas]
+    bloco_ctypes = bytearray(registros * tamanho)
+    bloco_codec = bytearray(registros * tamanho)
+
+    def escrever_ctypes():
+        for posicao, linha in enumerate(linhas):
+            inicio = posicao * tamanho
+            bloco_ctypes[inicio:inicio + tamanho] = bytes(struct_class(*linha))
+
+    def escrever_codec():
+        pack_into = c.pack_into
+        for posicao, linha in enumerate(cruas):
+            pack_into(bloco_codec, posicao * tamanho, *linha)
+
+    escrita_ctypes = _cronometrar(escrever_ctypes)
+    escrita_codec = _cronometrar(escrever_codec)
+    if bloco_ctypes != bloco_codec:
+        raise ValueError(f"Erro: codec de {struct_class.__name__} gerou bytes diferentes do ctypes.")
+
+    bloco = bytes(bloco_codec)
+    campo = c.campos[1]
+    tempos = {
+        "escrita_ctypes": escrita_ctypes,
+        "escrita_codec": escrita_codec,
+        "leitura_ctypes": _cronometrar(lambda: _ler_ctypes(struct_class, bloco, tamanho, c.campos)),
+        "leitura_codec": _cronometrar(lambda: _ler_codec(c, bloco)),
+        "campo_ctypes": _cronometrar(lambda: _um_campo_ctypes(struct_class, bloco, tamanho, campo)),
+        "campo_codec": _cronometrar(lambda: _um_campo_codec(c, bloco, tamanho, campo)),
+    }
+    return {"modelo": nome, "bytes_registro": tamanho, "formato": c.struct.format,
+            **{etapa: segundos / registros * 1e9 for etapa, segundos in tempos.items()}}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a serialização ctypes com o codec pré-compilado.")
+    parser.add_argument("--registros", type=int, default=200000)
+    parser.add_argument("--modelos", nargs="+", choices=list(MODELOS), default=list(MODELOS))
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON (ns por registro)")
+    args = parser.parse_args()
+
+    resultados = [medir(nome, args.registros) for nome in args.modelos]
+    if args.json:
+        print(json.dumps({"parametros": vars(args), "resultados": resultados}, indent=2))
+        return
+
+    print(f"{args.registros} registros por modelo, ns por registro (ctypes / codec), bytes idênticos")
+    print(f"{'modelo':<14}{'escrita':>20}{'leitura':>20}{'um campo':>20}")
+    for r in resultados:
+        colunas = [f"{r[etapa + '_ctypes']:.0f} / {r[etapa + '_codec']:.0f} "
+                   f"({r[etapa + '_ctypes'] / r[etapa + '_codec']:.1f}x)" for etapa in ("escrita", "leitura", "campo")]
+        print(f"{r['modelo']:<14}" + "".join(f"{coluna:>20}" for coluna in colunas))
+
+if __name__ == "__main__":
+    main()
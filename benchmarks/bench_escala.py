@@ -0,0 +1,312 @@
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import bench_sondagem
+from modules import config
+from modules import metricas
+from modules import models
+from modules import store
+from modules import utils
+from modules import utils_parte3
+
+# ================================================================================
+#                       BENCHMARK: INSERÇÃO, BUSCA E REMOÇÃO EM ESCALA
+# ================================================================================
+# Roda as funções de utils (gerar_base_aplicacoes, buscar_aplicacao, remover_aplicacao,
+# inserir_aplicacao) sobre bases de 10^3 a 10^7 registros, em um diretório temporário:
+#   1. geração da base (carga em lote) com N aplicações
+#   2. buscas com a fração de acertos pedida (os erros são chaves que nunca existiram)
+#   3. churn: remoções de chaves vivas e inserções de chaves novas, alternadas ou em rajada
+#   4. as mesmas buscas depois do churn (lápides e pilha de excluídos em uso)
+# As chaves seguem a distribuição escolhida (sequencial, uniforme ou Zipf). Cada etapa
+# reporta ops/s e latências p50/p99; o índice hash reporta o comprimento médio de
+# sondagem (acerto e erro) antes e depois do churn; no fim, o tamanho de cada arquivo.
+# A saída em JSON (--json / --saida) serve para acompanhar regressões entre versões;
+# com --metricas ela inclui os contadores e histogramas de metricas.py de cada base.
+# Com --filtro TAXA o store usa o filtro de Bloom das chaves, e o resultado traz as
+# taxas de falsos positivos configurada, estimada e observada.
+#
+# Uso: python -m benchmarks.bench_escala --registros 1000 100000 --operacoes 10000 \
+#          --distribuicao zipf --acertos 0.9 --churn alternado [--json] [--saida r.json]
+
+DISTRIBUICOES = ("sequencial", "uniforme", "zipf")
+PADROES_CHURN = ("alternado", "rajada")
+# Primo grande (coprimo com qualquer N menor que ele): espalha as posições mais
+# populares da Zipf pelo espaço de chaves em vez de concentrá-las nas primeiras
+ESPALHAMENTO_ZIPF = 2654435761
+# Chaves medidas (acertos e erros) no comprimento de sondagem dos esquemas não lineares
+AMOSTRA_SONDAGEM = 20000
+
+def _zipf(rnd, n, expoente):
+    # Posição em [0, n) pela inversa da CDF contínua de uma lei de potência (aproximação da Zipf)
+    u = rnd.random()
+    if expoente == 1:
+        posto = n ** u
+    else:
+        posto = ((n ** (1 - expoente) - 1) * u + 1) ** (1 / (1 - expoente))
+    return min(n, int(posto)) - 1 if posto >= 1 else 0
+
+def seletor(distribuicao, rnd, expoente=1.0):
+    # Função n -> índice em [0, n) segundo a distribuição
+    if distribuicao == "sequencial":
+        cursor = [-1]
+
+        def proximo(n):
+            cursor[0] += 1
+            return cursor[0] % n
+        return proximo
+    if distribuicao == "uniforme":
+        return rnd.randrange
+    return lambda n: _zipf(rnd, n, expoente) * ESPALHAMENTO_ZIPF % n
+
+def _percentil(ordenadas, fracao):
+    return ordenadas[min(len(ordenadas) - 1, int(fracao * len(ordenadas)))]
+
+def _resumo(latencias_ns):
+    # ops/s pelo tempo somado das operações; latências em microssegundos
+    if not latencias_ns:
+        return {"operacoes": 0}
+    ordenadas = sorted(latencias_ns)
+    total_s = sum(ordenadas) / 1e9
+    return {
+        "operacoes": len(ordenadas),
+        "ops_por_s": len(ordenadas) / total_s if total_s else 0.0,
+        "media_us": total_s / len(ordenadas) * 1e6,
+        "p50_us": _percentil(ordenadas, 0.50) / 1e3,
+        "p99_us": _percentil(ordenadas, 0.99) / 1e3,
+    }
+
+def _sondagem_linear(tabela):
+    # Sondagem linear: médias exatas em uma passada pelas posições
+    #   acerto: posições visitadas da posição inicial da chave até ela
+    #   erro:   posições visitadas de cada posição inicial até a primeira livre
+    capacidade = tabela.capacidade
+    chaves = tabela.campos[0::utils_parte3.CAMPOS_POR_REGISTRO]
+    estados = tabela.campos[2::utils_parte3.CAMPOS_POR_REGISTRO]
+
+    soma_acerto = 0
+    for posicao, (chave, estado) in enumerate(zip(chaves, estados)):
+        if estado == 1:
+            soma_acerto += (posicao - tabela.posicao_inicial(chave)) % capacidade + 1
+
+    # Distância até a próxima posição livre, de trás para frente (duas voltas: a tabela é circular)
+    ate_livre = capacidade
+    soma_erro = 0
+    for volta in range(2):
+        for posicao in range(capacidade - 1, -1, -1):
+            ate_livre = 0 if estados[posicao] == 0 else ate_livre + 1
+            if volta == 1:
+                soma_erro += min(ate_livre, capacidade) + 1
+    return soma_acerto / tabela.ocupados if tabela.ocupados else 0.0, soma_erro / capacidade
+
+def sondagem(caminho_hash, amostra=AMOSTRA_SONDAGEM):
+    # Comprimento médio de sondagem (acerto e erro) do índice no esquema gravado no arquivo.
+    # Na linear a conta é exata; nos demais esquemas é medida sobre amostra chaves presentes
+    # e ausentes (ver bench_sondagem)
+    if not os.path.exists(caminho_hash):
+        return None
+    tabela = bench_sondagem.carregar_tabela(caminho_hash)
+    if tabela.sondagem == utils_parte3.SONDAGEM_LINEAR:
+        acerto, erro = _sondagem_linear(tabela)
+    else:
+        medida = bench_sondagem.comprimentos_sondagem(tabela, amostra)
+        acerto, erro = medida["acerto"].get("media", 0.0), medida["erro"].get("media", 0.0)
+    return {
+        "sondagem": utils_parte3.SONDAGENS[tabela.sondagem],
+        "funcao_hash": utils_parte3.FUNCOES_HASH[tabela.funcao_hash],
+        "capacidade": tabela.capacidade,
+        "ocupados": tabela.ocupados,
+        "lapides": tabela.removidos,
+        "sondagem_acerto": acerto,
+        "sondagem_erro": erro,
+    }
+
+@contextlib.contextmanager
+def _arquivos_em(diretorio, registros):
+    # Aponta a configuração (arquivos e tamanho da base) para o diretório do benchmark
+    anterior = config.obter()
+    utils.configurar_base(diretorio_dados=diretorio, diretorio_logs=anterior.diretorio_logs,
+                          tamanhos={**anterior.tamanhos, "aplicacoes": registros},
+                          tamanho_hash=anterior.tamanho_hash)
+    try:
+        yield
+    finally:
+        utils.fechar_store()
+        config.configurar(anterior)
+
+def _buscas(chaves_vivas, escolher, rnd, operacoes, acertos, primeira_inexistente):
+    latencias = array("q")
+    falhas = 0
+    for indice in range(operacoes):
+        acerto = rnd.random() < acertos
+        chave = chaves_vivas[escolher(len(chaves_vivas))] if acerto else primeira_inexistente + indice
+        inicio = time.perf_counter_ns()
+        registro = utils.buscar_aplicacao(chave)
+        latencias.append(time.perf_counter_ns() - inicio)
+        falhas += (registro is None) == acerto
+    return latencias, falhas
+
+def _churn(chaves_vivas, escolher, operacoes, padrao, proxima_chave):
+    # Remove chaves vivas (escolhidas pela distribuição) e insere chaves novas
+    remocoes, insercoes = array("q"), array("q")
+    falhas = 0
+
+    def remover():
+        nonlocal falhas
+        indice = escolher(len(chaves_vivas))
+        chave = chaves_vivas[indice]
+        chaves_vivas[indice] = chaves_vivas[-1]
+        chaves_vivas.pop()
+        inicio = time.perf_counter_ns()
+        falhas += not utils.remover_aplicacao(chave)
+        remocoes.append(time.perf_counter_ns() - inicio)
+
+    def inserir(chave):
+        nonlocal falhas
+        nova = models.AplicacaoVacina(chave, chave % 100 + 1, chave % 20 + 1, chave % 50 + 1, "20/01/2026")
+        inicio = time.perf_counter_ns()
+        falhas += utils.inserir_aplicacao(nova) == -1
+        insercoes.append(time.perf_counter_ns() - inicio)
+        chaves_vivas.append(chave)
+
+    operacoes = min(operacoes, len(chaves_vivas))
+    if padrao == "alternado":
+        for indice in range(operacoes):
+            remover()
+            inserir(proxima_chave + indice)
+    else:
+        for _ in range(operacoes):
+            remover()
+        for indice in range(operacoes):
+            inserir(proxima_chave + indice)
+    return remocoes, insercoes, falhas
+
+def medir(registros, operacoes, distribuicao, acertos, churn, expoente, opcoes, semente, com_metricas=False):
+    rnd = random.Random(semente)
+    random.seed(semente) # gerar_base_aplicacoes sorteia as FKs com o random global
+    diretorio = tempfile.mkdtemp(prefix="bench_escala_")
+    try:
+        with _arquivos_em(diretorio, registros), open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            utils.configurar_stores(**opcoes)
+            if com_metricas:
+                metricas.zerar()
+                metricas.ativar()
+            resultado = {"registros": registros}
+
+            # 1. Geração da base e abertura do store (com árvore B+ ou outro esquema de sondagem, a
+            #    conversão do índice entra aqui)
+            inicio = time.perf_counter()
+            utils.gerar_base_aplicacoes()
+            decorrido = time.perf_counter() - inicio
+            resultado["geracao"] = {"segundos": decorrido, "registros_por_s": registros / decorrido}
+            inicio = time.perf_counter()
+            utils.obter_store()
+            resultado["abertura_s"] = time.perf_counter() - inicio
+            resultado["indice_inicial"] = sondagem(models.FILE_HASH)
+
+            # 2. Buscas (chaves inexistentes acima de qualquer chave que o churn venha a criar)
+            chaves_vivas = array("i", range(1, registros + 1))
+            inexistentes = registros + operacoes + 1
+            latencias, falhas = _buscas(chaves_vivas, seletor(distribuicao, rnd, expoente), rnd,
+                                        operacoes, acertos, inexistentes)
+            resultado["busca"] = _resumo(latencias)
+
+            # 3. Churn: remoções e inserções
+            remocoes, insercoes, falhas_churn = _churn(chaves_vivas, seletor(distribuicao, rnd, expoente),
+                                                       operacoes, churn, registros + 1)
+            resultado["remocao"] = _resumo(remocoes)
+            resultado["insercao"] = _resumo(insercoes)
+
+            # 4. Buscas depois do churn
+            latencias, falhas_depois = _buscas(chaves_vivas, seletor(distribuicao, rnd, expoente), rnd,
+                                               operacoes, acertos, inexistentes + operacoes)
+            resultado["busca_apos_churn"] = _resumo(latencias)
+            resultado["filtro"] = utils.obter_store().estatisticas().get("filtro")
+            utils.fechar_store()
+            resultado["indice_final"] = sondagem(models.FILE_HASH)
+            resultado["falhas"] = falhas + falhas_churn + falhas_depois
+            if com_metricas:
+                resultado["metricas"] = metricas.stats()
+            resultado["arquivos"] = {nome: os.path.getsize(os.path.join(diretorio, nome))
+                                     for nome in sorted(os.listdir(diretorio))}
+        return resultado
+    finally:
+        metricas.desativar()
+        utils.configurar_stores()
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+def _imprimir(resultado):
+    print(f"\n{resultado['registros']} registros: geração {resultado['geracao']['segundos']:.2f} s "
+          f"({resultado['geracao']['registros_por_s']:.0f} registros/s), abertura {resultado['abertura_s']:.3f} s")
+    print(f"{'etapa':<18}{'ops':>8}{'ops/s':>11}{'p50 (us)':>10}{'p99 (us)':>10}")
+    for etapa in ("busca", "remocao", "insercao", "busca_apos_churn"):
+        r = resultado[etapa]
+        if r["operacoes"]:
+            print(f"{etapa:<18}{r['operacoes']:>8}{r['ops_por_s']:>11.0f}{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}")
+    for nome in ("indice_inicial", "indice_final"):
+        indice = resultado[nome]
+        if indice is not None:
+            print(f"{nome:<18}sondagem ({indice['sondagem']}/{indice['funcao_hash']}) "
+                  f"acerto {indice['sondagem_acerto']:.2f}, erro {indice['sondagem_erro']:.2f}, "
+                  f"{indice['lapides']} lápides")
+    filtro = resultado["filtro"]
+    if filtro is not None:
+        print(f"filtro            falsos positivos: configurada {filtro['taxa_configurada']:.2%}, "
+              f"estimada {filtro['taxa_estimada']:.2%}, observada {filtro['taxa_observada']:.2%} "
+              f"({filtro['descartes']} buscas sem acerto respondidas em memória)")
+    print("arquivos: " + ", ".join(f"{nome} {tamanho}" for nome, tamanho in resultado["arquivos"].items()))
+    if resultado["falhas"]:
+        print(f"FALHA: {resultado['falhas']} operações com resultado inesperado")
+
+def main():
+    parser = argparse.ArgumentParser(description="Inserção, busca e remoção pelas funções de utils em escala.")
+    parser.add_argument("--registros", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Tamanhos da base (um resultado por tamanho)")
+    parser.add_argument("--operacoes", type=int, default=10000, help="Operações por etapa")
+    parser.add_argument("--distribuicao", choices=DISTRIBUICOES, default="uniforme")
+    parser.add_argument("--expoente", type=float, default=1.0, help="Expoente da Zipf")
+    parser.add_argument("--acertos", type=float, default=0.9, help="Fração das buscas com chave existente")
+    parser.add_argument("--churn", choices=PADROES_CHURN, default="alternado")
+    parser.add_argument("--indice", choices=store.TIPOS_INDICE, default="hash")
+    parser.add_argument("--sondagem", choices=utils_parte3.SONDAGENS, default="linear",
+                        help="Esquema de sondagem do índice hash")
+    parser.add_argument("--funcao-hash", choices=utils_parte3.FUNCOES_HASH, default="modulo")
+    parser.add_argument("--durabilidade", choices=("nenhum", "op", "grupo"), default="nenhum")
+    parser.add_argument("--filtro", type=float, default=None,
+                        help="Taxa de falsos positivos do filtro de Bloom das chaves (padrão: sem filtro)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    parser.add_argument("--saida", help="Grava o resultado em JSON neste arquivo")
+    parser.add_argument("--metricas", action="store_true", help="Inclui os contadores de metricas.py")
+    args = parser.parse_args()
+
+    opcoes = {"tipo_indice": args.indice, "durabilidade": args.durabilidade, "filtro": args.filtro}
+    if args.indice == "hash":
+        opcoes.update(sondagem=args.sondagem, funcao_hash=args.funcao_hash)
+    resultados = []
+    for registros in args.registros:
+        resultados.append(medir(registros, args.operacoes, args.distribuicao, args.acertos, args.churn,
+                                args.expoente, opcoes, args.semente, args.metricas))
+        if not args.json:
+            _imprimir(resultados[-1])
+
+    relatorio = {"parametros": vars(args), "resultados": resultados}
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2)
+    if args.json:
+        print(json.dumps(relatorio, indent=2))
+    sys.exit(1 if any(r["falhas"] for r in resultados) else 0)
+
+if __name__ == "__main__":
+    main()
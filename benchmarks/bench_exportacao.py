@@ -0,0 +1,94 @@
+import argparse
+import contextlib
+import ctypes
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import exportacao
+from modules import models
+from modules import store
+
+# ================================================================================
+#                       BENCHMARK: EXPORTAÇÃO EM STREAMING
+# ================================================================================
+# Monta uma base, remove uma fração dos registros (buracos na pilha de excluídos) e
+# mede em MB/s do .dat: o dump em texto registro a registro (um read() e um write()
+# por slot, como o antigo exportar_base_para_log), o scan() em blocos e cada formato
+# de exportação.
+#
+# Uso: python -m benchmarks.bench_exportacao --registros 200000 --removidos 0.2 [--json]
+
+def _texto_por_registro(caminho, struct_class, destino):
+    # Referência: o antigo exportar_base_para_log, um read() e um write() por slot, inclusive os buracos
+    tamanho = ctypes.sizeof(struct_class)
+    contador = 0
+    with open(caminho, "rb") as f_in, open(destino, "w", encoding="utf-8") as f_log:
+        while True:
+            buffer = f_in.read(tamanho)
+            if not buffer:
+                break
+            f_log.write(str(struct_class.from_buffer_copy(buffer)) + "\n")
+            contador += 1
+    return contador
+
+def _medir(funcao, bytes_lidos):
+    inicio = time.perf_counter()
+    registros = funcao()
+    decorrido = time.perf_counter() - inicio
+    return {"registros": registros, "segundos": decorrido, "mb_por_s": bytes_lidos / 1e6 / decorrido}
+
+def medir(registros, fracao_removida, semente):
+    diretorio = tempfile.mkdtemp(prefix="bench_exportacao_")
+    try:
+        arquivo_dados = os.path.join(diretorio, "aplicacoes.dat")
+        arquivos = (arquivo_dados, os.path.join(diretorio, "aplicacoes_hash.dat"), os.path.join(diretorio, "header.dat"))
+        linhas = ((cod, cod % 100, cod % 20, cod % 50, "20/01/2026") for cod in range(1, registros + 1))
+        with contextlib.redirect_stdout(io.StringIO()):
+            store.carregar_em_lote(linhas, *arquivos)
+        with contextlib.redirect_stdout(io.StringIO()), \
+                store.AplicacaoStore(*arquivos, arquivo_bmais=os.path.join(diretorio, "aplicacoes_bmais.dat")) as s:
+            s.delete_many(random.Random(semente).sample(range(1, registros + 1), int(registros * fracao_removida)))
+            s.flush()
+            bytes_lidos = os.path.getsize(arquivo_dados)
+
+            resultados = {
+                "texto_por_registro": _medir(lambda: _texto_por_registro(
+                    arquivo_dados, models.AplicacaoVacina, os.path.join(diretorio, "referencia.txt")), bytes_lidos),
+                "scan": _medir(lambda: sum(1 for _ in s.scan()), bytes_lidos),
+            }
+            for formato in exportacao.FORMATOS:
+                destino = os.path.join(diretorio, f"saida.{formato}")
+                resumo = exportacao.exportar(s, destino, formato, titulo="APLICAÇÕES")
+                resultados[formato] = {chave: resumo[chave] for chave in ("registros", "segundos", "mb_por_s")}
+        return {"bytes_dat": bytes_lidos, "resultados": resultados}
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede a varredura e a exportação em MB/s.")
+    parser.add_argument("--registros", type=int, default=200000)
+    parser.add_argument("--removidos", type=float, default=0.2, help="Fração de registros removidos antes")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    medicao = medir(args.registros, args.removidos, args.semente)
+    if args.json:
+        print(json.dumps({"parametros": vars(args), **medicao}, indent=2))
+        return
+
+    print(f"{args.registros} registros ({medicao['bytes_dat'] / 1e6:.1f} MB), {args.removidos:.0%} removidos")
+    print(f"{'etapa':<22}{'registros':>11}{'tempo (s)':>11}{'MB/s':>9}")
+    for nome, r in medicao["resultados"].items():
+        print(f"{nome:<22}{r['registros']:>11}{r['segundos']:>11.2f}{r['mb_por_s']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
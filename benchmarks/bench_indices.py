@@ -0,0 +1,101 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import store
+
+# ================================================================================
+#                       BENCHMARK: ÍNDICE HASH x ÁRVORE B+
+# ================================================================================
+# Monta a mesma base com cada tipo de índice primário (carga em lote) e mede:
+# buscas que acertam, buscas que erram, as mesmas buscas em lote (get_many),
+# consultas por intervalo e inserções.
+#
+# Uso: python -m benchmarks.bench_indices --registros 200000 --buscas 20000 [--json]
+
+CONFIGURACOES = [
+    ("hash (arquivo)", {"tipo_indice": "hash"}),
+    ("hash (mmap)", {"tipo_indice": "hash", "usar_mmap": True}),
+    ("arvore B+", {"tipo_indice": "bmais"}),
+]
+
+def _cronometrar(funcao, repeticoes):
+    inicio = time.perf_counter()
+    funcao()
+    decorrido = time.perf_counter() - inicio
+    return {"total_s": decorrido, "us_por_op": decorrido / repeticoes * 1e6}
+
+def medir(nome, opcoes, registros, buscas, intervalos, largura_intervalo, semente):
+    rnd = random.Random(semente)
+    diretorio = tempfile.mkdtemp(prefix="bench_indices_")
+    try:
+        arquivos = {
+            "arquivo_dados": os.path.join(diretorio, "aplicacoes.dat"),
+            "arquivo_hash": os.path.join(diretorio, "aplicacoes_hash.dat"),
+            "arquivo_header": os.path.join(diretorio, "header.dat"),
+            "arquivo_bmais": os.path.join(diretorio, "aplicacoes_bmais.dat"),
+        }
+        linhas = ((cod, cod % 100, cod % 20, cod % 50, "20/01/2026") for cod in range(1, registros + 1))
+        inicio = time.perf_counter()
+        store.carregar_em_lote(linhas, arquivos["arquivo_dados"], arquivos["arquivo_hash"],
+                               arquivos["arquivo_header"], tipo_indice=opcoes["tipo_indice"],
+                               arquivo_bmais=arquivos["arquivo_bmais"])
+        resultado = {"indice": nome, "carga_s": time.perf_counter() - inicio}
+
+        acertos = [rnd.randint(1, registros) for _ in range(buscas)]
+        erros = [registros + rnd.randint(1, registros) for _ in range(buscas)]
+        inicios = [rnd.randint(1, max(1, registros - largura_intervalo)) for _ in range(intervalos)]
+        novos = list(range(registros + 1, registros + 1 + buscas))
+
+        with store.AplicacaoStore(**arquivos, **opcoes) as s, contextlib.redirect_stdout(io.StringIO()):
+            resultado["busca_acerto"] = _cronometrar(lambda: [s.get(cod) for cod in acertos], buscas)
+            resultado["busca_erro"] = _cronometrar(lambda: [s.get(cod) for cod in erros], buscas)
+            resultado["busca_lote"] = _cronometrar(lambda: s.get_many(acertos), buscas)
+            resultado["intervalo"] = _cronometrar(
+                lambda: [list(s.intervalo(a, a + largura_intervalo)) for a in inicios], intervalos)
+            resultado["insercao"] = _cronometrar(
+                lambda: [s.insert(store.models.AplicacaoVacina(cod, 1, 1, 1, "20/01/2026")) for cod in novos],
+                buscas)
+        return resultado
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara o índice hash com a árvore B+.")
+    parser.add_argument("--registros", type=int, default=100000)
+    parser.add_argument("--buscas", type=int, default=10000)
+    parser.add_argument("--intervalos", type=int, default=200)
+    parser.add_argument("--largura", type=int, default=100, help="Chaves por consulta de intervalo")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    resultados = [
+        medir(nome, opcoes, args.registros, args.buscas, args.intervalos, args.largura, args.semente)
+        for nome, opcoes in CONFIGURACOES
+    ]
+
+    if args.json:
+        print(json.dumps({"parametros": vars(args), "resultados": resultados}, indent=2))
+        return
+
+    print(f"{args.registros} registros, {args.buscas} buscas, {args.intervalos} intervalos de {args.largura}")
+    print(f"{'índice':<16}{'carga (s)':>11}{'acerto (us)':>13}{'erro (us)':>11}{'lote (us)':>11}"
+          f"{'intervalo (us)':>16}{'inserção (us)':>15}")
+    for r in resultados:
+        print(f"{r['indice']:<16}{r['carga_s']:>11.2f}{r['busca_acerto']['us_por_op']:>13.1f}"
+              f"{r['busca_erro']['us_por_op']:>11.1f}{r['busca_lote']['us_por_op']:>11.1f}"
+              f"{r['intervalo']['us_por_op']:>16.1f}"
+              f"{r['insercao']['us_por_op']:>15.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from modules import store
+
+# ================================================================================
+#                       BENCHMARK: PARTIDA A FRIO (IMPORT, ABERTURA, 1ª BUSCA)
+# ================================================================================
+# Monta uma base de aplicações (ou usa --diretorio com uma existente) e mede, em
+# processos Python novos, o tempo até a primeira busca:
+#   import     from modules import utils (sem diretórios criados nem primo calculado)
+#   abertura   utils.configurar_base(diretorio) + utils.obter_store()
+#   busca      o primeiro get (índice e registro lidos do disco)
+# O interpretador em si (antes do import) não entra na conta.
+#
+# Uso: python -m benchmarks.bench_inicializacao --registros 5000000 [--execucoes 10] [--json]
+#      python -m benchmarks.bench_inicializacao --diretorio files
+
+# Código do processo medido: imprime os três tempos em JSON
+_PROCESSO = """
+import json, sys, time
+inicio = time.perf_counter()
+sys.path.insert(0, {raiz!r})
+from modules import utils
+importado = time.perf_counter()
+utils.configurar_base(diretorio_dados={diretorio!r})
+tabela = utils.obter_store()
+aberto = time.perf_counter()
+registro = tabela.get({chave})
+fim = time.perf_counter()
+print(json.dumps({{"import_ms": (importado - inicio) * 1e3, "abertura_ms": (aberto - importado) * 1e3,
+                  "busca_ms": (fim - aberto) * 1e3, "encontrado": registro is not None}}))
+"""
+
+def montar_base(diretorio, registros):
+    linhas = ((cod, cod % 100, cod % 20, cod % 50, "20/01/2026") for cod in range(1, registros + 1))
+    store.carregar_em_lote(linhas, os.path.join(diretorio, "aplicacoes.dat"),
+                           os.path.join(diretorio, "aplicacoes_hash.dat"), os.path.join(diretorio, "header.dat"),
+                           arquivo_bmais=os.path.join(diretorio, "aplicacoes_bmais.dat"))
+
+def medir(diretorio, chave, execucoes):
+    codigo = _PROCESSO.format(raiz=RAIZ, diretorio=diretorio, chave=chave)
+    medidas = []
+    for _ in range(execucoes):
+        saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+        medidas.append(json.loads(saida.stdout))
+    return {
+        "execucoes": execucoes,
+        "encontrado": all(medida["encontrado"] for medida in medidas),
+        **{etapa: statistics.median(medida[etapa] for medida in medidas)
+           for etapa in ("import_ms", "abertura_ms", "busca_ms")},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede import, abertura e primeira busca em processos novos.")
+    parser.add_argument("--registros", type=int, default=1000000, help="Tamanho da base montada")
+    parser.add_argument("--diretorio", help="Base existente (diretório com aplicacoes.dat); não monta nada")
+    parser.add_argument("--chave", type=int, default=None, help="Chave buscada (padrão: a do meio)")
+    parser.add_argument("--execucoes", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    diretorio = args.diretorio or tempfile.mkdtemp(prefix="bench_inicializacao_")
+    try:
+        if args.diretorio is None:
+            montar_base(diretorio, args.registros)
+        tamanho = os.path.getsize(os.path.join(diretorio, "aplicacoes.dat"))
+        chave = args.chave if args.chave is not None else max(1, args.registros // 2)
+        resultado = medir(os.path.abspath(diretorio), chave, args.execucoes)
+    finally:
+        if args.diretorio is None:
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({"parametros": vars(args), "bytes_dat": tamanho, **resultado}, indent=2))
+        return
+    print(f"base de {tamanho / 1e6:.0f} MB, mediana de {resultado['execucoes']} processos novos "
+          f"(chave {'encontrada' if resultado['encontrado'] else 'NÃO encontrada'})")
+    for etapa in ("import_ms", "abertura_ms", "busca_ms"):
+        print(f"{etapa[:-3]:<10}{resultado[etapa]:>9.2f} ms")
+
+if __name__ == "__main__":
+    main()
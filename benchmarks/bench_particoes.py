@@ -0,0 +1,100 @@
+import argparse
+import functools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import indice_secundario
+from modules import models
+from modules import particionamento
+from modules import store
+
+# ================================================================================
+#                       BENCHMARK: TABELAS PARTICIONADAS (PROCESSOS POR PARTIÇÃO)
+# ================================================================================
+# Para cada número de partições, cria a tabela de aplicações com carregar_em_paralelo,
+# remove uma fração dos registros e mede as etapas que rodam um processo por partição
+# (agregação sobre o scan, exportação CSV e compactação), além dos gets pontuais,
+# que ficam no processo principal. Com 1 partição tudo roda no próprio processo: é a
+# referência de um núcleo. O ganho esperado acompanha min(partições, núcleos).
+#
+# Uso: python -m benchmarks.bench_particoes --registros 1000000 --particoes 1 2 4 8 16 [--json]
+
+def linhas(total, particao, particoes):
+    return ((cod, cod % 100, cod % 20, cod % 50, "20/01/2026") for cod in range(particao or particoes, total + 1, particoes))
+
+def contar_por_vacina(registros):
+    # Agregação de exemplo: aplicações por vacina (o dicionário volta por pickle)
+    contagem = {}
+    for registro in registros:
+        contagem[registro.cod_vacina_fk] = contagem.get(registro.cod_vacina_fk, 0) + 1
+    return contagem
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+def medir(registros, particoes, fracao_removida, buscas, semente):
+    rnd = random.Random(semente)
+    diretorio = tempfile.mkdtemp(prefix="bench_particoes_")
+    try:
+        arquivo_dados = os.path.join(diretorio, "aplicacoes.dat")
+        _, carga_s = _cronometrar(lambda: particionamento.carregar_em_paralelo(
+            functools.partial(linhas, registros), models.AplicacaoVacina, "cod_aplicacao", arquivo_dados,
+            particoes, campos_secundarios=indice_secundario.CAMPOS_SECUNDARIOS_APLICACAO,
+            formato=store.FORMATO_APLICACAO))
+
+        with particionamento.TabelaParticionada(models.AplicacaoVacina, "cod_aplicacao", arquivo_dados,
+                                                campos_secundarios=indice_secundario.CAMPOS_SECUNDARIOS_APLICACAO) as t:
+            chaves = rnd.sample(range(1, registros + 1), min(buscas, registros))
+            _, busca_s = _cronometrar(lambda: [t.get(chave) for chave in chaves])
+            t.delete_many(rnd.sample(range(1, registros + 1), int(registros * fracao_removida)))
+
+            por_vacina, agregar_s = _cronometrar(lambda: t.agregar(contar_por_vacina))
+            vivos = sum(sum(contagem.values()) for contagem in por_vacina)
+            _, exportar_s = _cronometrar(lambda: t.exportar(os.path.join(diretorio, "aplicacoes.csv")))
+            _, compactar_s = _cronometrar(t.compactar_dados)
+
+        return {
+            "particoes": particoes,
+            "registros_vivos": vivos,
+            "carga_s": carga_s,
+            "agregar_s": agregar_s,
+            "exportar_s": exportar_s,
+            "compactar_s": compactar_s,
+            "us_por_get": busca_s / max(1, len(chaves)) * 1e6,
+        }
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede carga, varredura, exportação e compactação por número de partições.")
+    parser.add_argument("--registros", type=int, default=1000000)
+    parser.add_argument("--particoes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--removidos", type=float, default=0.2, help="Fração removida antes das varreduras")
+    parser.add_argument("--buscas", type=int, default=20000, help="gets pontuais cronometrados")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    resultados = [medir(args.registros, particoes, args.removidos, args.buscas, args.semente)
+                  for particoes in args.particoes]
+    if args.json:
+        print(json.dumps({"parametros": vars(args), "nucleos": os.cpu_count(), "resultados": resultados}, indent=2))
+        return
+
+    print(f"{args.registros} registros, {args.removidos:.0%} removidos, {os.cpu_count()} núcleos")
+    print(f"{'partições':>10}{'carga (s)':>11}{'agregar (s)':>13}{'exportar (s)':>14}{'compactar (s)':>15}{'get (us)':>10}")
+    for r in resultados:
+        print(f"{r['particoes']:>10}{r['carga_s']:>11.2f}{r['agregar_s']:>13.2f}{r['exportar_s']:>14.2f}"
+              f"{r['compactar_s']:>15.2f}{r['us_por_get']:>10.2f}")
+
+if __name__ == "__main__":
+    main()
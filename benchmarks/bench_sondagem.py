@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import utils_parte3
+
+# ================================================================================
+#                       BENCHMARK: ESQUEMAS DE SONDAGEM DO ÍNDICE HASH
+# ================================================================================
+# Para cada sondagem (linear, quadrática, dupla, Robin Hood) e função de hash (módulo,
+# mistura), monta um IndiceHash inserindo as chaves uma a uma (com crescimento e rehash
+# incremental), aplica churn (remove uma fração das chaves e insere chaves novas) e mede
+# a distribuição exata do comprimento de sondagem:
+#   acerto: posições visitadas até achar cada chave presente
+#   erro:   posições visitadas por chaves ausentes sorteadas (até a posição livre, ou até
+#           a parada antecipada do Robin Hood)
+# Chaves sequenciais com hash por módulo ocupam posições vizinhas: é o caso em que a
+# sondagem linear forma um único aglomerado e cada erro percorre boa parte dele.
+#
+# Uso: python -m benchmarks.bench_sondagem --registros 50000 --distribuicao sequencial \
+#          --churn 0.3 [--esquemas linear/modulo robin_hood/mistura] [--json]
+
+DISTRIBUICOES = ("sequencial", "uniforme")
+# Chaves uniformes: sorteadas em [1, LIMITE_CHAVE)
+LIMITE_CHAVE = 2 ** 31 - 1
+
+def carregar_tabela(caminho):
+    # Tabela em memória com as posições do arquivo (sonda sem E/S; o esquema vem do cabeçalho)
+    with open(caminho, "rb") as f:
+        arquivo = utils_parte3.TabelaHashArquivo(f)
+        tabela = utils_parte3.TabelaHashMemoria(arquivo.capacidade, arquivo.limite_carga,
+                                                arquivo.sondagem, arquivo.funcao_hash)
+        tabela.ocupados = arquivo.ocupados
+        tabela.removidos = arquivo.removidos
+        f.seek(arquivo._offset)
+        tabela.campos = array("i")
+        tabela.campos.frombytes(f.read(arquivo.capacidade * utils_parte3.TAMANHO_REGISTRO_HASH))
+    return tabela
+
+def _distribuicao(comprimentos):
+    if not comprimentos:
+        return {"quantidade": 0}
+    ordenados = sorted(comprimentos)
+
+    def percentil(fracao):
+        return ordenados[min(len(ordenados) - 1, int(fracao * len(ordenados)))]
+    return {
+        "quantidade": len(ordenados),
+        "media": sum(ordenados) / len(ordenados),
+        "p50": percentil(0.50),
+        "p90": percentil(0.90),
+        "p99": percentil(0.99),
+        "max": ordenados[-1],
+    }
+
+def comprimentos_sondagem(tabela, amostra=None, semente=42):
+    # Distribuição das sondagens de acerto (chaves da tabela, até amostra delas) e de erro
+    # (o mesmo número de chaves ausentes sorteadas)
+    rnd = random.Random(semente)
+    presentes = [chave for chave, _ in tabela.itens()]
+    chaves = presentes
+    if amostra is not None and len(presentes) > amostra:
+        chaves = rnd.sample(presentes, amostra)
+    presentes = set(presentes)
+    ausentes = []
+    while len(ausentes) < len(chaves):
+        chave = rnd.randrange(1, LIMITE_CHAVE)
+        if chave not in presentes:
+            ausentes.append(chave)
+    return {
+        "sondagem": utils_parte3.SONDAGENS[tabela.sondagem],
+        "funcao_hash": utils_parte3.FUNCOES_HASH[tabela.funcao_hash],
+        "capacidade": tabela.capacidade,
+        "ocupados": tabela.ocupados,
+        "lapides": tabela.removidos,
+        "acerto": _distribuicao([tabela._sondar(chave)[1] for chave in chaves]),
+        "erro": _distribuicao([tabela._sondar(chave)[1] for chave in ausentes]),
+    }
+
+def _chaves(distribuicao, quantidade, rnd, inicio=1):
+    if distribuicao == "sequencial":
+        return list(range(inicio, inicio + quantidade))
+    return rnd.sample(range(1, LIMITE_CHAVE), quantidade)
+
+def medir(sondagem, funcao_hash, registros, distribuicao, churn, limite_carga, amostra, semente):
+    rnd = random.Random(semente)
+    diretorio = tempfile.mkdtemp(prefix="bench_sondagem_")
+    try:
+        caminho = os.path.join(diretorio, "indice_hash.dat")
+        indice = utils_parte3.IndiceHash(caminho, usar_mmap=True, limite_carga=limite_carga,
+                                         sondagem=sondagem, funcao_hash=funcao_hash)
+        chaves = _chaves(distribuicao, registros, rnd)
+
+        # 1. Inserções uma a uma (crescimento e rehash incremental no caminho)
+        inicio = time.perf_counter()
+        for endereco, chave in enumerate(chaves):
+            indice.inserir(chave, endereco)
+        insercao_s = time.perf_counter() - inicio
+
+        # 2. Churn: remove uma fração das chaves e insere a mesma quantidade de chaves novas
+        existentes = set(chaves)
+        removidas = rnd.sample(chaves, int(registros * churn))
+        novas = [chave for chave in _chaves(distribuicao, 2 * len(removidas), rnd, registros + 1)
+                 if chave not in existentes][:len(removidas)]
+        inicio = time.perf_counter()
+        for chave in removidas:
+            indice.remover(chave)
+        for endereco, chave in enumerate(novas, registros):
+            indice.inserir(chave, endereco)
+        churn_s = time.perf_counter() - inicio
+
+        # 3. Buscas cronometradas (acertos) e rehash pendente concluído antes das medidas
+        vivas = list(existentes - set(removidas)) + novas
+        buscadas = rnd.sample(vivas, min(len(vivas), amostra))
+        inicio = time.perf_counter()
+        for chave in buscadas:
+            indice.buscar(chave)
+        busca_s = time.perf_counter() - inicio
+        indice.concluir_rehash()
+        indice.close()
+
+        resultado = comprimentos_sondagem(carregar_tabela(caminho), amostra, semente)
+        resultado["us_por_insercao"] = insercao_s / registros * 1e6
+        resultado["us_por_churn"] = churn_s / max(1, len(removidas) + len(novas)) * 1e6
+        resultado["us_por_busca"] = busca_s / max(1, len(buscadas)) * 1e6
+        return resultado
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+def _imprimir(resultados):
+    print(f"{'esquema':<22}{'acerto med':>11}{'p99':>7}{'max':>8}{'erro med':>11}{'p99':>8}{'max':>8}"
+          f"{'lápides':>9}{'ins (us)':>10}{'busca (us)':>11}")
+    for r in resultados:
+        acerto, erro = r["acerto"], r["erro"]
+        print(f"{r['sondagem'] + '/' + r['funcao_hash']:<22}{acerto['media']:>11.2f}{acerto['p99']:>7}"
+              f"{acerto['max']:>8}{erro['media']:>11.2f}{erro['p99']:>8}{erro['max']:>8}{r['lapides']:>9}"
+              f"{r['us_por_insercao']:>10.2f}{r['us_por_busca']:>11.2f}")
+
+def main():
+    todos = [f"{sondagem}/{funcao}" for sondagem in utils_parte3.SONDAGENS for funcao in utils_parte3.FUNCOES_HASH]
+    parser = argparse.ArgumentParser(description="Compara o comprimento de sondagem de cada esquema do índice hash.")
+    parser.add_argument("--registros", type=int, default=50000)
+    parser.add_argument("--distribuicao", choices=DISTRIBUICOES, default="sequencial")
+    parser.add_argument("--churn", type=float, default=0.3, help="Fração removida e reinserida com chaves novas")
+    parser.add_argument("--limite-carga", type=float, default=utils_parte3.LIMITE_CARGA_PADRAO)
+    parser.add_argument("--amostra", type=int, default=2000, help="Chaves medidas (acertos e erros)")
+    parser.add_argument("--esquemas", nargs="+", choices=todos, default=todos, metavar="SONDAGEM/FUNCAO")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    resultados = []
+    for esquema in args.esquemas:
+        sondagem, funcao_hash = esquema.split("/")
+        resultados.append(medir(sondagem, funcao_hash, args.registros, args.distribuicao, args.churn,
+                                args.limite_carga, args.amostra, args.semente))
+    if args.json:
+        print(json.dumps({"parametros": vars(args), "resultados": resultados}, indent=2))
+        return
+    print(f"{args.registros} chaves ({args.distribuicao}), churn {args.churn:.0%}, limite de carga {args.limite_carga}")
+    _imprimir(resultados)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import models
+from modules import store
+
+# ================================================================================
+#                       STRESS: VÁRIAS THREADS E VÁRIOS PROCESSOS
+# ================================================================================
+# Escritores inserem chaves novas e removem chaves da base inicial (cada um no seu
+# conjunto de chaves) ao mesmo tempo, disputando a pilha de excluídos e as cadeias
+# de sondagem; leitores buscam chaves que nunca são removidas. No fim confere:
+#   - nenhuma chave perdida ou sobrando (conjunto final = o esperado)
+#   - nenhum endereço duplicado (dois registros vivos no mesmo slot)
+#   - nenhum slot perdido: vivos + pilha de excluídos = total de registros,
+#     sem endereço repetido nem ciclo na pilha
+#
+# Uso: python -m benchmarks.stress_concorrencia --modo ambos --escritores 4 --leitores 4
+
+def _arquivos(diretorio):
+    return {
+        "arquivo_dados": os.path.join(diretorio, "aplicacoes.dat"),
+        "arquivo_hash": os.path.join(diretorio, "aplicacoes_hash.dat"),
+        "arquivo_header": os.path.join(diretorio, "header.dat"),
+        "arquivo_bmais": os.path.join(diretorio, "aplicacoes_bmais.dat"),
+    }
+
+def plano(escritor, escritores, registros, operacoes):
+    # Operações de um escritor: ("i", chave) ou ("d", chave), sempre sobre chaves só dele
+    rnd = random.Random(escritor)
+    removiveis = [chave for chave in range(1, registros // 2 + 1) if chave % escritores == escritor]
+    novas = range(registros + 1 + escritor * operacoes, registros + 1 + (escritor + 1) * operacoes)
+    passos = []
+    inseridas = []
+    for chave in novas:
+        passos.append(("i", chave))
+        inseridas.append(chave)
+        if removiveis:
+            passos.append(("d", removiveis.pop()))
+        # Parte das chaves novas sai de novo: o slot volta para a pilha e é reusado
+        if rnd.random() < 0.3:
+            passos.append(("d", inseridas.pop(rnd.randrange(len(inseridas)))))
+    return passos
+
+def esperado(escritores, registros, operacoes):
+    chaves = set(range(1, registros + 1))
+    for escritor in range(escritores):
+        for operacao, chave in plano(escritor, escritores, registros, operacoes):
+            if operacao == "i":
+                chaves.add(chave)
+            else:
+                chaves.discard(chave)
+    return chaves
+
+def escrever(s, escritor, escritores, registros, operacoes):
+    for operacao, chave in plano(escritor, escritores, registros, operacoes):
+        if operacao == "i":
+            if s.insert(models.AplicacaoVacina(chave, chave % 100, chave % 20, chave % 50, "20/01/2026")) == -1:
+                raise AssertionError(f"insert({chave}) recusado")
+        elif not s.delete(chave):
+            raise AssertionError(f"delete({chave}) não encontrou a chave")
+
+def ler(s, registros, parar, contador, semente):
+    # Chaves da segunda metade da base inicial nunca são removidas
+    rnd = random.Random(semente)
+    lidas = 0
+    while not parar.is_set():
+        chave = rnd.randint(registros // 2 + 1, registros)
+        registro = s.get(chave)
+        if registro is None or registro.cod_aplicacao != chave:
+            raise AssertionError(f"get({chave}) retornou {registro}")
+        lidas += 1
+    contador.append(lidas)
+
+def _executar_threads(alvos):
+    # Roda as funções em threads; a primeira exceção é repassada
+    erros = []
+
+    def protegido(alvo):
+        try:
+            alvo()
+        except BaseException as erro:
+            erros.append(erro)
+
+    threads = [threading.Thread(target=protegido, args=(alvo,)) for alvo in alvos]
+    for thread in threads:
+        thread.start()
+    return threads, erros
+
+def processo_escritor(diretorio, opcoes, escritor, escritores, registros, operacoes, leitores):
+    # Um processo: abre o próprio store (multiprocesso=True) com um escritor e leitores
+    with contextlib.redirect_stdout(io.StringIO()), \
+            store.AplicacaoStore(**_arquivos(diretorio), multiprocesso=True, **opcoes) as s:
+        parar = threading.Event()
+        contador = []
+        threads_leitoras, erros = _executar_threads(
+            [lambda i=i: ler(s, registros, parar, contador, 1000 * escritor + i) for i in range(leitores)])
+        try:
+            escrever(s, escritor, escritores, registros, operacoes)
+        finally:
+            parar.set()
+            for thread in threads_leitoras:
+                thread.join()
+        if erros:
+            raise erros[0]
+
+def conferir(diretorio, opcoes, chaves_esperadas):
+    # Retorna a lista de problemas encontrados (vazia = consistente)
+    problemas = []
+    with contextlib.redirect_stdout(io.StringIO()), store.AplicacaoStore(**_arquivos(diretorio), **opcoes) as s:
+        pares = list(s._indice.itens())
+        chaves = set(chave for chave, _ in pares)
+        if chaves != chaves_esperadas:
+            problemas.append(f"chaves perdidas: {len(chaves_esperadas - chaves)}, "
+                             f"sobrando: {len(chaves - chaves_esperadas)}")
+
+        vivos = [endereco for _, endereco in pares]
+        if len(set(vivos)) != len(vivos):
+            problemas.append(f"{len(vivos) - len(set(vivos))} endereços usados por mais de uma chave")
+        for chave, endereco in pares:
+            if s._ler_registro(endereco).cod_aplicacao != chave:
+                problemas.append(f"chave {chave} aponta para o registro de outra chave")
+                break
+
+        livres = []
+        topo = s._topo_pilha
+        while topo != -1 and len(livres) <= s._total_registros:
+            livres.append(topo)
+            topo = s._ler_registro(topo).cod_aplicacao
+        if len(set(livres)) != len(livres):
+            problemas.append("pilha de excluídos com endereço repetido ou ciclo")
+        if set(livres) & set(vivos):
+            problemas.append("endereço vivo também na pilha de excluídos")
+        if len(set(vivos)) + len(set(livres)) != s._total_registros:
+            problemas.append(f"slots perdidos: {s._total_registros} registros, "
+                             f"{len(set(vivos))} vivos + {len(set(livres))} livres")
+
+        for campo in ("cod_paciente_fk", "cod_vacina_fk"):
+            total = sum(len(s.buscar_por(campo, valor)) for valor in range(100))
+            if total != len(chaves_esperadas):
+                problemas.append(f"índice secundário {campo}: {total} registros, esperado {len(chaves_esperadas)}")
+    return problemas
+
+def rodar(modo, opcoes, escritores, leitores, registros, operacoes):
+    diretorio = tempfile.mkdtemp(prefix="stress_concorrencia_")
+    try:
+        linhas = ((cod, cod % 100, cod % 20, cod % 50, "20/01/2026") for cod in range(1, registros + 1))
+        arquivos = _arquivos(diretorio)
+        with contextlib.redirect_stdout(io.StringIO()):
+            store.carregar_em_lote(linhas, arquivos["arquivo_dados"], arquivos["arquivo_hash"],
+                                   arquivos["arquivo_header"], tipo_indice=opcoes.get("tipo_indice", "hash"),
+                                   arquivo_bmais=arquivos["arquivo_bmais"])
+
+        inicio = time.perf_counter()
+        lidas = []
+        if modo == "threads":
+            # Um store compartilhado por todas as threads
+            with contextlib.redirect_stdout(io.StringIO()), store.AplicacaoStore(**arquivos, **opcoes) as s:
+                parar = threading.Event()
+                threads_leitoras, erros_leitura = _executar_threads(
+                    [lambda i=i: ler(s, registros, parar, lidas, i) for i in range(leitores)])
+                threads_escritoras, erros = _executar_threads(
+                    [lambda e=e: escrever(s, e, escritores, registros, operacoes) for e in range(escritores)])
+                for thread in threads_escritoras:
+                    thread.join()
+                parar.set()
+                for thread in threads_leitoras:
+                    thread.join()
+                erros += erros_leitura
+            if erros:
+                raise erros[0]
+        else:
+            # Um processo por escritor, cada um com o próprio store sobre os mesmos arquivos
+            processos = [
+                multiprocessing.Process(target=processo_escritor,
+                                        args=(diretorio, opcoes, e, escritores, registros, operacoes, leitores))
+                for e in range(escritores)
+            ]
+            for processo in processos:
+                processo.start()
+            for processo in processos:
+                processo.join()
+            falhas = [processo.exitcode for processo in processos if processo.exitcode != 0]
+            if falhas:
+                raise AssertionError(f"{len(falhas)} processos terminaram com erro")
+        decorrido = time.perf_counter() - inicio
+
+        total_operacoes = sum(len(plano(e, escritores, registros, operacoes)) for e in range(escritores))
+        return {
+            "modo": modo,
+            "opcoes": opcoes,
+            "mutacoes_por_s": total_operacoes / decorrido,
+            "leituras_por_s": sum(lidas) / decorrido if lidas else None,
+            "problemas": conferir(diretorio, opcoes, esperado(escritores, registros, operacoes)),
+        }
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress de concorrência do AplicacaoStore (threads e processos).")
+    parser.add_argument("--modo", choices=("threads", "processos", "ambos"), default="ambos")
+    parser.add_argument("--escritores", type=int, default=4)
+    parser.add_argument("--leitores", type=int, default=4, help="Threads leitoras (por processo no modo processos)")
+    parser.add_argument("--registros", type=int, default=5000)
+    parser.add_argument("--operacoes", type=int, default=1000, help="Inserções por escritor")
+    parser.add_argument("--indice", choices=store.TIPOS_INDICE, default="hash")
+    parser.add_argument("--durabilidade", choices=("nenhum", "op", "grupo"), default="nenhum")
+    args = parser.parse_args()
+
+    opcoes = {"tipo_indice": args.indice, "durabilidade": args.durabilidade}
+    modos = ("threads", "processos") if args.modo == "ambos" else (args.modo,)
+    falhou = False
+    for modo in modos:
+        r = rodar(modo, opcoes, args.escritores, args.leitores, args.registros, args.operacoes)
+        leituras = f"{r['leituras_por_s']:.0f} leituras/s" if r["leituras_por_s"] is not None else "-"
+        print(f"{modo:<10} {r['mutacoes_por_s']:>9.0f} mutações/s  {leituras}")
+        for problema in r["problemas"]:
+            print(f"  FALHA: {problema}")
+        falhou = falhou or bool(r["problemas"])
+    print("Inconsistências encontradas." if falhou else "OK: nenhum slot perdido ou duplicado.")
+    sys.exit(1 if falhou else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,19 @@
 import os
+import sys
+from modules import logs
 from modules import utils
 from modules import models
 import random
-from modules import utils_parte3
 
 # PONTO DE ENTRADA
 
 if __name__ == "__main__":
 
-    arquivos_para_limpar = [
-        models.FILE_APLICACOES,
-        models.FILE_FUNCIONARIOS,
-        models.FILE_PACIENTES,
-        models.FILE_VACINAS,
-        models.FILE_HASH,
-        models.FILE_HEADER
-    ]
+    # O motor é silencioso por padrão; a demonstração mostra o rastreio de cada operação
+    logs.configurar("DEBUG", destino=sys.stdout, formato="simples")
+
+    # Todos os arquivos de cada tabela: dados, índices, header, log, filtro, partições...
+    arquivos_para_limpar = [arquivo for tabela in utils.TABELAS for arquivo in utils.arquivos_tabela(tabela)]
 
     recriarBases = 0
 
@@ -43,23 +41,24 @@ if __name__ == "__main__":
     ids_para_remover = random.sample(range(1, models.FILE_APLICACOES_SIZE + 1), 50)
     
     print(f"\nRemovendo 50 registros aleatórios...\n\n" + "=" * 80)
-    for id_del in ids_para_remover:
-        utils.remover_aplicacao(id_del)
+    utils.remover_aplicacoes(ids_para_remover)
     
     tamanho_apos_remocao = os.path.getsize(models.FILE_APLICACOES)
     print("=" * 80 + f"\n\nTamanho do arquivo após exclusão: {tamanho_apos_remocao} bytes.\n")
 
     # Criar 50 registros escolhidos em aleatorio. Mostrar tamanho depois da inserção.-
     print("=" * 80 + "\n\nInserindo 50 novos registros para testar reuso de espaço...\n\n")
-    for i in range(101, 151): # IDs novos para deixar claro no log quais registros são novas entradas que estão ocupando espaços de cadastros antigos
-        nova_app = models.AplicacaoVacina(
+    novas_apps = [
+        models.AplicacaoVacina(
             cod=i, 
             cod_pac=random.randint(1, 100), 
             cod_vac=random.randint(1, 20), 
             cod_func=random.randint(1, 50), 
             data="03/02/2026"
         )
-        utils.inserir_aplicacao(nova_app)
+        for i in range(101, 151) # IDs novos para deixar claro no log quais registros são novas entradas que estão ocupando espaços de cadastros antigos
+    ]
+    utils.inserir_aplicacoes(novas_apps)
     
     tamanho_final = os.path.getsize(models.FILE_APLICACOES)
     print("=" * 80 + f"\n\nTamanho do arquivo após novas inserções: {tamanho_final} bytes.")
@@ -73,8 +72,7 @@ if __name__ == "__main__":
     ids_ativos = [i for i in range(1, 151) if i not in ids_para_remover]
     amostra_busca = random.sample(ids_ativos, 15)
 
-    for id_busca in amostra_busca:
-        res = utils.buscar_aplicacao(id_busca)
+    for id_busca, res in zip(amostra_busca, utils.buscar_aplicacoes(amostra_busca)):
         if res:
             print(f"Encontrado: {res}")
         else:
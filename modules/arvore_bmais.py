@@ -0,0 +1,289 @@
+import ctypes
+import os
+from bisect import bisect_left, bisect_right
+from . import concorrencia
+from . import logs
+from . import models
+
+# ================================================================================
+#                       ÍNDICE ÁRVORE B+ (PÁGINAS DE TAMANHO FIXO)
+# ================================================================================
+# Alternativa ao índice hash para quando é preciso ordem: além da busca pontual,
+# responde a intervalos (cod BETWEEN a AND b) e percorre as chaves em ordem
+# seguindo o encadeamento das folhas.
+#
+# Arquivo: [página 0: CabecalhoBMais][página 1][página 2]... (TAMANHO_PAGINA_BMAIS bytes cada)
+#
+# A remoção é preguiçosa: a chave sai da folha, mas páginas com poucas chaves não
+# são fundidas. Os separadores das páginas internas continuam válidos, então a
+# árvore segue correta; o espaço é recuperado ao reconstruir a árvore.
+
+log = logs.obter(__name__)
+
+MAGIC_BMAIS = 0x424D5331 # "BMS1"
+VERSAO_BMAIS = 1
+TAMANHO_PAGINA = models.TAMANHO_PAGINA_BMAIS
+ORDEM = models.ORDEM_BMAIS
+# Ocupação das folhas na construção em lote (deixa folga para inserções futuras)
+OCUPACAO_CONSTRUCAO = 0.9
+
+def _nova_pagina(folha, chaves, valores, proxima=-1):
+    pagina = models.PaginaBMais()
+    pagina.folha = 1 if folha else 0
+    pagina.quantidade = len(chaves)
+    pagina.proxima = proxima
+    pagina.chaves[:len(chaves)] = chaves
+    pagina.valores[:len(valores)] = valores
+    return pagina
+
+def _gravar_cabecalho(f, raiz, total_paginas, total_chaves, altura):
+    cabecalho = models.CabecalhoBMais(MAGIC_BMAIS, VERSAO_BMAIS, raiz, total_paginas, total_chaves, altura)
+    f.seek(0)
+    f.write(cabecalho)
+    f.write(bytes(TAMANHO_PAGINA - ctypes.sizeof(cabecalho)))
+
+def construir_arvore(caminho, pares):
+    # Construção de baixo para cima a partir de (chave, endereço) JÁ ORDENADOS por chave.
+    # Cada nível é gravado em sequência; muito mais rápido que inserir chave a chave.
+    por_folha = max(2, int(ORDEM * OCUPACAO_CONSTRUCAO))
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as f:
+        _gravar_cabecalho(f, 1, 2, 0, 1)
+        proxima_pagina = 1
+
+        # 1. Folhas (encadeadas em ordem)
+        chaves = [chave for chave, _ in pares]
+        valores = [endereco for _, endereco in pares]
+        nivel = [] # (primeira chave, página) de cada nó do nível atual
+        if not chaves:
+            f.write(_nova_pagina(True, [], []))
+            nivel.append((0, proxima_pagina))
+            proxima_pagina += 1
+        for inicio in range(0, len(chaves), por_folha):
+            fim = inicio + por_folha
+            proxima = proxima_pagina + 1 if fim < len(chaves) else -1
+            f.write(_nova_pagina(True, chaves[inicio:fim], valores[inicio:fim], proxima))
+            nivel.append((chaves[inicio], proxima_pagina))
+            proxima_pagina += 1
+
+        # 2. Níveis internos até sobrar uma única raiz
+        altura = 1
+        while len(nivel) > 1:
+            acima = []
+            for inicio in range(0, len(nivel), por_folha + 1):
+                grupo = nivel[inicio:inicio + por_folha + 1]
+                separadores = [primeira for primeira, _ in grupo[1:]]
+                filhos = [pagina for _, pagina in grupo]
+                f.write(_nova_pagina(False, separadores, filhos))
+                acima.append((grupo[0][0], proxima_pagina))
+                proxima_pagina += 1
+            nivel = acima
+            altura += 1
+
+        _gravar_cabecalho(f, nivel[0][1], proxima_pagina, len(chaves), altura)
+    os.replace(temporario, caminho)
+
+class ArvoreBMais:
+    """Índice primário em árvore B+ gravada em páginas de tamanho fixo."""
+
+    def __init__(self, caminho=None, cache=None):
+        self.caminho = caminho or models.FILE_BMAIS
+        self.cache = cache
+        if not os.path.exists(self.caminho):
+            construir_arvore(self.caminho, [])
+        self._abrir()
+
+    def _abrir(self):
+        self._f = self.cache.abrir(self.caminho) if self.cache is not None else open(self.caminho, "rb+")
+        self._ler_em = concorrencia.leitor(self._f)
+        cabecalho = models.CabecalhoBMais.from_buffer_copy(self._f.read(ctypes.sizeof(models.CabecalhoBMais)))
+        if cabecalho.magic != MAGIC_BMAIS:
+            raise ValueError(f"Erro: {self.caminho} não é um arquivo de árvore B+.")
+        self.raiz = cabecalho.raiz
+        self.total_paginas = cabecalho.total_paginas
+        self.total_chaves = cabecalho.total_chaves
+        self.altura = cabecalho.altura
+        self._cabecalho_sujo = False
+
+    # --- PÁGINAS ---
+
+    def _ler_pagina(self, numero):
+        return models.PaginaBMais.from_buffer_copy(self._ler_em(numero * TAMANHO_PAGINA, TAMANHO_PAGINA))
+
+    def _gravar_pagina(self, numero, pagina):
+        concorrencia.gravar_em(self._f, numero * TAMANHO_PAGINA, pagina)
+
+    def _alocar_pagina(self, pagina):
+        numero = self.total_paginas
+        self.total_paginas += 1
+        self._cabecalho_sujo = True
+        self._gravar_pagina(numero, pagina)
+        return numero
+
+    def _descer(self, chave):
+        # Da raiz até a folha que deve conter a chave.
+        # Retorna (número da folha, folha, caminho [(página interna, pagina, índice do filho)])
+        caminho = []
+        numero = self.raiz
+        pagina = self._ler_pagina(numero)
+        while not pagina.folha:
+            indice = bisect_right(pagina.chaves, chave, 0, pagina.quantidade)
+            caminho.append((numero, pagina, indice))
+            numero = pagina.valores[indice]
+            pagina = self._ler_pagina(numero)
+        return numero, pagina, caminho
+
+    # --- OPERAÇÕES PONTUAIS ---
+
+    def buscar(self, chave):
+        # Retorna o endereço físico ou -1
+        _, folha, _ = self._descer(chave)
+        indice = bisect_left(folha.chaves, chave, 0, folha.quantidade)
+        if indice < folha.quantidade and folha.chaves[indice] == chave:
+            return folha.valores[indice]
+        return -1
+
+    def atualizar(self, chave, endereco_fisico):
+        numero, folha, _ = self._descer(chave)
+        indice = bisect_left(folha.chaves, chave, 0, folha.quantidade)
+        if indice < folha.quantidade and folha.chaves[indice] == chave:
+            folha.valores[indice] = endereco_fisico
+            self._gravar_pagina(numero, folha)
+            return True
+        return False
+
+    def inserir(self, chave, endereco_fisico):
+        # Retorna False se a chave já existe
+        numero, folha, caminho = self._descer(chave)
+        quantidade = folha.quantidade
+        indice = bisect_left(folha.chaves, chave, 0, quantidade)
+        if indice < quantidade and folha.chaves[indice] == chave:
+            log.warning("Aviso: Chave %s duplicada detectada na indexação.", chave)
+            return False
+
+        chaves = folha.chaves[:quantidade]
+        valores = folha.valores[:quantidade]
+        chaves.insert(indice, chave)
+        valores.insert(indice, endereco_fisico)
+        self.total_chaves += 1
+        self._cabecalho_sujo = True
+
+        # 1. Cabe na folha: regrava só ela
+        if len(chaves) <= ORDEM:
+            self._gravar_pagina(numero, _nova_pagina(True, chaves, valores, folha.proxima))
+            return True
+
+        # 2. Folha cheia: divide ao meio; a primeira chave da direita sobe como separador
+        meio = len(chaves) // 2
+        direita = self._alocar_pagina(_nova_pagina(True, chaves[meio:], valores[meio:], folha.proxima))
+        self._gravar_pagina(numero, _nova_pagina(True, chaves[:meio], valores[:meio], direita))
+        self._subir_separador(caminho, chaves[meio], direita)
+        return True
+
+    def _subir_separador(self, caminho, separador, nova_pagina):
+        # Insere (separador, nova_pagina) no pai, dividindo internas cheias até a raiz
+        while caminho:
+            numero, pagina, indice = caminho.pop()
+            chaves = pagina.chaves[:pagina.quantidade]
+            filhos = pagina.valores[:pagina.quantidade + 1]
+            chaves.insert(indice, separador)
+            filhos.insert(indice + 1, nova_pagina)
+            if len(chaves) <= ORDEM:
+                self._gravar_pagina(numero, _nova_pagina(False, chaves, filhos))
+                return
+
+            # Interna cheia: a chave do meio sobe (e não fica em nenhuma das metades)
+            meio = len(chaves) // 2
+            separador = chaves[meio]
+            nova_pagina = self._alocar_pagina(_nova_pagina(False, chaves[meio + 1:], filhos[meio + 1:]))
+            self._gravar_pagina(numero, _nova_pagina(False, chaves[:meio], filhos[:meio + 1]))
+
+        # A raiz foi dividida: nova raiz com dois filhos
+        self.raiz = self._alocar_pagina(_nova_pagina(False, [separador], [self.raiz, nova_pagina]))
+        self.altura += 1
+
+    def remover(self, chave):
+        # Remoção preguiçosa (sem fusão de páginas). Retorna o endereço removido ou -1
+        numero, folha, _ = self._descer(chave)
+        quantidade = folha.quantidade
+        indice = bisect_left(folha.chaves, chave, 0, quantidade)
+        if indice >= quantidade or folha.chaves[indice] != chave:
+            return -1
+        endereco_fisico = folha.valores[indice]
+        chaves = folha.chaves[:quantidade]
+        valores = folha.valores[:quantidade]
+        del chaves[indice]
+        del valores[indice]
+        self._gravar_pagina(numero, _nova_pagina(True, chaves, valores, folha.proxima))
+        self.total_chaves -= 1
+        self._cabecalho_sujo = True
+        return endereco_fisico
+
+    # --- ORDEM E INTERVALOS ---
+
+    def intervalo(self, inicio=None, fim=None):
+        # Gera (chave, endereço) com inicio <= chave <= fim, em ordem crescente
+        if inicio is None:
+            numero = self._folha_mais_a_esquerda()
+            indice = 0
+        else:
+            numero, folha, _ = self._descer(inicio)
+            indice = bisect_left(folha.chaves, inicio, 0, folha.quantidade)
+        while numero != -1:
+            folha = self._ler_pagina(numero)
+            for posicao in range(indice, folha.quantidade):
+                chave = folha.chaves[posicao]
+                if fim is not None and chave > fim:
+                    return
+                yield chave, folha.valores[posicao]
+            numero = folha.proxima
+            indice = 0
+
+    def itens(self):
+        # Todas as chaves em ordem crescente
+        return self.intervalo()
+
+    def _folha_mais_a_esquerda(self):
+        numero = self.raiz
+        pagina = self._ler_pagina(numero)
+        while not pagina.folha:
+            numero = pagina.valores[0]
+            pagina = self._ler_pagina(numero)
+        return numero
+
+    def compactar(self):
+        # Reconstrói a árvore em lote (páginas cheias, sem folhas vazias da remoção preguiçosa).
+        # Retorna quantas páginas foram recuperadas.
+        pares = list(self.itens())
+        paginas_antes = self.total_paginas
+        self._f.close()
+        construir_arvore(self.caminho, pares)
+        self._abrir()
+        return paginas_antes - self.total_paginas
+
+    # --- CICLO DE VIDA ---
+
+    def gravar_cabecalho(self):
+        # Grava o cabeçalho pendente sem descarregar o arquivo
+        if self._cabecalho_sujo:
+            cabecalho = models.CabecalhoBMais(MAGIC_BMAIS, VERSAO_BMAIS, self.raiz, self.total_paginas,
+                                              self.total_chaves, self.altura)
+            self._f.seek(0)
+            self._f.write(cabecalho)
+            self._cabecalho_sujo = False
+
+    def flush(self):
+        self.gravar_cabecalho()
+        self._f.flush()
+
+    def close(self):
+        if self._f.closed:
+            return
+        self.flush()
+        self._f.close()
+
+    # --- FLUXO DA ÁRVORE B+ ---
+    # 1. Busca: desce da raiz com bisect em cada página até a folha
+    # 2. Inserção: insere na folha; se estourar, divide e sobe o separador (até a raiz)
+    # 3. Remoção: tira a chave da folha, sem fundir páginas
+    # 4. Intervalo: acha a folha de início e segue o encadeamento das folhas
@@ -0,0 +1,209 @@
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from . import store as motor
+from . import utils
+
+# ================================================================================
+#                       FACHADA ASYNCIO DO MOTOR DE ARMAZENAMENTO
+# ================================================================================
+# As operações do store fazem E/S de arquivo bloqueante. Chamadas de dentro de um
+# event loop, elas o travam. O StoreAssincrono leva essas chamadas para executores
+# dedicados:
+#   - leituras (get, buscar_por, intervalo, scan) rodam em um pool de threads; vários
+#     get da mesma chave em andamento compartilham uma única leitura
+#   - escritas (insert, delete) emitidas na mesma iteração do loop viram um lote,
+#     executado por uma thread escritora única sob uma trava de escrita e uma espera
+#     de fsync (store.lote()), com inserts e deletes consecutivos agrupados em
+#     insert_many/delete_many. Os lotes saem na ordem em que foram emitidos.
+#
+#   async with obter_store_assincrono() as s:     # ou StoreAssincrono(AplicacaoStore(...))
+#       app = await s.get(10)
+#       await asyncio.gather(*(s.insert(nova) for nova in novas))
+#       async for app in s.intervalo(1, 100):
+#           ...
+#       async for app in s.scan():
+#           ...
+
+THREADS_LEITURA = 4
+# Registros entregues por vez na iteração assíncrona de um intervalo
+REGISTROS_POR_PARTE = 1024
+# Formas do scan assíncrono: a "visao" do store é um objeto só, reposicionado a cada
+# registro, e não sobrevive a uma parte inteira entregue de uma vez
+FORMAS_SCAN = ("registro", "tupla")
+
+class StoreAssincrono:
+    """Interface async/await de uma TabelaIndexada, com E/S em executores dedicados."""
+
+    def __init__(self, store, executor=None, threads_leitura=THREADS_LEITURA):
+        self.store = store
+        self._executor = executor or ThreadPoolExecutor(threads_leitura, thread_name_prefix="store-leitura")
+        self._executor_proprio = executor is None
+        # Uma thread só para as escritas: os lotes são aplicados na ordem de emissão
+        self._escritor = ThreadPoolExecutor(1, thread_name_prefix="store-escrita")
+
+        # chave -> Future da leitura em andamento (agrupamento de gets concorrentes)
+        self._buscas = {}
+        # (operação, argumento, Future) emitidos nesta iteração do loop
+        self._pendentes = []
+        self._agendado = False
+        self._lotes = set()
+
+    # --- LEITURAS ---
+
+    async def get(self, chave):
+        # Retorna o registro ou None. Gets simultâneos da mesma chave fazem uma única leitura.
+        loop = asyncio.get_running_loop()
+        futuro = self._buscas.get(chave)
+        if futuro is None:
+            futuro = loop.run_in_executor(self._executor, self.store.get, chave)
+            self._buscas[chave] = futuro
+            futuro.add_done_callback(functools.partial(self._concluir_busca, chave))
+        # shield: cancelar um dos que esperam não cancela a leitura dos outros
+        registro = await asyncio.shield(futuro)
+        # Cada chamador recebe a sua cópia (structs ctypes são mutáveis)
+        return None if registro is None else type(registro).from_buffer_copy(registro)
+
+    def _concluir_busca(self, chave, futuro):
+        if self._buscas.get(chave) is futuro:
+            del self._buscas[chave]
+
+    async def buscar_por(self, campo, valor):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.store.buscar_por, campo, valor)
+
+    async def intervalo(self, inicio=None, fim=None, registros_por_parte=REGISTROS_POR_PARTE):
+        # Iteração assíncrona em ordem de chave. As chaves do intervalo são resolvidas uma única
+        # vez (com hash, uma passada pelo índice inteiro); depois cada parte é um get_many no
+        # executor. Chaves removidas nesse meio tempo ficam de fora.
+        loop = asyncio.get_running_loop()
+        chaves = await loop.run_in_executor(self._executor, self.store.chaves_intervalo, inicio, fim)
+        for posicao in range(0, len(chaves), registros_por_parte):
+            parte = await loop.run_in_executor(self._executor, self.store.get_many,
+                                               chaves[posicao:posicao + registros_por_parte])
+            for registro in parte:
+                if registro is not None:
+                    yield registro
+
+    async def scan(self, forma="registro", registros_por_parte=motor.REGISTROS_POR_BLOCO_SCAN):
+        # Iteração assíncrona em ordem física: o gerador de store.scan() avança uma parte (por
+        # padrão um bloco do .dat) por vez no executor, sem recomeçar a varredura
+        if forma not in FORMAS_SCAN:
+            raise ValueError(f"Erro: forma deve ser uma de {FORMAS_SCAN}.")
+        loop = asyncio.get_running_loop()
+        registros = self.store.scan(forma=forma)
+        while True:
+            parte = await loop.run_in_executor(self._executor, _proxima_parte, registros, registros_por_parte)
+            for registro in parte:
+                yield registro
+            if len(parte) < registros_por_parte:
+                return
+
+    # --- ESCRITAS EM LOTE ---
+
+    async def insert(self, registro):
+        # Mesmo retorno de TabelaIndexada.insert (endereço ou -1 se a chave já existe)
+        return await self._emitir("insert", registro, getattr(registro, self.store.campo_chave))
+
+    async def delete(self, chave):
+        return await self._emitir("delete", chave, chave)
+
+    def _emitir(self, operacao, argumento, chave):
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        # Gets emitidos depois desta escrita não reaproveitam uma leitura anterior a ela
+        self._buscas.pop(chave, None)
+        self._pendentes.append((operacao, argumento, futuro))
+        # 1. A primeira escrita da iteração agenda o despacho; as seguintes entram no mesmo lote
+        if not self._agendado:
+            self._agendado = True
+            loop.call_soon(self._despachar, loop)
+        return futuro
+
+    def _despachar(self, loop):
+        # 2. Envia o lote inteiro à thread escritora
+        lote, self._pendentes, self._agendado = self._pendentes, [], False
+        if not lote:
+            return
+        tarefa = loop.run_in_executor(self._escritor, self._executar_lote, [(op, arg) for op, arg, _ in lote])
+        self._lotes.add(tarefa)
+        tarefa.add_done_callback(functools.partial(self._entregar, lote))
+
+    def _executar_lote(self, operacoes):
+        # 3. Na thread escritora: uma trava de escrita e uma espera de fsync para o lote. Cada
+        #    sequência de operações iguais e consecutivas vira um insert_many/delete_many (E/S em
+        #    ordem de offset e agrupada), na ordem de emissão; os resultados são os mesmos de
+        #    chamadas isoladas (-1 para chave repetida, False para chave ausente). Um erro da
+        #    sequência vai para todas as operações dela.
+        resultados = []
+        with self.store.lote():
+            for operacao, sequencia in itertools.groupby(operacoes, key=lambda par: par[0]):
+                argumentos = [argumento for _, argumento in sequencia]
+                try:
+                    retornos = getattr(self.store, operacao + "_many")(argumentos)
+                    resultados.extend((retorno, None) for retorno in retornos)
+                except Exception as erro:
+                    resultados.extend((None, erro) for _ in argumentos)
+        return resultados
+
+    def _entregar(self, lote, tarefa):
+        # 4. De volta ao loop: resultado (ou erro) de cada operação para quem a emitiu
+        self._lotes.discard(tarefa)
+        erro_lote = tarefa.exception() if not tarefa.cancelled() else asyncio.CancelledError()
+        resultados = tarefa.result() if erro_lote is None else [(None, erro_lote)] * len(lote)
+        for (_, _, futuro), (resultado, erro) in zip(lote, resultados):
+            if futuro.done():
+                continue
+            if erro is not None:
+                futuro.set_exception(erro)
+            else:
+                futuro.set_result(resultado)
+
+    # --- CICLO DE VIDA ---
+
+    async def flush(self):
+        await self._aguardar_lotes()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._escritor, self.store.flush)
+
+    async def _aguardar_lotes(self):
+        # Despacha o que ainda não saiu e espera os lotes em andamento
+        if self._pendentes:
+            self._despachar(asyncio.get_running_loop())
+        if self._lotes:
+            await asyncio.gather(*self._lotes, return_exceptions=True)
+
+    async def close(self):
+        # Termina as escritas emitidas, fecha o store e os executores
+        await self._aguardar_lotes()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._escritor, self.store.close)
+        self._escritor.shutdown()
+        if self._executor_proprio:
+            self._executor.shutdown()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+    # --- FLUXO DA FACHADA ---
+    # 1. get: uma leitura por chave em andamento, no pool de leitura; cada chamador recebe uma cópia
+    # 2. insert/delete: entram na lista da iteração atual do loop
+    # 3. No fim da iteração (call_soon), a lista vira um lote na thread escritora
+    # 4. store.lote(): uma trava de escrita e, com WAL, um único fsync para o lote; cada
+    #    sequência de inserts (ou deletes) seguidos é um insert_many (ou delete_many)
+    # 5. Os resultados voltam ao loop e cada Future recebe o seu
+    # 6. intervalo: chaves resolvidas uma vez, registros lidos por partes (get_many);
+    #    scan: o mesmo gerador do store avançado uma parte por vez no pool de leitura
+
+def _proxima_parte(registros, quantidade):
+    # No executor: o gerador do store é consumido fora do loop
+    return list(itertools.islice(registros, quantidade))
+
+def obter_store_assincrono(tabela="aplicacoes"):
+    # Fachada sobre o store padrão da tabela (o mesmo usado pelas funções de utils)
+    return StoreAssincrono(utils.obter_store(tabela))
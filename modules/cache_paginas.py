@@ -0,0 +1,295 @@
+import os
+import threading
+from collections import OrderedDict
+from . import metricas
+
+# ================================================================================
+#                       CACHE DE PÁGINAS (BUFFER POOL)
+# ================================================================================
+# Um único conjunto de páginas em memória compartilhado por todos os arquivos de um
+# store (dados, hash, árvore B+, listas dos índices secundários). Cada arquivo é
+# aberto como ArquivoEmCache, que tem a mesma interface de seek/read/write de um
+# arquivo comum: o código que já fazia seek + read passa a ler da memória quando a
+# página está no cache e só vai ao disco na falta.
+#
+# Escritas ficam na página (marcada como suja) e vão para o disco quando a página
+# é descartada pela política de substituição, no flush() ou no close() do arquivo.
+#
+# Com log de escrita antecipada (wal.py), cada página guarda o LSN da última
+# transação que a alterou e só vai ao disco depois que o log até esse LSN estiver
+# sincronizado. Páginas alteradas pela transação em andamento ficam fixadas (não
+# são descartadas) até a confirmação.
+
+TAMANHO_PAGINA_CACHE = 4096
+PAGINAS_PADRAO = 1024 # 4 MiB com páginas de 4 KiB
+POLITICAS = ("lru", "clock")
+
+class _Pagina:
+    __slots__ = ("dados", "suja", "referenciada", "fixada", "lsn")
+
+    def __init__(self, dados):
+        self.dados = dados
+        self.suja = False
+        self.referenciada = True
+        self.fixada = False
+        self.lsn = 0
+
+class CacheDePaginas:
+    """Buffer pool de páginas de tamanho fixo com substituição LRU ou CLOCK."""
+
+    def __init__(self, max_paginas=None, max_bytes=None, tamanho_pagina=TAMANHO_PAGINA_CACHE, politica="lru"):
+        if politica not in POLITICAS:
+            raise ValueError(f"Erro: politica deve ser uma de {POLITICAS}.")
+        if max_bytes is not None:
+            max_paginas = max_bytes // tamanho_pagina
+        self.max_paginas = max(1, max_paginas or PAGINAS_PADRAO)
+        self.tamanho_pagina = tamanho_pagina
+        self.politica = politica
+
+        # (id do arquivo, número da página) -> _Pagina. No LRU a ordem do OrderedDict é a
+        # ordem de uso; no CLOCK o ponteiro percorre _relogio e usa o bit de referência.
+        self._paginas = OrderedDict()
+        self._relogio = []
+        self._ponteiro = 0
+        self._arquivos = {}
+        self._proximo_id = 0
+        # Protege as estruturas do cache (várias threads e vários stores podem compartilhá-lo)
+        self._trava = threading.RLock()
+
+        self.acertos = 0
+        self.faltas = 0
+        self.substituicoes = 0
+        self.escritas_disco = 0
+
+    # --- ARQUIVOS ---
+
+    def abrir(self, caminho, modo="rb+"):
+        # Abre o arquivo sem buffer próprio (o cache já faz esse papel)
+        with self._trava:
+            arquivo = ArquivoEmCache(self, self._proximo_id, open(caminho, modo, buffering=0))
+            self._arquivos[self._proximo_id] = arquivo
+            self._proximo_id += 1
+            return arquivo
+
+    def _esquecer(self, arquivo, gravar=True):
+        # Grava as páginas sujas do arquivo (se gravar) e as retira do cache
+        if gravar:
+            self.descarregar(arquivo)
+        chaves = [chave for chave in self._paginas if chave[0] == arquivo.id]
+        for chave in chaves:
+            del self._paginas[chave]
+        if self.politica == "clock" and chaves:
+            self._relogio = [chave for chave in self._relogio if chave[0] != arquivo.id]
+            self._ponteiro = 0
+        del self._arquivos[arquivo.id]
+
+    # --- PÁGINAS ---
+
+    def _obter(self, arquivo, numero):
+        chave = (arquivo.id, numero)
+        pagina = self._paginas.get(chave)
+        if pagina is not None:
+            # 1. Acerto: nenhuma E/S
+            self.acertos += 1
+            if self.politica == "lru":
+                self._paginas.move_to_end(chave)
+            else:
+                pagina.referenciada = True
+            return pagina
+
+        # 2. Falta: abre espaço e lê a página do disco (completa com zeros após o fim)
+        self.faltas += 1
+        if len(self._paginas) >= self.max_paginas:
+            self._substituir()
+        bruto = arquivo.bruto
+        bruto.seek(numero * self.tamanho_pagina)
+        dados = bytearray(self.tamanho_pagina)
+        lidos = bruto.readinto(dados)
+        if metricas.ativo:
+            metricas.es(leituras=1, bytes_lidos=lidos or 0, chamadas=2)
+        pagina = _Pagina(dados)
+        self._paginas[chave] = pagina
+        if self.politica == "clock":
+            self._relogio.append(chave)
+        return pagina
+
+    def _substituir(self):
+        # Páginas fixadas não saem; se todas estiverem fixadas o cache cresce além do limite
+        if self.politica == "lru":
+            chave = next((chave for chave, pagina in self._paginas.items() if not pagina.fixada), None)
+            if chave is None:
+                return
+            pagina = self._paginas.pop(chave)
+        else:
+            # CLOCK: páginas referenciadas ganham uma segunda chance
+            for _ in range(2 * len(self._relogio)):
+                if self._ponteiro >= len(self._relogio):
+                    self._ponteiro = 0
+                chave = self._relogio[self._ponteiro]
+                pagina = self._paginas[chave]
+                if not pagina.referenciada and not pagina.fixada:
+                    break
+                pagina.referenciada = False
+                self._ponteiro += 1
+            else:
+                return
+            del self._relogio[self._ponteiro]
+            del self._paginas[chave]
+        self.substituicoes += 1
+        if pagina.suja:
+            self._gravar(self._arquivos[chave[0]], chave[1], pagina)
+
+    def _gravar(self, arquivo, numero, pagina):
+        # Regra do WAL: o log que descreve a página chega ao disco antes dela
+        if arquivo.wal is not None and pagina.lsn:
+            arquivo.wal.garantir(pagina.lsn)
+        # Só grava até o fim lógico do arquivo (a última página pode estar incompleta)
+        inicio = numero * self.tamanho_pagina
+        fim = min(inicio + self.tamanho_pagina, arquivo.tamanho)
+        if fim > inicio:
+            arquivo.bruto.seek(inicio)
+            arquivo.bruto.write(memoryview(pagina.dados)[:fim - inicio])
+            self.escritas_disco += 1
+            if metricas.ativo:
+                metricas.es(escritas=1, bytes_escritos=fim - inicio, chamadas=2)
+        pagina.suja = False
+
+    def descarregar(self, arquivo=None):
+        # Write-back das páginas sujas (de um arquivo ou de todos), em ordem de offset
+        with self._trava:
+            sujas = sorted(chave for chave, pagina in self._paginas.items()
+                           if pagina.suja and (arquivo is None or chave[0] == arquivo.id))
+            for chave in sujas:
+                self._gravar(self._arquivos[chave[0]], chave[1], self._paginas[chave])
+
+    # --- ESTATÍSTICAS ---
+
+    def estatisticas(self):
+        consultas = self.acertos + self.faltas
+        return {
+            "politica": self.politica,
+            "max_paginas": self.max_paginas,
+            "paginas": len(self._paginas),
+            "paginas_sujas": sum(1 for pagina in self._paginas.values() if pagina.suja),
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            "substituicoes": self.substituicoes,
+            "escritas_disco": self.escritas_disco,
+        }
+
+    def zerar_estatisticas(self):
+        self.acertos = self.faltas = self.substituicoes = self.escritas_disco = 0
+
+    # --- FLUXO DO CACHE ---
+    # 1. Leitura: cada página tocada vem do cache (acerto) ou do disco (falta)
+    # 2. Cache cheio: LRU descarta a menos usada; CLOCK dá segunda chance às referenciadas
+    # 3. Escrita: altera a página em memória e a marca como suja
+    # 4. Página suja vai ao disco ao ser descartada, no flush() ou no close()
+    # 5. Com WAL: páginas da transação em andamento ficam fixadas; o log vai antes da página
+
+class ArquivoEmCache:
+    """Arquivo com interface de seek/read/write cujas páginas vivem no CacheDePaginas."""
+
+    def __init__(self, cache, id_arquivo, bruto):
+        self.cache = cache
+        self.id = id_arquivo
+        self.bruto = bruto
+        self.name = bruto.name
+        # LogDeEscrita que registra as escritas deste arquivo (None = sem log)
+        self.wal = None
+        self._posicao = 0
+        bruto.seek(0, 2)
+        self.tamanho = bruto.tell()
+
+    @property
+    def closed(self):
+        return self.bruto.closed
+
+    def seek(self, posicao, origem=0):
+        if origem == 1:
+            posicao += self._posicao
+        elif origem == 2:
+            posicao += self.tamanho
+        self._posicao = posicao
+        return posicao
+
+    def tell(self):
+        return self._posicao
+
+    def read(self, quantidade=-1):
+        fim = self.tamanho if quantidade is None or quantidade < 0 else min(self._posicao + quantidade, self.tamanho)
+        dados = self.ler_em(self._posicao, fim - self._posicao)
+        self._posicao += len(dados)
+        return dados
+
+    def ler_em(self, posicao, quantidade):
+        # Leitura posicionada: não usa nem altera a posição do arquivo (segura entre threads)
+        fim = min(posicao + quantidade, self.tamanho)
+        if fim <= posicao:
+            return b""
+        tamanho_pagina = self.cache.tamanho_pagina
+        numero, deslocamento = divmod(posicao, tamanho_pagina)
+        with self.cache._trava:
+            # 1. Caso comum (registro inteiro em uma página): uma consulta ao cache
+            if deslocamento + (fim - posicao) <= tamanho_pagina:
+                return bytes(self.cache._obter(self, numero).dados[deslocamento:deslocamento + fim - posicao])
+
+            # 2. Leitura que atravessa páginas
+            partes = []
+            while posicao < fim:
+                numero, deslocamento = divmod(posicao, tamanho_pagina)
+                trecho = min(tamanho_pagina - deslocamento, fim - posicao)
+                partes.append(self.cache._obter(self, numero).dados[deslocamento:deslocamento + trecho])
+                posicao += trecho
+            return b"".join(partes)
+
+    def write(self, dados):
+        dados = memoryview(dados).cast("B")
+        tamanho_pagina = self.cache.tamanho_pagina
+        escrito = 0
+        with self.cache._trava:
+            while escrito < len(dados):
+                numero, deslocamento = divmod(self._posicao, tamanho_pagina)
+                trecho = min(tamanho_pagina - deslocamento, len(dados) - escrito)
+                pagina = self.cache._obter(self, numero)
+                pagina.dados[deslocamento:deslocamento + trecho] = dados[escrito:escrito + trecho]
+                pagina.suja = True
+                if self.wal is not None:
+                    self.wal.registrar_escrita(self, pagina, self._posicao, dados[escrito:escrito + trecho])
+                escrito += trecho
+                self._posicao += trecho
+                # O fim lógico avança a cada página: se a próxima falta descartar esta (suja),
+                # _gravar já a grava inteira, e não cortada no tamanho anterior à escrita
+                self.tamanho = max(self.tamanho, self._posicao)
+        return escrito
+
+    def flush(self):
+        self.cache.descarregar(self)
+
+    def sincronizar(self):
+        # flush() + fsync: as páginas gravadas chegam de fato ao disco
+        self.flush()
+        os.fsync(self.bruto.fileno())
+
+    def close(self):
+        with self.cache._trava:
+            if self.closed:
+                return
+            self.cache._esquecer(self)
+            self.bruto.close()
+
+    def abandonar(self):
+        # Fecha sem gravar as páginas sujas (o conteúdo confirmado é refeito a partir do log)
+        with self.cache._trava:
+            if self.closed:
+                return
+            self.cache._esquecer(self, gravar=False)
+            self.bruto.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,135 @@
+import ctypes
+import struct
+
+# ================================================================================
+#                       CODEC DOS REGISTROS (STRUCT PRÉ-COMPILADO POR MODELO)
+# ================================================================================
+# Ler um registro com from_buffer_copy cria um objeto ctypes, e cada acesso a um
+# char[] cria um bytes novo; montar um com o __init__ dos modelos faz um encode por
+# campo de texto. O Codec de um modelo é um struct.Struct montado uma única vez a
+# partir de _fields_, com os mesmos offsets e bytes de alinhamento da struct ctypes
+# (ou seja, os mesmos bytes dos .dat existentes):
+#
+#   c = codec.obter(models.AplicacaoVacina)
+#   c.pack_into(bloco, deslocamento, 1, 10, 3, 7, b"20/01/2026")   # buffer pré-alocado
+#   c.unpack_from(bloco, deslocamento)        # tupla crua (char[] em bytes, com os nulos)
+#   c.iter_unpack(bloco)                      # tuplas de um bloco inteiro
+#   v = c.visao(); v.mover(bloco, deslocamento).cod_vacina_fk   # decodifica só esse campo
+#
+# pack_into/unpack_from/iter_unpack são os próprios métodos do struct.Struct: nenhuma
+# camada Python por registro. A Visao é um objeto só, reposicionado a cada registro.
+
+# Códigos do struct com o mesmo tamanho do tipo ctypes (conferido campo a campo)
+_CODIGOS_SIMPLES = "bBhHiIlLqQfd?"
+
+def _formato_campo(nome, tipo):
+    # char[N] -> "Ns"; tipos escalares -> o código do próprio tipo ctypes
+    if issubclass(tipo, ctypes.Array) and tipo._type_ is ctypes.c_char:
+        return f"{tipo._length_}s"
+    codigo = getattr(tipo, "_type_", None)
+    if isinstance(codigo, str) and codigo in _CODIGOS_SIMPLES and struct.calcsize("=" + codigo) == ctypes.sizeof(tipo):
+        return codigo
+    raise ValueError(f"Erro: campo '{nome}' não tem formato equivalente no codec.")
+
+def _propriedade(formato, deslocamento):
+    # Lê um campo direto do buffer da Visao; char[] volta como bytes até o primeiro nulo (como no ctypes)
+    campo = struct.Struct("=" + formato).unpack_from
+    if formato.endswith("s"):
+        return property(lambda visao: campo(visao.buffer, visao.deslocamento + deslocamento)[0].split(b"\0", 1)[0])
+    return property(lambda visao: campo(visao.buffer, visao.deslocamento + deslocamento)[0])
+
+class Codec:
+    """struct.Struct com o layout de uma struct ctypes e uma Visao com uma propriedade por campo."""
+
+    def __init__(self, struct_class):
+        self.struct_class = struct_class
+        self.tamanho = ctypes.sizeof(struct_class)
+        self.campos = tuple(nome for nome, _ in struct_class._fields_)
+        partes = []
+        textos = []
+        propriedades = {}
+        posicao = 0
+        for indice, (nome, tipo) in enumerate(struct_class._fields_):
+            # 1. Bytes de alinhamento antes do campo viram "x" explícitos
+            descritor = getattr(struct_class, nome)
+            if descritor.offset > posicao:
+                partes.append(f"{descritor.offset - posicao}x")
+            formato = _formato_campo(nome, tipo)
+            partes.append(formato)
+            propriedades[nome] = _propriedade(formato, descritor.offset)
+            if formato.endswith("s"):
+                textos.append(indice)
+            posicao = descritor.offset + descritor.size
+        # 2. Alinhamento no fim da struct (ex.: AplicacaoVacina tem 27 bytes de campos e 28 no total)
+        if self.tamanho > posicao:
+            partes.append(f"{self.tamanho - posicao}x")
+        self.struct = struct.Struct("=" + "".join(partes))
+        if self.struct.size != self.tamanho:
+            raise ValueError(f"Erro: formato {self.struct.format} não tem o tamanho de {struct_class.__name__}.")
+        self.textos = tuple(textos)
+        self.pack_into = self.struct.pack_into
+        self.unpack_from = self.struct.unpack_from
+        self.iter_unpack = self.struct.iter_unpack
+        # Visao do modelo: os campos são propriedades da classe (acesso direto, sem __getattr__)
+        self._visao = type(f"Visao{struct_class.__name__}", (Visao,), {"__slots__": (), **propriedades})
+
+    def empacotar_em(self, buffer, deslocamento, valores):
+        # Como pack_into, aceitando str nos campos de texto (UTF-8, como no __init__ dos modelos)
+        self.struct.pack_into(buffer, deslocamento, *(
+            valor.encode("utf-8") if isinstance(valor, str) else valor for valor in valores))
+
+    def valores(self, tupla):
+        # Tupla crua -> valores Python: char[] até o primeiro nulo, decodificado
+        linha = list(tupla)
+        for indice in self.textos:
+            linha[indice] = linha[indice].split(b"\0", 1)[0].decode("utf-8", errors="replace")
+        return linha
+
+    def registro(self, tupla):
+        # Tupla crua -> objeto da struct ctypes (sem passar pelo __init__ do modelo)
+        return self.struct_class.from_buffer_copy(self.struct.pack(*tupla))
+
+    def visao(self, buffer=None, deslocamento=0):
+        return self._visao(self, buffer, deslocamento)
+
+class Visao:
+    """Registro lido no próprio buffer: cada campo é decodificado só quando acessado."""
+
+    __slots__ = ("_codec", "buffer", "deslocamento")
+
+    def __init__(self, codec, buffer=None, deslocamento=0):
+        self._codec = codec
+        self.buffer = buffer
+        self.deslocamento = deslocamento
+
+    def mover(self, buffer, deslocamento):
+        # Reposiciona a mesma visão (nenhum objeto novo por registro)
+        self.buffer = buffer
+        self.deslocamento = deslocamento
+        return self
+
+    def texto(self, nome):
+        return getattr(self, nome).decode("utf-8", errors="replace")
+
+    def tupla(self):
+        return self._codec.unpack_from(self.buffer, self.deslocamento)
+
+    def copiar(self):
+        # Objeto ctypes independente do buffer (para guardar além do próximo mover)
+        return self._codec.struct_class.from_buffer_copy(self.buffer, self.deslocamento)
+
+_codecs = {}
+
+def obter(struct_class):
+    # Codec do modelo, montado no primeiro uso e reaproveitado
+    codec = _codecs.get(struct_class)
+    if codec is None:
+        codec = _codecs[struct_class] = Codec(struct_class)
+    return codec
+
+# --- FLUXO DO CODEC ---
+# 1. obter(modelo): _fields_ + offsets do ctypes viram um formato struct (alinhamento explícito)
+# 2. O tamanho é conferido com ctypes.sizeof: mesmo layout, mesmos bytes nos .dat
+# 3. Escrita: pack_into num bloco pré-alocado (carga em lote, nós da pilha de excluídos)
+# 4. Leitura: unpack_from/iter_unpack (tuplas) ou Visao (um campo por vez, sem cópia)
+# 5. Quem precisa do objeto ctypes usa registro(tupla) ou Visao.copiar()
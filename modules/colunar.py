@@ -0,0 +1,200 @@
+import ctypes
+import os
+from . import arvore_bmais
+from . import models
+from . import store
+from . import utils_parte3
+
+# NumPy é opcional: só este módulo depende dele
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# ================================================================================
+#                       VISÃO COLUNAR (NUMPY) DOS ARQUIVOS .DAT
+# ================================================================================
+# Como todos os registros têm tamanho fixo, cada .dat é um array de structs.
+# Aqui ele é aberto com np.memmap usando um dtype estruturado derivado de _fields_,
+# e os filtros/agregações são vetorizados (nenhum objeto Python por registro).
+
+def _exigir_numpy():
+    if np is None:
+        raise ImportError("Erro: a visão colunar requer NumPy (pip install numpy).")
+
+def dtype_de(struct_class):
+    # Converte os _fields_ de uma ctypes.Structure em um dtype estruturado equivalente
+    # (mesmos offsets e mesmo itemsize, incluindo o alinhamento do ctypes)
+    _exigir_numpy()
+    nomes, formatos, offsets = [], [], []
+    for nome, tipo in struct_class._fields_:
+        if issubclass(tipo, ctypes.Array) and tipo._type_ is ctypes.c_char:
+            formato = f"S{tipo._length_}"
+        else:
+            formato = np.dtype(tipo)
+        nomes.append(nome)
+        formatos.append(formato)
+        offsets.append(getattr(struct_class, nome).offset)
+    return np.dtype({
+        "names": nomes,
+        "formats": formatos,
+        "offsets": offsets,
+        "itemsize": ctypes.sizeof(struct_class)
+    })
+
+def _mapear(caminho, dtype, offset=0):
+    # np.memmap não aceita arquivo vazio
+    total = (os.path.getsize(caminho) - offset) // dtype.itemsize
+    if total <= 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(caminho, dtype=dtype, mode="r", offset=offset, shape=(total,))
+
+def enderecos_indexados(arquivo_indice):
+    # Endereços físicos ocupados segundo o índice primário: hash (inclui a tabela antiga
+    # de um rehash) ou, se o arquivo for de árvore B+, as folhas da árvore
+    _exigir_numpy()
+    with open(arquivo_indice, "rb") as f:
+        magic = int.from_bytes(f.read(4), "little", signed=True)
+    if magic == arvore_bmais.MAGIC_BMAIS:
+        arvore = arvore_bmais.ArvoreBMais(arquivo_indice)
+        enderecos = np.fromiter((endereco for _, endereco in arvore.itens()), dtype=np.int32)
+        arvore.close()
+        return enderecos
+
+    dtype_hash = dtype_de(models.RegistroHash)
+    partes = []
+    for caminho in (arquivo_indice, arquivo_indice + ".antigo"):
+        if not os.path.exists(caminho):
+            continue
+        with open(caminho, "rb") as f:
+            offset = 0 if utils_parte3.TabelaHashArquivo(f).legado else utils_parte3.TAMANHO_CABECALHO_HASH
+        posicoes = _mapear(caminho, dtype_hash, offset)
+        partes.append(posicoes["endereco_dados"][posicoes["estado"] == 1])
+    if not partes:
+        return np.empty(0, dtype=np.int32)
+    return np.concatenate(partes)
+
+def datas_como_inteiro(coluna):
+    # Converte uma coluna 'DD/MM/AAAA' (S11) para AAAAMMDD (int32), vetorizado.
+    # Valores fora do formato viram -1.
+    _exigir_numpy()
+    if len(coluna) == 0:
+        return np.empty(0, dtype=np.int32)
+    bytes_ = np.ascontiguousarray(coluna).view(np.uint8).reshape(len(coluna), -1)[:, :10]
+    digitos = bytes_.astype(np.int32) - ord("0")
+    dia = digitos[:, 0] * 10 + digitos[:, 1]
+    mes = digitos[:, 3] * 10 + digitos[:, 4]
+    ano = digitos[:, 6] * 1000 + digitos[:, 7] * 100 + digitos[:, 8] * 10 + digitos[:, 9]
+    valido = (bytes_[:, 2] == ord("/")) & (bytes_[:, 5] == ord("/"))
+    return np.where(valido, ano * 10000 + mes * 100 + dia, -1).astype(np.int32)
+
+def _data_como_inteiro(data):
+    dia, mes, ano = data.split("/")
+    return int(ano) * 10000 + int(mes) * 100 + int(dia)
+
+class TabelaColunar:
+    """Visão somente leitura de um .dat como array estruturado (np.memmap)."""
+
+    def __init__(self, arquivo, struct_class, arquivo_indice=None):
+        _exigir_numpy()
+        self.arquivo = arquivo
+        self.struct_class = struct_class
+        self.dtype = dtype_de(struct_class)
+
+        # 1. Todos os registros físicos, inclusive os espaços da pilha de excluídos
+        self.registros = _mapear(arquivo, self.dtype)
+
+        # 2. Máscara de registros vivos. Com índice, só o que ele aponta está vivo:
+        #    os nós da free list (e registros órfãos) ficam de fora.
+        if arquivo_indice is not None:
+            self.vivos = np.zeros(len(self.registros), dtype=bool)
+            enderecos = enderecos_indexados(arquivo_indice)
+            self.vivos[enderecos[enderecos < len(self.registros)]] = True
+        else:
+            self.vivos = np.ones(len(self.registros), dtype=bool)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.vivos))
+
+    def coluna(self, nome):
+        # Valores da coluna apenas dos registros vivos
+        return self.registros[nome][self.vivos]
+
+    def filtrar(self, mascara):
+        # Registros vivos em que a máscara (do tamanho do arquivo) é verdadeira
+        return self.registros[self.vivos & mascara]
+
+    def selecionar_intervalo(self, nome, inicio, fim):
+        # inicio <= campo <= fim
+        valores = self.registros[nome]
+        return self.filtrar((valores >= inicio) & (valores <= fim))
+
+    def selecionar_por_data(self, nome, inicio, fim):
+        # Datas 'DD/MM/AAAA' comparadas como AAAAMMDD
+        datas = datas_como_inteiro(self.registros[nome])
+        return self.filtrar((datas >= _data_como_inteiro(inicio)) & (datas <= _data_como_inteiro(fim)))
+
+    def contar_por(self, nome):
+        # Retorna (valores distintos, quantidade de registros vivos de cada um)
+        return np.unique(self.coluna(nome), return_counts=True)
+
+    def somar_por(self, nome_grupo, nome_valor):
+        # Retorna (valores distintos de nome_grupo, soma de nome_valor em cada grupo)
+        grupos, inverso = np.unique(self.coluna(nome_grupo), return_inverse=True)
+        somas = np.bincount(inverso, weights=self.coluna(nome_valor), minlength=len(grupos))
+        return grupos, somas
+
+    def close(self):
+        # Libera o mapeamento (o GC fecharia de qualquer forma)
+        mapa = getattr(self.registros, "_mmap", None)
+        self.registros = self.vivos = None
+        if mapa is not None:
+            mapa.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+# --- ATALHOS PARA AS BASES DO PROJETO ---
+
+def _indice_existente(arquivo_hash, arquivo_bmais):
+    # Índice primário da base: hash ou, se a base usa árvore B+, o arquivo da árvore.
+    # None em bases antigas sem índice (todos os registros são considerados vivos).
+    for caminho in (arquivo_hash, arquivo_bmais):
+        if os.path.exists(caminho):
+            return caminho
+    return None
+
+def abrir_aplicacoes(arquivo_dados=None, arquivo_indice=None):
+    if arquivo_indice is None:
+        arquivo_indice = _indice_existente(models.FILE_HASH, models.FILE_BMAIS)
+    return TabelaColunar(arquivo_dados or models.FILE_APLICACOES, models.AplicacaoVacina, arquivo_indice)
+
+def _abrir_tabela(arquivo, struct_class, arquivo_indice):
+    if arquivo_indice is None:
+        arquivo_hash, _, arquivo_bmais = store.caminhos_tabela(arquivo)
+        arquivo_indice = _indice_existente(arquivo_hash, arquivo_bmais)
+    return TabelaColunar(arquivo, struct_class, arquivo_indice)
+
+def abrir_funcionarios(arquivo=None, arquivo_indice=None):
+    return _abrir_tabela(arquivo or models.FILE_FUNCIONARIOS, models.Funcionario, arquivo_indice)
+
+def abrir_pacientes(arquivo=None, arquivo_indice=None):
+    return _abrir_tabela(arquivo or models.FILE_PACIENTES, models.Paciente, arquivo_indice)
+
+def abrir_vacinas(arquivo=None, arquivo_indice=None):
+    return _abrir_tabela(arquivo or models.FILE_VACINAS, models.Vacina, arquivo_indice)
+
+def aplicacoes_por_vacina(arquivo_dados=None, arquivo_indice=None):
+    # Exemplo: quantas aplicações vivas existem para cada cod_vacina_fk
+    with abrir_aplicacoes(arquivo_dados, arquivo_indice) as tabela:
+        return tabela.contar_por("cod_vacina_fk")
+
+# --- FLUXO DA VISÃO COLUNAR ---
+# 1. dtype estruturado derivado de _fields_ (offsets e itemsize do ctypes)
+# 2. np.memmap do .dat inteiro, sem ler registro por registro
+# 3. Máscara de vivos a partir do índice primário (free list e órfãos ficam de fora)
+# 4. Filtros e agregações vetorizados sobre as colunas
@@ -0,0 +1,182 @@
+import io
+import os
+import struct
+import threading
+from . import metricas
+
+# fcntl só existe em sistemas POSIX: sem ele, só as travas entre threads funcionam
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ================================================================================
+#                       CONCORRÊNCIA (THREADS E PROCESSOS)
+# ================================================================================
+# Modelo de um store compartilhado:
+#   - Leituras (get, buscar_por, intervalo...) usam a trava em modo leitura: várias
+#     threads leem ao mesmo tempo
+#   - Mutações (insert, delete, compactação, flush) usam a trava em modo escrita:
+#     pilha de excluídos e cadeias de sondagem só mudam com uma thread por vez
+#   - Opcionalmente, uma trava de arquivo (fcntl.flock em <base>.lock) estende o mesmo
+#     modelo a vários processos abrindo o mesmo diretório files/. O arquivo de trava
+#     guarda uma geração, incrementada a cada mutação, para que os outros processos
+#     saibam quando recarregar o estado que mantêm em memória.
+
+GERACAO = struct.Struct("<Q")
+
+def leitor(arquivo):
+    # Função ler_em(posicao, tamanho) do arquivo: seek + read atômico, para que threads
+    # leitoras não disputem a posição compartilhada. ArquivoEmCache já tem a sua; num
+    # arquivo comum ela é criada (com uma trava) na primeira chamada e fica guardada nele.
+    ler = getattr(arquivo, "ler_em", None)
+    if ler is not None:
+        return ler
+    trava = threading.Lock()
+    seek, read = arquivo.seek, arquivo.read
+
+    def ler_em(posicao, tamanho):
+        with trava:
+            seek(posicao)
+            dados = read(tamanho)
+        if metricas.ativo:
+            metricas.es(leituras=1, bytes_lidos=len(dados), chamadas=2)
+        return dados
+
+    arquivo.ler_em = ler_em
+    return ler_em
+
+def ler_em(arquivo, posicao, tamanho):
+    return leitor(arquivo)(posicao, tamanho)
+
+def gravar_em(arquivo, posicao, dados):
+    # seek + write (com a trava de escrita do store já adquirida). Só arquivos comuns contam
+    # como E/S nas métricas; num ArquivoEmCache quem conta é o cache, ao ir ao disco.
+    arquivo.seek(posicao)
+    arquivo.write(dados)
+    if metricas.ativo and isinstance(arquivo, io.IOBase):
+        metricas.es(escritas=1, bytes_escritos=len(memoryview(dados).cast("B")), chamadas=2)
+
+class ContextoDeTrava:
+    # Gerenciador de contexto mínimo (mais barato que um @contextmanager no caminho de cada get)
+    __slots__ = ("_entrar", "_sair")
+
+    def __init__(self, entrar, sair):
+        self._entrar = entrar
+        self._sair = sair
+
+    def __enter__(self):
+        self._entrar()
+
+    def __exit__(self, exc_type, exc, tb):
+        self._sair()
+        return False
+
+class TravaDeProcesso:
+    """Trava consultiva (fcntl.flock) compartilhada por todos os processos que abrem a base."""
+
+    def __init__(self, caminho):
+        if fcntl is None:
+            raise OSError("Erro: travas entre processos requerem fcntl (sistemas POSIX).")
+        self.caminho = caminho
+        self._fd = os.open(caminho, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def compartilhada(self):
+        fcntl.flock(self._fd, fcntl.LOCK_SH)
+
+    def exclusiva(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def liberar(self):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def geracao(self):
+        dados = os.pread(self._fd, GERACAO.size, 0)
+        return GERACAO.unpack(dados)[0] if len(dados) == GERACAO.size else 0
+
+    def avancar_geracao(self):
+        # Só com a trava exclusiva
+        geracao = self.geracao() + 1
+        os.pwrite(self._fd, GERACAO.pack(geracao), 0)
+        return geracao
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+class TravaLeituraEscrita:
+    """Vários leitores ou um escritor; com preferência ao escritor (leitores novos esperam)."""
+
+    def __init__(self, processo=None):
+        # Caminho comum (sem escritor) só usa o mutex; a condição é para quem precisa esperar
+        self._mutex = threading.Lock()
+        self._condicao = threading.Condition(self._mutex)
+        self._leitores = 0
+        self._escritor = None
+        self._profundidade = 0
+        self._escritores_esperando = 0
+        # TravaDeProcesso opcional: compartilhada enquanto houver leitores, exclusiva na escrita
+        self.processo = processo
+
+    def adquirir_leitura(self):
+        with self._mutex:
+            if self._escritor is not None or self._escritores_esperando:
+                # A thread que já escreve pode ler (ex.: insert lendo a pilha de excluídos)
+                if self._escritor == threading.get_ident():
+                    self._profundidade += 1
+                    return
+                while self._escritor is not None or self._escritores_esperando:
+                    self._condicao.wait()
+            if self._leitores == 0 and self.processo is not None:
+                self.processo.compartilhada()
+            self._leitores += 1
+
+    def liberar_leitura(self):
+        with self._mutex:
+            if self._escritor is not None and self._escritor == threading.get_ident():
+                self._profundidade -= 1
+                return
+            self._leitores -= 1
+            if self._leitores == 0:
+                if self.processo is not None:
+                    self.processo.liberar()
+                self._condicao.notify_all()
+
+    def adquirir_escrita(self):
+        with self._condicao:
+            atual = threading.get_ident()
+            if self._escritor == atual:
+                self._profundidade += 1
+                return
+            self._escritores_esperando += 1
+            while self._escritor is not None or self._leitores:
+                self._condicao.wait()
+            self._escritores_esperando -= 1
+            self._escritor = atual
+            self._profundidade = 1
+        # Fora da condição: outro processo pode demorar a liberar
+        if self.processo is not None:
+            self.processo.exclusiva()
+
+    def liberar_escrita(self):
+        with self._condicao:
+            self._profundidade -= 1
+            if self._profundidade:
+                return
+            if self.processo is not None:
+                self.processo.liberar()
+            self._escritor = None
+            self._condicao.notify_all()
+
+    def leitura(self):
+        return ContextoDeTrava(self.adquirir_leitura, self.liberar_leitura)
+
+    def escrita(self):
+        return ContextoDeTrava(self.adquirir_escrita, self.liberar_escrita)
+
+    # --- FLUXO DAS TRAVAS ---
+    # 1. Leitor espera enquanto há escritor ativo ou esperando; o primeiro leitor pega a flock compartilhada
+    # 2. Escritor espera os leitores saírem e pega a flock exclusiva
+    # 3. Reentrante para a thread que escreve (escrita dentro de escrita, leitura dentro de escrita)
+    # 4. O último leitor (ou o escritor) libera a flock
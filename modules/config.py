@@ -0,0 +1,79 @@
+import os
+from . import models
+
+# ================================================================================
+#                       CONFIGURAÇÃO (DIRETÓRIOS, TAMANHOS E ÍNDICE)
+# ================================================================================
+# Importar o pacote não cria diretórios nem calcula nada. Os caminhos e tamanhos
+# de models (FILE_APLICACOES, TAMANHO_HASH_TABLE...) são lidos daqui a cada acesso,
+# e a configuração padrão só é montada no primeiro deles:
+#
+#   config.configurar(diretorio_dados="/dados/base", tamanhos={"aplicacoes": 10**7})
+#   utils.configurar_base(diretorio_dados="/dados/base")   # idem, fechando os stores padrão
+#
+# Os diretórios são criados só quando algo vai ser gravado neles (garantir_diretorios),
+# e o primo do hash só é calculado quando um índice novo é criado (tamanho_hash).
+# Abrir uma base existente não depende de nenhum dos dois.
+
+DIRETORIO_DADOS = "files"
+DIRETORIO_LOGS = "Logs"
+# Registros gerados por tabela em utils.recriar_bases
+TAMANHOS_PADRAO = {"funcionarios": 50, "pacientes": 100, "vacinas": 20, "aplicacoes": 100}
+
+class Configuracao:
+    """Diretórios, tamanhos das bases e capacidade inicial do hash (derivados calculados sob demanda)."""
+
+    def __init__(self, diretorio_dados=DIRETORIO_DADOS, diretorio_logs=DIRETORIO_LOGS, tamanhos=None,
+                 tamanho_hash=None):
+        desconhecidas = set(tamanhos or ()) - set(TAMANHOS_PADRAO)
+        if desconhecidas:
+            raise ValueError(f"Erro: tamanhos só aceita as tabelas {tuple(TAMANHOS_PADRAO)}.")
+        self.diretorio_dados = diretorio_dados
+        self.diretorio_logs = diretorio_logs
+        self.tamanhos = {**TAMANHOS_PADRAO, **(tamanhos or {})}
+        # None = primo próximo ao dobro de tamanhos["aplicacoes"], calculado no primeiro uso
+        self._tamanho_hash = tamanho_hash
+        self._diretorios_prontos = False
+
+    def caminho_dados(self, nome):
+        return os.path.join(self.diretorio_dados, nome)
+
+    def caminho_log(self, nome):
+        return os.path.join(self.diretorio_logs, nome)
+
+    @property
+    def tamanho_hash(self):
+        # Capacidade inicial de um índice hash novo (para evitar muitas colisões)
+        if self._tamanho_hash is None:
+            self._tamanho_hash = models.find_closest_prime(2 * self.tamanhos["aplicacoes"])
+        return self._tamanho_hash
+
+    def garantir_diretorios(self):
+        # Cria os diretórios de dados e de logs (uma vez por configuração)
+        if not self._diretorios_prontos:
+            os.makedirs(self.diretorio_dados, exist_ok=True)
+            os.makedirs(self.diretorio_logs, exist_ok=True)
+            self._diretorios_prontos = True
+
+_atual = None
+
+def obter():
+    # Configuração em uso (a padrão é montada no primeiro acesso)
+    global _atual
+    if _atual is None:
+        _atual = Configuracao()
+    return _atual
+
+def configurar(configuracao=None, **opcoes):
+    # Troca a configuração: uma Configuracao pronta ou as opções de uma nova. Stores já
+    # abertos continuam nos arquivos antigos (utils.configurar_base também os fecha).
+    global _atual
+    _atual = configuracao or Configuracao(**opcoes)
+    return _atual
+
+# --- FLUXO DA CONFIGURAÇÃO ---
+# 1. import: nenhum diretório criado, nenhum primo calculado
+# 2. Primeiro acesso a models.FILE_* (ou config.obter()): Configuracao padrão ("files", "Logs")
+# 3. configurar(...) aponta tudo para outro diretório/tamanhos antes de abrir as bases
+# 4. Gravação (recriar_bases, stores novos, logs): garantir_diretorios()
+# 5. Índice hash novo: tamanho_hash calcula o primo uma vez
@@ -0,0 +1,163 @@
+import ctypes
+import os
+from array import array
+from . import models
+
+# ================================================================================
+#                       ESPAÇO LIVRE (PILHA DE EXCLUÍDOS EM MEMÓRIA)
+# ================================================================================
+# A pilha de excluídos é uma lista encadeada pelos próprios slots mortos do .dat (o
+# campo chave de cada um aponta para o próximo livre) com o topo em header.dat. Seguir
+# o encadeamento custa uma leitura por pop. Aqui a pilha inteira fica em memória
+# (array de endereços, topo no fim): um pop é um array.pop(), e o encadeamento no .dat
+# continua válido a cada mutação, como antes (mesmo formato, lido por versões antigas).
+#
+# Lotes (insert_many) pedem vários slots de uma vez. Entre os últimos JANELA_LOTE
+# endereços da pilha (ou FATOR_JANELA vezes o lote, se for maior) saem primeiro os trechos contíguos mais longos, para
+# que os registros novos sejam gravados com poucas escritas grandes. Só os nós cujo
+# "próximo" mudou são regravados (um por corte na pilha).
+#
+# Persistência preguiçosa: <tabela>_livres.dat guarda a pilha no close (com o topo e a
+# impressão do .dat), e a próxima abertura a usa sem percorrer o encadeamento. A
+# primeira mutação depois de gravado marca o arquivo como sujo.
+
+MAGIC_LIVRES = 0x4C565231 # "LVR1"
+VERSAO_LIVRES = 1
+# Candidatos de um lote: os endereços do topo da pilha (no mínimo esta quantidade)
+JANELA_LOTE = 1024
+FATOR_JANELA = 4
+TAMANHO_CABECALHO_LIVRES = ctypes.sizeof(models.CabecalhoLivres)
+
+class EspacoLivre:
+    """Pilha de slots livres em memória, com alocação em lote por trechos contíguos."""
+
+    def __init__(self, enderecos=()):
+        # Do fundo para o topo (o topo é o último)
+        self.pilha = array("i", enderecos)
+
+    def __len__(self):
+        return len(self.pilha)
+
+    @property
+    def topo(self):
+        return self.pilha[-1] if self.pilha else -1
+
+    def retirar(self):
+        # Pop do topo (LIFO, como a pilha no disco)
+        return self.pilha.pop()
+
+    def empilhar(self, endereco):
+        self.pilha.append(endereco)
+
+    def alocar(self, quantidade):
+        # Até `quantidade` slots livres, preferindo trechos contíguos. Retorna
+        # (endereços em ordem crescente, [(nó, novo próximo)] a regravar no .dat)
+        pilha = self.pilha
+        total = len(pilha)
+        if quantidade >= total:
+            # 1. A pilha inteira: nenhum nó fica para religar
+            enderecos = sorted(pilha)
+            del pilha[:]
+            return enderecos, []
+        if quantidade == 1:
+            # Um slot só: o topo, como no insert
+            return [pilha.pop()], []
+
+        # 2. Trechos contíguos entre os candidatos do topo, os mais longos primeiro
+        inicio = total - min(total, max(JANELA_LOTE, quantidade * FATOR_JANELA))
+        candidatos = sorted(pilha[inicio:])
+        trechos = []
+        comeco = 0
+        for indice in range(1, len(candidatos) + 1):
+            if indice == len(candidatos) or candidatos[indice] != candidatos[indice - 1] + 1:
+                trechos.append((candidatos[comeco], indice - comeco))
+                comeco = indice
+        trechos.sort(key=lambda trecho: -trecho[1])
+        escolhidos = set()
+        for primeiro, comprimento in trechos:
+            escolhidos.update(range(primeiro, primeiro + min(comprimento, quantidade - len(escolhidos))))
+            if len(escolhidos) == quantidade:
+                break
+
+        # 3. Os que ficam mantêm a ordem; quem perdeu o vizinho de baixo é religado
+        religacoes = []
+        restantes = array("i")
+        abaixo = pilha[inicio - 1] if inicio else -1
+        for posicao in range(inicio, total):
+            endereco = pilha[posicao]
+            if endereco in escolhidos:
+                continue
+            original = pilha[posicao - 1] if posicao else -1
+            if original != abaixo:
+                religacoes.append((endereco, abaixo))
+            restantes.append(endereco)
+            abaixo = endereco
+        pilha[inicio:] = restantes
+        return sorted(escolhidos), religacoes
+
+    def bitmap(self, total_registros):
+        # 1 bit por slot (usado pelo scan para pular os buracos)
+        livres = bytearray((total_registros + 7) // 8)
+        for endereco in self.pilha:
+            livres[endereco >> 3] |= 1 << (endereco & 7)
+        return livres
+
+def a_partir_dos_vivos(vivos, total_registros):
+    # Pilha remontada do índice: todo slot que nenhuma chave referencia está livre
+    # (topo = menor endereço, para o reuso começar pelo início do arquivo)
+    ocupados = bytearray(total_registros)
+    for endereco in vivos:
+        if 0 <= endereco < total_registros:
+            ocupados[endereco] = 1
+    return EspacoLivre(endereco for endereco in range(total_registros - 1, -1, -1) if not ocupados[endereco])
+
+# --- PERSISTÊNCIA ---
+
+def carregar(caminho, impressao, topo):
+    # Pilha gravada no close, se ainda vale (limpa, mesma impressão do .dat e mesmo topo do header).
+    # Retorna (EspacoLivre ou None, True se havia um arquivo que não vale mais)
+    if not os.path.exists(caminho):
+        return None, False
+    with open(caminho, "rb") as f_livres:
+        dados = f_livres.read()
+    if len(dados) < TAMANHO_CABECALHO_LIVRES:
+        return None, True
+    cabecalho = models.CabecalhoLivres.from_buffer_copy(dados)
+    if (cabecalho.magic != MAGIC_LIVRES or cabecalho.versao != VERSAO_LIVRES or cabecalho.limpo != 1
+            or (cabecalho.tamanho_dados, cabecalho.mtime_dados) != tuple(impressao) or cabecalho.topo != topo
+            or len(dados) != TAMANHO_CABECALHO_LIVRES + 4 * cabecalho.quantidade):
+        return None, True
+    espaco = EspacoLivre()
+    espaco.pilha.frombytes(dados[TAMANHO_CABECALHO_LIVRES:])
+    return espaco, False
+
+def gravar(caminho, espaco, impressao):
+    # Arquivo temporário completo (marcado limpo), fsync e os.replace
+    cabecalho = models.CabecalhoLivres(
+        magic=MAGIC_LIVRES, versao=VERSAO_LIVRES, limpo=1, quantidade=len(espaco.pilha), topo=espaco.topo,
+        tamanho_dados=impressao[0], mtime_dados=impressao[1])
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as f_livres:
+        f_livres.write(cabecalho)
+        f_livres.write(espaco.pilha.tobytes())
+        f_livres.flush()
+        os.fsync(f_livres.fileno())
+    os.replace(temporario, caminho)
+
+def marcar_sujo(caminho):
+    if not os.path.exists(caminho):
+        return
+    with open(caminho, "rb+") as f_livres:
+        f_livres.seek(models.CabecalhoLivres.limpo.offset)
+        f_livres.write(ctypes.c_int(0))
+        f_livres.flush()
+        os.fsync(f_livres.fileno())
+
+# --- FLUXO DO ESPAÇO LIVRE ---
+# 1. Abertura: <tabela>_livres.dat válido -> pilha em memória sem ler o .dat
+# 2. Arquivo sujo sem WAL (queda no meio): pilha remontada dos endereços do índice e o
+#    encadeamento do .dat regravado (o header pode ter ficado apontando para um slot reusado)
+# 3. Sem arquivo (ou com WAL/multiprocesso): encadeamento percorrido no primeiro uso
+# 4. insert: pop em memória; insert_many: alocar() por trechos contíguos + nós religados
+# 5. delete: nó gravado no .dat e empilhado em memória; topo no header no flush
+# 6. close: pilha gravada (temporário + fsync + replace)
@@ -0,0 +1,115 @@
+import csv
+import json
+import os
+import time
+
+# ================================================================================
+#                       EXPORTAÇÃO EM STREAMING (CSV, JSON LINES, TEXTO)
+# ================================================================================
+# Todas as exportações consomem o scan() da tabela (TabelaIndexada ou, para só ler
+# um arquivo, store.VarreduraDados): o .dat é lido em blocos grandes, só os registros
+# vivos são gerados e cada linha é escrita assim que é produzida. A memória usada não
+# depende do tamanho do arquivo (um bloco de dados, o bitmap de buracos e o buffer de
+# escrita). CSV e JSON Lines leem tuplas cruas do codec do modelo (scan(forma="tupla")),
+# sem um objeto ctypes por registro.
+#
+# Cada função retorna um resumo: registros, bytes lidos e escritos, tempo e MB/s
+# (bytes do .dat percorridos por segundo).
+
+FORMATOS = ("csv", "jsonl", "texto")
+# Buffer do arquivo de saída: poucas chamadas de write() mesmo com uma linha por registro
+BUFFER_SAIDA = 1024 * 1024
+
+def campos(struct_class):
+    return [nome for nome, _ in struct_class._fields_]
+
+# Modo de abertura do destino: o texto (log de dump) é acrescentado ao final do arquivo
+MODOS = {"csv": "w", "jsonl": "w", "texto": "a"}
+
+def escrever_cabecalho(f_saida, formato, nomes, titulo):
+    if formato == "csv":
+        csv.writer(f_saida).writerow(nomes)
+    elif formato == "texto":
+        f_saida.write(f"\n{'='*40}\nRELATÓRIO: {titulo}\n{'='*40}\n")
+
+def escrever_registros(f_saida, tabela, formato):
+    # Só as linhas dos registros vivos da tabela (sem cabeçalho/rodapé). Retorna quantos foram escritos.
+    contador = 0
+    nomes = tabela.codec.campos
+    decodificar = tabela.codec.valores
+    if formato == "csv":
+        escritor = csv.writer(f_saida)
+        for tupla in tabela.scan(forma="tupla"):
+            escritor.writerow(decodificar(tupla))
+            contador += 1
+    elif formato == "jsonl":
+        # Um objeto JSON por linha
+        for tupla in tabela.scan(forma="tupla"):
+            f_saida.write(json.dumps(dict(zip(nomes, decodificar(tupla))), ensure_ascii=False))
+            f_saida.write("\n")
+            contador += 1
+    else:
+        # Formato do log de dump (__str__ de cada registro)
+        for registro in tabela.scan():
+            f_saida.write(str(registro))
+            f_saida.write("\n")
+            contador += 1
+    return contador
+
+def escrever_rodape(f_saida, formato, contador):
+    if formato == "texto":
+        f_saida.write(f"\nTotal de registros: {contador}\n")
+
+def abrir_saida(destino, modo):
+    return open(destino, modo, encoding="utf-8", newline="", buffering=BUFFER_SAIDA)
+
+def resumo(registros, bytes_lidos, bytes_escritos, decorrido):
+    return {
+        "registros": registros,
+        "bytes_lidos": bytes_lidos,
+        "bytes_escritos": bytes_escritos,
+        "segundos": decorrido,
+        "mb_por_s": bytes_lidos / 1e6 / decorrido if decorrido else 0.0,
+    }
+
+def _exportar(tabela, destino, formato, titulo=None):
+    inicio = time.perf_counter()
+    modo = MODOS[formato]
+    tamanho_antes = os.path.getsize(destino) if modo == "a" and os.path.exists(destino) else 0
+    nomes = campos(tabela.struct_class)
+    with abrir_saida(destino, modo) as f_saida:
+        escrever_cabecalho(f_saida, formato, nomes, titulo)
+        registros = escrever_registros(f_saida, tabela, formato)
+        escrever_rodape(f_saida, formato, registros)
+    return resumo(registros, os.path.getsize(tabela.arquivo_dados),
+                  os.path.getsize(destino) - tamanho_antes, time.perf_counter() - inicio)
+
+def exportar_csv(tabela, destino):
+    # Uma linha de cabeçalho com os nomes dos campos e uma linha por registro vivo
+    return _exportar(tabela, destino, "csv")
+
+def exportar_jsonl(tabela, destino):
+    # Um objeto JSON por linha
+    return _exportar(tabela, destino, "jsonl")
+
+def exportar_texto(tabela, destino, titulo):
+    # Formato do log de dump (__str__ de cada registro), acrescentado ao final do arquivo
+    return _exportar(tabela, destino, "texto", titulo)
+
+def exportar(tabela, destino, formato="csv", titulo=None):
+    if formato not in FORMATOS:
+        raise ValueError(f"Erro: formato deve ser um de {FORMATOS}.")
+    if formato == "csv":
+        return exportar_csv(tabela, destino)
+    if formato == "jsonl":
+        return exportar_jsonl(tabela, destino)
+    return exportar_texto(tabela, destino, titulo or os.path.basename(tabela.arquivo_dados))
+
+# --- FLUXO DA EXPORTAÇÃO ---
+# 1. scan() lê o .dat em blocos e pula os buracos da pilha de excluídos
+# 2. Cada registro vivo vira uma linha (CSV, JSON ou __str__) no buffer de saída; CSV e
+#    JSON decodificam a tupla do codec em vez de criar um objeto ctypes
+# 3. O buffer vai para o disco a cada BUFFER_SAIDA bytes
+# 4. O resumo traz registros, bytes e MB/s
+# 5. Tabela particionada: cada partição escreve só os seus registros em um arquivo parcial,
+#    em paralelo, e as partes são juntadas entre cabeçalho e rodapé (particionamento.py)
@@ -0,0 +1,186 @@
+import ctypes
+import math
+import os
+from . import models
+
+# ================================================================================
+#                       FILTRO DE BLOOM DAS CHAVES (BUSCAS SEM ACERTO)
+# ================================================================================
+# Uma busca por chave inexistente percorre a cadeia de sondagem inteira no arquivo do
+# hash (ocupadas e lápides) até achar uma posição livre: é a busca mais cara. O filtro
+# fica em memória na frente do índice primário e responde "certamente não existe" sem
+# nenhuma leitura de arquivo; "talvez exista" segue para o índice.
+#
+# Cada chave incrementa `funcoes` contadores de 1 byte (em vez de bits), então remover
+# uma chave é decrementá-los: o filtro acompanha inserts e deletes. Um contador que
+# chega a 255 fica saturado (nunca mais decrementa), o que só pode gerar falsos
+# positivos, nunca falsos negativos.
+#
+# Tamanho para n chaves e taxa p de falsos positivos: m = -n ln p / (ln 2)^2 contadores
+# e k = (m / n) ln 2 funções (1% -> ~9,6 bytes e 7 posições por chave).
+#
+# Persistência: <tabela>_filtro.dat (CabecalhoFiltro + contadores) é gravado no close.
+# Ele só vale se estiver limpo (a primeira mutação depois de gravado zera a marca) e se
+# o .dat tiver o mesmo tamanho e mtime de quando foi gravado; senão é remontado a partir
+# das chaves do índice ao abrir.
+
+MAGIC_FILTRO = 0x464C5431 # "FLT1"
+VERSAO_FILTRO = 1
+TAXA_PADRAO = 0.01
+# Menor capacidade dimensionada (bases vazias ou pequenas não remontam a cada insert)
+CAPACIDADE_MINIMA = 1024
+SATURADO = 255
+_MASCARA_64 = 0xFFFFFFFFFFFFFFFF
+# Hash de Fibonacci (2^64 / razão áurea): uma multiplicação; os 32 bits altos dão a
+# posição inicial e os baixos o passo do double hashing
+_MULTIPLICADOR = 0x9E3779B97F4A7C15
+
+def validar_taxa(taxa):
+    if not 0 < taxa < 1:
+        raise ValueError("Erro: a taxa de falsos positivos do filtro deve estar entre 0 e 1.")
+    return taxa
+
+class FiltroBloom:
+    """Filtro de Bloom com contadores: diz quando uma chave certamente não existe e aceita remoções."""
+
+    def __init__(self, capacidade, taxa=TAXA_PADRAO, contadores=None, funcoes=None, chaves=0):
+        self.capacidade = max(int(capacidade), CAPACIDADE_MINIMA)
+        self.taxa = validar_taxa(taxa)
+        tamanho = math.ceil(-self.capacidade * math.log(self.taxa) / math.log(2) ** 2)
+        self.funcoes = funcoes or max(1, round(tamanho / self.capacidade * math.log(2)))
+        self.contadores = contadores if contadores is not None else bytearray(tamanho)
+        self._tamanho = len(self.contadores)
+        self._funcoes = range(self.funcoes)
+        self.chaves = chaves
+        # Consultas desde a abertura: descartes = ausências certas; falsos positivos são
+        # anotados por quem consultou o índice depois (TabelaIndexada)
+        self.consultas = 0
+        self.descartes = 0
+        self.falsos_positivos = 0
+
+    def _inicio(self, chave):
+        # Double hashing: posição inicial e passo (ímpar) das `funcoes` posições da chave
+        z = (chave * _MULTIPLICADOR) & _MASCARA_64
+        return (z >> 32) % self._tamanho, ((z & 0xFFFFFFFF) | 1) % self._tamanho or 1
+
+    def pode_conter(self, chave):
+        # False: a chave certamente não está na tabela (caminho de toda busca: sem chamadas extras)
+        self.consultas += 1
+        contadores = self.contadores
+        tamanho = self._tamanho
+        z = (chave * _MULTIPLICADOR) & _MASCARA_64
+        posicao = (z >> 32) % tamanho
+        passo = ((z & 0xFFFFFFFF) | 1) % tamanho or 1
+        for _ in self._funcoes:
+            if not contadores[posicao]:
+                self.descartes += 1
+                return False
+            posicao += passo
+            if posicao >= tamanho:
+                posicao -= tamanho
+        return True
+
+    def adicionar(self, chave):
+        contadores = self.contadores
+        tamanho = self._tamanho
+        posicao, passo = self._inicio(chave)
+        for _ in self._funcoes:
+            if contadores[posicao] < SATURADO:
+                contadores[posicao] += 1
+            posicao = (posicao + passo) % tamanho
+        self.chaves += 1
+
+    def remover(self, chave):
+        # Só para chaves que estavam na tabela (senão outros contadores seriam zerados)
+        contadores = self.contadores
+        tamanho = self._tamanho
+        posicao, passo = self._inicio(chave)
+        for _ in self._funcoes:
+            if 0 < contadores[posicao] < SATURADO:
+                contadores[posicao] -= 1
+            posicao = (posicao + passo) % tamanho
+        self.chaves -= 1
+
+    @property
+    def cheio(self):
+        # Passou da capacidade dimensionada: a taxa real sobe, hora de remontar maior
+        return self.chaves > self.capacidade
+
+    @property
+    def taxa_estimada(self):
+        # (1 - e^(-k n / m))^k com as chaves atuais
+        return (1 - math.exp(-self.funcoes * self.chaves / self._tamanho)) ** self.funcoes
+
+    def estatisticas(self):
+        negativas = self.descartes + self.falsos_positivos
+        return {
+            "taxa_configurada": self.taxa,
+            "taxa_estimada": self.taxa_estimada,
+            "taxa_observada": self.falsos_positivos / negativas if negativas else 0.0,
+            "chaves": self.chaves,
+            "capacidade": self.capacidade,
+            "contadores": self._tamanho,
+            "funcoes": self.funcoes,
+            "consultas": self.consultas,
+            "descartes": self.descartes,
+            "falsos_positivos": self.falsos_positivos,
+        }
+
+def montar(chaves, taxa=TAXA_PADRAO):
+    # Filtro com todas as chaves, dimensionado para o dobro delas (folga para inserts)
+    chaves = list(chaves)
+    filtro = FiltroBloom(2 * len(chaves), taxa)
+    for chave in chaves:
+        filtro.adicionar(chave)
+    return filtro
+
+# --- PERSISTÊNCIA ---
+
+TAMANHO_CABECALHO_FILTRO = ctypes.sizeof(models.CabecalhoFiltro)
+
+def carregar(caminho, impressao, taxa):
+    # Filtro gravado, se ainda vale para a base (limpo, mesma impressão do .dat e mesma taxa); senão None
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, "rb") as f_filtro:
+        dados = f_filtro.read()
+    if len(dados) < TAMANHO_CABECALHO_FILTRO:
+        return None
+    cabecalho = models.CabecalhoFiltro.from_buffer_copy(dados)
+    if (cabecalho.magic != MAGIC_FILTRO or cabecalho.versao != VERSAO_FILTRO or cabecalho.limpo != 1
+            or (cabecalho.tamanho_dados, cabecalho.mtime_dados) != tuple(impressao) or cabecalho.taxa != taxa
+            or len(dados) != TAMANHO_CABECALHO_FILTRO + cabecalho.contadores):
+        return None
+    return FiltroBloom(cabecalho.capacidade, cabecalho.taxa, bytearray(dados[TAMANHO_CABECALHO_FILTRO:]),
+                       cabecalho.funcoes, cabecalho.chaves)
+
+def gravar(caminho, filtro, impressao):
+    # Arquivo temporário completo (marcado limpo), fsync e os.replace: uma queda deixa o antigo
+    cabecalho = models.CabecalhoFiltro(
+        magic=MAGIC_FILTRO, versao=VERSAO_FILTRO, limpo=1, funcoes=filtro.funcoes,
+        contadores=len(filtro.contadores), capacidade=filtro.capacidade, chaves=filtro.chaves,
+        taxa=filtro.taxa, tamanho_dados=impressao[0], mtime_dados=impressao[1])
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as f_filtro:
+        f_filtro.write(cabecalho)
+        f_filtro.write(filtro.contadores)
+        f_filtro.flush()
+        os.fsync(f_filtro.fileno())
+    os.replace(temporario, caminho)
+
+def marcar_sujo(caminho):
+    # Primeira mutação depois do close: o arquivo deixa de valer até ser regravado
+    if not os.path.exists(caminho):
+        return
+    with open(caminho, "rb+") as f_filtro:
+        f_filtro.seek(models.CabecalhoFiltro.limpo.offset)
+        f_filtro.write(ctypes.c_int(0))
+        f_filtro.flush()
+        os.fsync(f_filtro.fileno())
+
+# --- FLUXO DO FILTRO ---
+# 1. Abertura: carrega <tabela>_filtro.dat se limpo e com a impressão do .dat; senão monta das chaves do índice
+# 2. get/delete/insert: pode_conter() == False responde sem ler o índice
+# 3. insert/delete mantêm os contadores; passou da capacidade, é remontado com o dobro
+# 4. Primeira mutação: o arquivo é marcado sujo (uma queda depois disso força a remontagem)
+# 5. close: regravado inteiro (temporário + fsync + replace) com a impressão atual do .dat
@@ -0,0 +1,130 @@
+import ctypes
+import os
+from array import array
+from . import concorrencia
+from . import models
+from . import utils_parte3
+
+# ================================================================================
+#                       ÍNDICES SECUNDÁRIOS (CAMPO -> VÁRIOS ENDEREÇOS)
+# ================================================================================
+# Cada índice secundário usa dois arquivos:
+#   <base>_<campo>_hash.dat   IndiceHash: valor do campo -> endereço da cabeça da lista
+#   <base>_<campo>_lista.dat  NoListaIndice por endereço físico (proximo, anterior)
+# Os registros com o mesmo valor formam uma lista duplamente encadeada pelos
+# próprios endereços físicos, então incluir e retirar um registro custa O(1).
+
+CAMPOS_SECUNDARIOS_APLICACAO = ("cod_paciente_fk", "cod_vacina_fk", "cod_funcionario_fk")
+
+TAMANHO_NO = ctypes.sizeof(models.NoListaIndice)
+
+def caminhos_indice(arquivo_dados, campo):
+    # Arquivos do índice secundário de um campo, ao lado do arquivo de dados
+    base = os.path.splitext(arquivo_dados)[0]
+    return f"{base}_{campo}_hash.dat", f"{base}_{campo}_lista.dat"
+
+def construir_indice_secundario(caminho_hash, caminho_lista, pares, total_enderecos,
+                                limite_carga=utils_parte3.LIMITE_CARGA_PADRAO):
+    # Monta listas e cabeças em memória e grava cada arquivo em uma passada.
+    # pares: iterável de (endereço físico, valor do campo) dos registros vivos.
+    nos = array("i", [-1]) * (2 * total_enderecos) # [proximo, anterior] por endereço
+    cabecas = {}
+
+    # 1. Cada registro novo entra na frente da lista do seu valor
+    for endereco_fisico, valor in pares:
+        cabeca = cabecas.get(valor)
+        if cabeca is not None:
+            nos[2 * endereco_fisico] = cabeca
+            nos[2 * cabeca + 1] = endereco_fisico
+        cabecas[valor] = endereco_fisico
+
+    # 2. Lista inteira em uma escrita, com troca atômica
+    temporario = caminho_lista + ".tmp"
+    with open(temporario, "wb") as f:
+        f.write(nos)
+    os.replace(temporario, caminho_lista)
+
+    # 3. Cabeças: valor -> endereço da cabeça
+    utils_parte3.construir_tabela_hash(caminho_hash, list(cabecas.keys()), limite_carga,
+                                       enderecos=list(cabecas.values()))
+
+class IndiceSecundario:
+    """Índice de um campo não único: valor -> todos os endereços físicos com esse valor."""
+
+    def __init__(self, campo, caminho_hash, caminho_lista, usar_mmap=False, cache=None):
+        self.campo = campo
+        self.caminho_lista = caminho_lista
+        self.cabecas = utils_parte3.IndiceHash(caminho_hash, usar_mmap=usar_mmap, cache=cache)
+        if not os.path.exists(caminho_lista):
+            open(caminho_lista, "wb").close()
+        self._f_lista = cache.abrir(caminho_lista) if cache is not None else open(caminho_lista, "rb+")
+        self._ler_em = concorrencia.leitor(self._f_lista)
+
+    # --- NÓS DA LISTA ---
+
+    def _ler_no(self, endereco_fisico):
+        no = models.NoListaIndice.from_buffer_copy(self._ler_em(endereco_fisico * TAMANHO_NO, TAMANHO_NO))
+        return no.proximo, no.anterior
+
+    def _gravar_no(self, endereco_fisico, proximo, anterior):
+        # Gravar além do fim estende o arquivo (registro novo no fim dos dados)
+        concorrencia.gravar_em(self._f_lista, endereco_fisico * TAMANHO_NO, models.NoListaIndice(proximo, anterior))
+
+    # --- OPERAÇÕES ---
+
+    def adicionar(self, valor, endereco_fisico):
+        # 1. O registro vira a nova cabeça da lista do valor
+        cabeca = self.cabecas.buscar(valor)
+        self._gravar_no(endereco_fisico, cabeca, -1)
+
+        if cabeca == -1:
+            # 2. Primeiro registro com esse valor
+            self.cabecas.inserir(valor, endereco_fisico)
+        else:
+            # 3. A cabeça antiga passa a apontar de volta para o novo registro
+            proximo, _ = self._ler_no(cabeca)
+            self._gravar_no(cabeca, proximo, endereco_fisico)
+            self.cabecas.atualizar(valor, endereco_fisico)
+
+    def remover(self, valor, endereco_fisico):
+        proximo, anterior = self._ler_no(endereco_fisico)
+
+        # 1. Religa o anterior (ou a cabeça no hash) ao próximo
+        if anterior == -1:
+            if proximo == -1:
+                self.cabecas.remover(valor)
+            else:
+                self.cabecas.atualizar(valor, proximo)
+        else:
+            _, anterior_do_anterior = self._ler_no(anterior)
+            self._gravar_no(anterior, proximo, anterior_do_anterior)
+
+        # 2. Religa o próximo ao anterior
+        if proximo != -1:
+            proximo_do_proximo, _ = self._ler_no(proximo)
+            self._gravar_no(proximo, proximo_do_proximo, anterior)
+
+        # 3. O nó do endereço liberado fica isolado
+        self._gravar_no(endereco_fisico, -1, -1)
+
+    def enderecos(self, valor):
+        # Gera os endereços físicos dos registros com o valor (mais recentes primeiro)
+        endereco_fisico = self.cabecas.buscar(valor)
+        while endereco_fisico != -1:
+            yield endereco_fisico
+            endereco_fisico, _ = self._ler_no(endereco_fisico)
+
+    def flush(self):
+        self.cabecas.flush()
+        self._f_lista.flush()
+
+    def close(self):
+        self.cabecas.close()
+        self._f_lista.close()
+
+    # --- FLUXO DO ÍNDICE SECUNDÁRIO ---
+    # 1. Hash de cabeças: valor -> endereço do registro mais recente com esse valor
+    # 2. Lista por endereço físico: proximo/anterior entre registros de mesmo valor
+    # 3. adicionar: insere na frente da lista (O(1))
+    # 4. remover: desliga o nó da lista (O(1)), atualizando a cabeça se preciso
+    # 5. enderecos: percorre a lista a partir da cabeça
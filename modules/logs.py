@@ -0,0 +1,150 @@
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+
+# ================================================================================
+#                       LOG DO MOTOR (NÍVEIS, SILENCIOSO POR PADRÃO)
+# ================================================================================
+# Toda saída do motor passa pelo logging da biblioteca padrão, sob o logger do
+# pacote ("modules"). Sem configuração nada é escrito: o logger do pacote tem só
+# um NullHandler. As mensagens usam formatação preguiçosa ("... %s", valor), então
+# com o nível desligado a chamada custa só o teste de nível.
+#
+#   logs.configurar("DEBUG")                          # stderr, texto
+#   logs.configurar("INFO", destino="Logs/motor.log", formato="json", assincrono=True)
+#   logs.desativar()
+#
+# Níveis usados:
+#   DEBUG    rastreio por operação (inserção, busca, remoção)
+#   INFO     progresso de cargas, exportações, compactação e resumos de lotes
+#   WARNING  chaves duplicadas, IDs inexistentes, recuperação após queda
+#   ERROR    uso incorreto (arquivo fechado)
+#
+# Com assincrono=True o motor só enfileira o registro; formatação e E/S ficam na
+# thread de um QueueListener, então ligar o DEBUG não segura o motor na escrita.
+# logging.handlers e queue só são importados nesse caso (importar o pacote fica barato).
+
+PACOTE = __name__.rpartition(".")[0] or __name__
+
+FORMATOS = ("simples", "texto", "json")
+_FORMATO_TEXTO = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+_raiz = logging.getLogger(PACOTE)
+_raiz.addHandler(logging.NullHandler())
+
+_trava = threading.Lock()
+# (manipulador instalado no logger do pacote, QueueListener ou None)
+_configuracao = None
+
+def obter(nome):
+    # Logger de um módulo do pacote (obter(__name__))
+    return logging.getLogger(nome)
+
+class FormatoJson(logging.Formatter):
+    """Um objeto JSON por linha: instante, nível, origem e mensagem."""
+
+    def format(self, record):
+        dados = {
+            "instante": record.created,
+            "nivel": record.levelname,
+            "origem": record.name,
+            "mensagem": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            dados["excecao"] = record.exc_text
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+class ManipuladorFila(logging.Handler):
+    """Enfileira o registro sem formatar: a mensagem é montada na thread do QueueListener."""
+
+    def __init__(self, fila):
+        super().__init__()
+        self.fila = fila
+
+    def prepare(self, record):
+        # A exceção (traceback) não sobrevive até a outra thread: vira texto aqui
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            self.fila.put_nowait(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+def _formatador(formato):
+    if formato == "json":
+        return FormatoJson()
+    if formato == "texto":
+        return logging.Formatter(_FORMATO_TEXTO)
+    if formato == "simples":
+        return logging.Formatter("%(message)s")
+    raise ValueError(f"formato deve ser um de {FORMATOS}")
+
+def configurar(nivel="INFO", destino=None, formato="texto", assincrono=False):
+    # Liga a saída do motor no nivel dado. destino: caminho de arquivo, stream (sys.stdout...)
+    # ou None (stderr). Substitui a configuração anterior feita por aqui.
+    global _configuracao
+    formatador = _formatador(formato)
+    if isinstance(destino, str):
+        if os.path.dirname(destino):
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+        saida = logging.FileHandler(destino, encoding="utf-8")
+    else:
+        saida = logging.StreamHandler(destino if destino is not None else sys.stderr)
+    saida.setFormatter(formatador)
+
+    ouvinte = None
+    manipulador = saida
+    if assincrono:
+        from logging.handlers import QueueListener
+        from queue import SimpleQueue
+        fila = SimpleQueue()
+        ouvinte = QueueListener(fila, saida)
+        manipulador = ManipuladorFila(fila)
+
+    with _trava:
+        _remover_configuracao()
+        _raiz.setLevel(nivel.upper() if isinstance(nivel, str) else nivel)
+        _raiz.addHandler(manipulador)
+        if ouvinte is not None:
+            ouvinte.start()
+        _configuracao = (manipulador, ouvinte)
+    return _raiz
+
+def desativar():
+    # Remove a configuração feita por configurar() (esvazia a fila antes) e volta ao silêncio
+    with _trava:
+        _remover_configuracao()
+        _raiz.setLevel(logging.NOTSET)
+
+# A thread do QueueListener é daemon: na saída do interpretador a fila é esvaziada aqui
+atexit.register(desativar)
+
+def _remover_configuracao():
+    global _configuracao
+    if _configuracao is None:
+        return
+    manipulador, ouvinte = _configuracao
+    _raiz.removeHandler(manipulador)
+    if ouvinte is not None:
+        # stop() grava o que ainda está na fila e encerra a thread
+        ouvinte.stop()
+        for handler in ouvinte.handlers:
+            handler.close()
+    manipulador.close()
+    _configuracao = None
+
+# --- FLUXO DO LOG ---
+# 1. Cada módulo do motor usa log = logs.obter(__name__) (filho do logger do pacote)
+# 2. Sem configurar(): NullHandler, nada é escrito e as mensagens nem são formatadas
+# 3. configurar(nivel, destino, formato): texto, "simples" (só a mensagem) ou JSON por linha
+# 4. assincrono=True: o motor enfileira; o QueueListener formata e escreve em outra thread
+# 5. desativar() (ou configurar de novo) esvazia a fila e remove o manipulador
@@ -0,0 +1,201 @@
+import functools
+import json
+import threading
+import time
+
+# ================================================================================
+#                       MÉTRICAS (CONTADORES, HISTOGRAMAS E DESPEJO PERIÓDICO)
+# ================================================================================
+# Instrumentação dos caminhos quentes, desligada por padrão. Cada ponto medido testa
+# apenas metricas.ativo antes de registrar qualquer coisa, então com ela desligada o
+# custo é uma leitura de atributo por operação.
+#
+#   metricas.ativar()
+#   ... operações ...
+#   metricas.stats()    # {"contadores": {...}, "histogramas": {...}}
+#
+# Contadores:
+#   hash.buscas / hash.insercoes           operações no índice hash
+#   hash.sondagens_busca / _insercao       posições visitadas (somadas)
+#   hash.lapides_percorridas               lápides atravessadas nas sondagens
+#   pilha.pops / pilha.pushes              uso da pilha de excluídos
+#   pilha.religacoes                       nós da pilha regravados por insert_many (cortes na pilha)
+#   filtro.descartes / falsos_positivos    chaves ausentes barradas pelo filtro / que passaram por ele
+#   es.leituras / es.escritas              chamadas de leitura/escrita que chegam ao sistema
+#   es.bytes_lidos / es.bytes_escritos     (arquivos comuns e faltas/descargas do cache)
+#   es.chamadas_sistema                    seek + read/write contados separadamente
+# Histogramas (potências de 2): sondagens por busca/inserção e latência (ns) das
+# operações de utils (latencia.<função>).
+
+ativo = False
+# Intervalo padrão (segundos) do despejo periódico
+INTERVALO_DESPEJO = 10.0
+
+class Histograma:
+    """Histograma com baldes em potências de 2 (percentis aproximados pelo limite do balde)."""
+
+    def __init__(self):
+        self.baldes = [0] * 65
+        self.contagem = 0
+        self.soma = 0
+        self.minimo = None
+        self.maximo = 0
+
+    def registrar(self, valor):
+        # Balde b guarda os valores com bit_length == b (0, 1, 2-3, 4-7, ...)
+        self.baldes[min(int(valor).bit_length(), 64)] += 1
+        self.contagem += 1
+        self.soma += valor
+        if self.minimo is None or valor < self.minimo:
+            self.minimo = valor
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def percentil(self, fracao):
+        # Limite superior do balde que contém o percentil (nunca acima do máximo visto)
+        alvo = fracao * self.contagem
+        acumulado = 0
+        for balde, quantidade in enumerate(self.baldes):
+            acumulado += quantidade
+            if quantidade and acumulado >= alvo:
+                return min((1 << balde) - 1, self.maximo)
+        return self.maximo
+
+    def resumo(self):
+        if not self.contagem:
+            return {"contagem": 0}
+        return {
+            "contagem": self.contagem,
+            "media": self.soma / self.contagem,
+            "min": self.minimo,
+            "max": self.maximo,
+            "p50": self.percentil(0.50),
+            "p90": self.percentil(0.90),
+            "p99": self.percentil(0.99),
+            # limite superior do balde -> quantidade (só os baldes usados)
+            "baldes": {(1 << balde) - 1: quantidade for balde, quantidade in enumerate(self.baldes) if quantidade},
+        }
+
+_trava = threading.Lock()
+_contadores = {}
+_histogramas = {}
+
+# --- LIGAR / DESLIGAR ---
+
+def ativar():
+    global ativo
+    ativo = True
+
+def desativar():
+    global ativo
+    ativo = False
+
+def zerar():
+    with _trava:
+        _contadores.clear()
+        _histogramas.clear()
+
+# --- REGISTRO (só chamado com ativo == True) ---
+
+def contar(nome, valor=1):
+    with _trava:
+        _contadores[nome] = _contadores.get(nome, 0) + valor
+
+def observar(nome, valor):
+    with _trava:
+        histograma = _histogramas.get(nome)
+        if histograma is None:
+            histograma = _histogramas[nome] = Histograma()
+        histograma.registrar(valor)
+
+# operação no índice hash -> (contador de operações, soma das sondagens, histograma)
+_NOMES_SONDAGEM = {
+    "busca": ("hash.buscas", "hash.sondagens_busca", "hash.sondagens_por_busca"),
+    "insercao": ("hash.insercoes", "hash.sondagens_insercao", "hash.sondagens_por_insercao"),
+}
+
+def sondagem(operacao, sondagens, lapides):
+    # operacao: "busca" ou "insercao" no índice hash
+    operacoes, soma, nome_histograma = _NOMES_SONDAGEM[operacao]
+    with _trava:
+        for nome, valor in ((operacoes, 1), (soma, sondagens), ("hash.lapides_percorridas", lapides)):
+            _contadores[nome] = _contadores.get(nome, 0) + valor
+        histograma = _histogramas.get(nome_histograma)
+        if histograma is None:
+            histograma = _histogramas[nome_histograma] = Histograma()
+        histograma.registrar(sondagens)
+
+def es(leituras=0, bytes_lidos=0, escritas=0, bytes_escritos=0, chamadas=0):
+    # E/S que chega ao sistema operacional
+    with _trava:
+        for nome, valor in (("es.leituras", leituras), ("es.bytes_lidos", bytes_lidos),
+                            ("es.escritas", escritas), ("es.bytes_escritos", bytes_escritos),
+                            ("es.chamadas_sistema", chamadas)):
+            if valor:
+                _contadores[nome] = _contadores.get(nome, 0) + valor
+
+def medir(nome):
+    # Decorador: latência (ns) de cada chamada em latencia.<nome>, só com as métricas ativas
+    chave = f"latencia.{nome}"
+
+    def decorar(funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            if not ativo:
+                return funcao(*args, **kwargs)
+            inicio = time.perf_counter_ns()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                observar(chave, time.perf_counter_ns() - inicio)
+        return medida
+    return decorar
+
+# --- CONSULTA ---
+
+def stats():
+    with _trava:
+        return {
+            "ativo": ativo,
+            "contadores": dict(sorted(_contadores.items())),
+            "histogramas": {nome: histograma.resumo() for nome, histograma in sorted(_histogramas.items())},
+        }
+
+# --- DESPEJO PERIÓDICO ---
+
+class Despejo:
+    """Thread que acrescenta um JSON por linha com as métricas a cada intervalo."""
+
+    def __init__(self, caminho, intervalo=INTERVALO_DESPEJO, fonte=None):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.fonte = fonte or stats
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name="metricas-despejo", daemon=True)
+        self._thread.start()
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            self.despejar()
+
+    def despejar(self):
+        linha = json.dumps({"instante": time.time(), **self.fonte()}, default=str)
+        with open(self.caminho, "a", encoding="utf-8") as f:
+            f.write(linha + "\n")
+
+    def parar(self):
+        # Para a thread e grava um último despejo
+        self._parar.set()
+        self._thread.join()
+        self.despejar()
+
+def iniciar_despejo(caminho, intervalo=INTERVALO_DESPEJO, fonte=None):
+    # Liga as métricas e despeja stats() (ou fonte()) em caminho a cada intervalo segundos
+    ativar()
+    return Despejo(caminho, intervalo, fonte)
+
+# --- FLUXO DAS MÉTRICAS ---
+# 1. Desligadas: cada ponto medido só testa metricas.ativo
+# 2. ativar(): sondagens, lápides, pilha, E/S e latências passam a ser registradas
+# 3. stats() devolve contadores e resumos dos histogramas (p50/p90/p99)
+# 4. iniciar_despejo() grava stats() periodicamente em JSON Lines
@@ -1,6 +1,10 @@
 import ctypes
 import math
 import os
+from . import config
+from . import logs
+
+log = logs.obter(__name__)
 
 # --- ESTRUTURAS ---
 
@@ -115,6 +119,88 @@ class RegistroHash(ctypes.Structure):
         ("estado", ctypes.c_int)          # 0=Livre, 1=Ocupado, 2=Removido
     ]
 
+class NoListaIndice(ctypes.Structure):
+    # Nó da lista de um índice secundário. A posição do nó no arquivo é o próprio
+    # endereço físico do registro, e ele liga os registros com o mesmo valor de campo.
+    _fields_ = [
+        ("proximo", ctypes.c_int),  # Endereço do próximo registro com o mesmo valor (-1 = fim)
+        ("anterior", ctypes.c_int)  # Endereço do anterior (-1 = este é a cabeça da lista)
+    ]
+
+class CabecalhoHash(ctypes.Structure):
+    # Cabeçalho gravado no início de aplicacoes_hash.dat (antes das posições)
+    _fields_ = [
+        ("magic", ctypes.c_int),           # Identifica o formato com cabeçalho
+        ("versao", ctypes.c_int),          # Versão do formato do índice
+        ("capacidade", ctypes.c_int),      # Número de posições da tabela
+        ("ocupados", ctypes.c_int),        # Posições com estado 1
+        ("removidos", ctypes.c_int),       # Lápides (estado 2)
+        ("cursor_rehash", ctypes.c_int),   # Próxima posição da tabela antiga a migrar (-1 = sem rehash)
+        ("limite_carga", ctypes.c_double), # (ocupados + removidos) / capacidade que dispara o crescimento
+        ("sondagem", ctypes.c_int),        # Esquema de sondagem (0 = linear; ver utils_parte3.SONDAGENS)
+        ("funcao_hash", ctypes.c_int),     # Função da posição inicial (0 = módulo; ver utils_parte3.FUNCOES_HASH)
+        ("reservado", ctypes.c_int * 6)    # Espaço para campos futuros sem mudar o tamanho
+    ]
+
+class CabecalhoFiltro(ctypes.Structure):
+    # Cabeçalho de <tabela>_filtro.dat (filtro de Bloom das chaves do índice primário), antes dos contadores
+    _fields_ = [
+        ("magic", ctypes.c_int),
+        ("versao", ctypes.c_int),
+        ("limpo", ctypes.c_int),             # 1 = gravado no close; 0 = a base mudou depois (remontar)
+        ("funcoes", ctypes.c_int),           # Posições (contadores) por chave
+        ("contadores", ctypes.c_int),        # Tamanho do vetor de contadores (1 byte cada)
+        ("capacidade", ctypes.c_int),        # Chaves para as quais a taxa foi dimensionada
+        ("chaves", ctypes.c_int),            # Chaves presentes
+        ("reservado", ctypes.c_int),
+        ("taxa", ctypes.c_double),           # Taxa de falsos positivos pedida
+        ("tamanho_dados", ctypes.c_longlong),  # Tamanho do .dat quando o filtro foi gravado
+        ("mtime_dados", ctypes.c_longlong)     # st_mtime_ns do .dat (outra escrita na base invalida o filtro)
+    ]
+
+class CabecalhoLivres(ctypes.Structure):
+    # Cabeçalho de <tabela>_livres.dat (pilha de excluídos em memória), antes dos endereços (int cada)
+    _fields_ = [
+        ("magic", ctypes.c_int),
+        ("versao", ctypes.c_int),
+        ("limpo", ctypes.c_int),             # 1 = gravado no close; 0 = a base mudou depois
+        ("quantidade", ctypes.c_int),        # Endereços na pilha (do fundo para o topo)
+        ("topo", ctypes.c_int),              # Topo gravado em header.dat junto (conferido ao abrir)
+        ("reservado", ctypes.c_int),
+        ("tamanho_dados", ctypes.c_longlong),  # Tamanho do .dat quando a pilha foi gravada
+        ("mtime_dados", ctypes.c_longlong)     # st_mtime_ns do .dat
+    ]
+
+# --- ÁRVORE B+ (PÁGINAS DE TAMANHO FIXO) ---
+
+TAMANHO_PAGINA_BMAIS = 4096
+# Chaves por página: 4 ints de cabeçalho + ORDEM chaves + (ORDEM + 1) valores cabem na página
+ORDEM_BMAIS = (TAMANHO_PAGINA_BMAIS - 5 * ctypes.sizeof(ctypes.c_int)) // (2 * ctypes.sizeof(ctypes.c_int))
+
+class PaginaBMais(ctypes.Structure):
+    # Folha: valores[i] = endereço físico de chaves[i]; proxima = folha seguinte (-1 = última)
+    # Interna: valores[i] = página filha com as chaves < chaves[i] (valores[quantidade] = resto)
+    _fields_ = [
+        ("folha", ctypes.c_int),                         # 1 = folha, 0 = interna
+        ("quantidade", ctypes.c_int),                    # Chaves em uso
+        ("proxima", ctypes.c_int),                       # Encadeamento das folhas
+        ("reservado", ctypes.c_int),
+        ("chaves", ctypes.c_int * ORDEM_BMAIS),
+        ("valores", ctypes.c_int * (ORDEM_BMAIS + 1)),
+        ("preenchimento", ctypes.c_char * (TAMANHO_PAGINA_BMAIS - (2 * ORDEM_BMAIS + 5) * ctypes.sizeof(ctypes.c_int)))
+    ]
+
+class CabecalhoBMais(ctypes.Structure):
+    # Gravado na página 0 do arquivo da árvore
+    _fields_ = [
+        ("magic", ctypes.c_int),
+        ("versao", ctypes.c_int),
+        ("raiz", ctypes.c_int),           # Número da página raiz
+        ("total_paginas", ctypes.c_int),  # Inclui a página 0 (cabeçalho)
+        ("total_chaves", ctypes.c_int),
+        ("altura", ctypes.c_int)          # 1 = raiz é folha
+    ]
+
 def is_prime(n):
     # Checa se um número é primo
     if n <= 1:
@@ -145,10 +231,12 @@ class Header(ctypes.Structure):
 
 def inicializar_header():
     # Cria o arquivo header com a pilha vazia (-1)
-    if not os.path.exists(FILE_HEADER):
-        print("Inicializando Header da Pilha de Excluídos...")
-        h = Header(topo=-1)
-        with open(FILE_HEADER, "wb") as f:
+    arquivo_header = valor_configurado("FILE_HEADER")
+    if not os.path.exists(arquivo_header):
+        log.info("Inicializando Header da Pilha de Excluídos...")
+        config.obter().garantir_diretorios()
+        h = Header(topo_pilha=-1)
+        with open(arquivo_header, "wb") as f:
             f.write(h)
 
 # --- CONSTANTES ---
@@ -158,32 +246,43 @@ RECORD_SIZE_PAC = ctypes.sizeof(Paciente)
 RECORD_SIZE_VAC = ctypes.sizeof(Vacina)
 RECORD_SIZE_APLIC = ctypes.sizeof(AplicacaoVacina)
 
-FILE_PATH = "files"
-LOGS_PATH = "Logs"
+# Caminhos e tamanhos vêm de config.py, resolvidos a cada acesso (models.FILE_HASH...):
+# importar models não cria diretórios nem calcula o primo do hash.
+#   1. Caminho da base
+#   2. Tamanho da base em registros
+_CONFIGURADOS = {
+    "FILE_PATH": lambda c: c.diretorio_dados,
+    "LOGS_PATH": lambda c: c.diretorio_logs,
+
+    "FILE_FUNCIONARIOS": lambda c: c.caminho_dados("funcionarios.dat"),
+    "FILE_FUNCIONARIOS_SIZE": lambda c: c.tamanhos["funcionarios"],
 
-# Garante diretórios
-os.makedirs(FILE_PATH, exist_ok=True)
-os.makedirs(LOGS_PATH, exist_ok=True)
+    "FILE_PACIENTES": lambda c: c.caminho_dados("pacientes.dat"),
+    "FILE_PACIENTES_SIZE": lambda c: c.tamanhos["pacientes"],
 
-# 1. Caminho da base
-# 2. Tamanho da base em registros
+    "FILE_VACINAS": lambda c: c.caminho_dados("vacinas.dat"),
+    "FILE_VACINAS_SIZE": lambda c: c.tamanhos["vacinas"],
 
-FILE_FUNCIONARIOS = os.path.join(FILE_PATH, "funcionarios.dat")
-FILE_FUNCIONARIOS_SIZE = 50
+    "FILE_APLICACOES": lambda c: c.caminho_dados("aplicacoes.dat"),
+    "FILE_APLICACOES_SIZE": lambda c: c.tamanhos["aplicacoes"],
 
-FILE_PACIENTES = os.path.join(FILE_PATH, "pacientes.dat")
-FILE_PACIENTES_SIZE = 100
+    "FILE_HASH": lambda c: c.caminho_dados("aplicacoes_hash.dat"),
+    # Primo próximo ao dobro do tamanho de aplicacoes.dat (para evitar muitas colisões)
+    "TAMANHO_HASH_TABLE": lambda c: c.tamanho_hash,
 
-FILE_VACINAS = os.path.join(FILE_PATH, "vacinas.dat")
-FILE_VACINAS_SIZE = 20
+    "FILE_HEADER": lambda c: c.caminho_dados("header.dat"),
 
-FILE_APLICACOES = os.path.join(FILE_PATH, "aplicacoes.dat")
-FILE_APLICACOES_SIZE = 100
+    # Índice primário alternativo (árvore B+), usado quando o store é aberto com tipo_indice="bmais"
+    "FILE_BMAIS": lambda c: c.caminho_dados("aplicacoes_bmais.dat"),
 
-FILE_HASH = os.path.join(FILE_PATH, "aplicacoes_hash.dat")
-# Primo próximo ao dobro do tamanho de aplicacoes.dat (para evitar muitas colisões)
-TAMANHO_HASH_TABLE = find_closest_prime(2*FILE_APLICACOES_SIZE)
+    "LOG_DUMP": lambda c: c.caminho_log("dump_base.txt"),
+}
 
-FILE_HEADER = os.path.join(FILE_PATH, "header.dat")
+def valor_configurado(nome):
+    return _CONFIGURADOS[nome](config.obter())
 
-LOG_DUMP = os.path.join(LOGS_PATH, "dump_base.txt")
\ No newline at end of file
+def __getattr__(nome):
+    # Só é chamado para nomes que não existem no módulo (ex.: models.FILE_APLICACOES)
+    if nome in _CONFIGURADOS:
+        return valor_configurado(nome)
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
@@ -0,0 +1,373 @@
+import concurrent.futures
+import contextlib
+import glob
+import heapq
+import itertools
+import json
+import os
+import shutil
+import struct
+import time
+from . import exportacao
+from . import logs
+from . import store
+
+log = logs.obter(__name__)
+
+# ================================================================================
+#                       TABELAS PARTICIONADAS (SHARDS POR CHAVE % N)
+# ================================================================================
+# Uma tabela particionada são N TabelaIndexada completas (dados, header, índice
+# primário e secundários), uma por partição, com a chave na partição chave % N:
+#
+#   files/aplicacoes.p00.dat, files/aplicacoes.p00_hash.dat, ...   partição 0
+#   files/aplicacoes.p01.dat, ...                                   partição 1
+#   files/aplicacoes_particoes.json                                 N (manifesto)
+#
+# Operações pontuais (get, insert, delete e os lotes) vão direto à partição da
+# chave, no próprio processo. O trabalho que percorre a tabela inteira (carga em
+# lote, agregações sobre o scan, exportação e compactação) roda em um
+# ProcessPoolExecutor com uma tarefa por partição: cada processo abre só os
+# arquivos da sua partição, então o ganho cresce com o número de núcleos.
+#
+#   particionamento.carregar_em_paralelo(gerador, models.AplicacaoVacina, "cod_aplicacao",
+#                                        "files/aplicacoes.dat", particoes=16)
+#   with TabelaParticionada(models.AplicacaoVacina, "cod_aplicacao", "files/aplicacoes.dat") as t:
+#       t.get(10)
+#       t.exportar("Logs/aplicacoes.csv")
+
+# Partições de uma tabela nova quando nenhuma quantidade é pedida
+PARTICOES_PADRAO = os.cpu_count() or 1
+
+def caminho_particao(caminho, particao):
+    # "aplicacoes.dat" -> "aplicacoes.p03.dat" (os demais arquivos da partição derivam deste)
+    base, extensao = os.path.splitext(caminho)
+    return f"{base}.p{particao:02d}{extensao}"
+
+def caminho_manifesto(arquivo_dados):
+    return os.path.splitext(arquivo_dados)[0] + "_particoes.json"
+
+def arquivos_particao(arquivo_dados, particao):
+    # Todos os arquivos de uma partição: dados, índices, header, log, trava...
+    base = glob.escape(os.path.splitext(caminho_particao(arquivo_dados, particao))[0])
+    return glob.glob(base + ".*") + glob.glob(base + "_*")
+
+def ler_particoes(arquivo_dados):
+    # Número de partições gravado no manifesto (None: a tabela não é particionada)
+    try:
+        with open(caminho_manifesto(arquivo_dados), encoding="utf-8") as f:
+            return json.load(f)["particoes"]
+    except FileNotFoundError:
+        return None
+
+def _gravar_manifesto(arquivo_dados, particoes):
+    caminho = caminho_manifesto(arquivo_dados)
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"particoes": particoes}, f)
+    os.replace(caminho + ".tmp", caminho)
+
+def particao_da_chave(chave, particoes):
+    return chave % particoes
+
+def _validar_particoes(particoes):
+    if not isinstance(particoes, int) or particoes < 1:
+        raise ValueError("Erro: particoes deve ser um inteiro >= 1.")
+
+def _executar(funcao, argumentos, trabalhadores=None):
+    # Uma tarefa por partição em um ProcessPoolExecutor; resultados na ordem das partições.
+    # Com uma tarefa só (ou trabalhadores=1) roda no próprio processo.
+    argumentos = list(argumentos)
+    trabalhadores = min(len(argumentos), trabalhadores or len(argumentos))
+    if trabalhadores <= 1:
+        return [funcao(*argumento) for argumento in argumentos]
+    # (concurrent.futures só carrega o módulo de processos neste primeiro acesso)
+    with concurrent.futures.ProcessPoolExecutor(trabalhadores) as executor:
+        futuros = [executor.submit(funcao, *argumento) for argumento in argumentos]
+        return [futuro.result() for futuro in futuros]
+
+# --- TAREFAS DOS PROCESSOS TRABALHADORES ---
+# Funções de módulo (vão para outro processo). definicao = (struct, campo chave, arquivo de
+# dados, campos secundários, opções da TabelaIndexada sem o cache, que fica no processo pai)
+
+def _abrir_particao(definicao, particao):
+    struct_class, campo_chave, arquivo_dados, campos_secundarios, opcoes = definicao
+    return store.TabelaIndexada(struct_class, campo_chave, caminho_particao(arquivo_dados, particao),
+                                campos_secundarios=campos_secundarios, **opcoes)
+
+def _conferir_particao(linhas, struct_class, campo_chave, particao, particoes):
+    # Repassa as linhas do gerador, recusando chaves de outra partição (seriam inalcançáveis)
+    posicao_chave = [nome for nome, _ in struct_class._fields_].index(campo_chave)
+    for linha in linhas:
+        chave = getattr(linha, campo_chave) if isinstance(linha, struct_class) else linha[posicao_chave]
+        if chave % particoes != particao:
+            raise ValueError(f"Erro: chave {chave} gerada para a partição {particao} "
+                             f"pertence à partição {chave % particoes}.")
+        yield linha
+
+def _carregar_particao(gerador, definicao, particao, particoes, formato, opcoes_carga):
+    # formato chega como a string do struct.Struct (que não passa por pickle)
+    struct_class, campo_chave, arquivo_dados, campos_secundarios, _ = definicao
+    linhas = _conferir_particao(gerador(particao, particoes), struct_class, campo_chave, particao, particoes)
+    return store.carregar_tabela_em_lote(linhas, struct_class, campo_chave, caminho_particao(arquivo_dados, particao),
+                                         campos_secundarios=campos_secundarios,
+                                         formato=struct.Struct(formato) if formato else None, **opcoes_carga)
+
+def _agregar_particao(definicao, particao, funcao):
+    with _abrir_particao(definicao, particao) as tabela:
+        return funcao(tabela.scan())
+
+def _exportar_particao(definicao, particao, destino, formato):
+    # Só os registros da partição, em <destino>.pNN (cabeçalho e rodapé ficam para quem junta as partes)
+    with _abrir_particao(definicao, particao) as tabela, \
+            exportacao.abrir_saida(caminho_particao(destino, particao), "w") as f_saida:
+        return exportacao.escrever_registros(f_saida, tabela, formato)
+
+def _compactar_particao(definicao, particao):
+    with _abrir_particao(definicao, particao) as tabela:
+        return tabela.compactar_dados()
+
+# --- CARGA EM LOTE PARALELA ---
+
+def carregar_em_paralelo(gerador, struct_class, campo_chave, arquivo_dados, particoes=None,
+                         campos_secundarios=(), formato=None, trabalhadores=None, **opcoes_carga):
+    # Cria a tabela particionada: cada processo gera e grava uma partição com
+    # store.carregar_tabela_em_lote. gerador(particao, particoes) é uma função de módulo
+    # (ou functools.partial de uma) que gera só as linhas com chave % particoes == particao.
+    # opcoes_carga: as demais opções da carga (tipo_indice, limite_carga, sondagem...).
+    # Retorna o total de registros gravados.
+    particoes = particoes or PARTICOES_PADRAO
+    _validar_particoes(particoes)
+    definicao = (struct_class, campo_chave, arquivo_dados, tuple(campos_secundarios), {})
+    inicio = time.perf_counter()
+    gravados = _executar(_carregar_particao,
+                         [(gerador, definicao, particao, particoes, formato and formato.format, opcoes_carga)
+                          for particao in range(particoes)],
+                         trabalhadores)
+
+    # Partições de um layout anterior maior não valem mais
+    anteriores = ler_particoes(arquivo_dados) or 0
+    for particao in range(particoes, anteriores):
+        for caminho in arquivos_particao(arquivo_dados, particao):
+            os.remove(caminho)
+    _gravar_manifesto(arquivo_dados, particoes)
+    log.info("-> %d registros em %d partições de %s (%.2f s).",
+             sum(gravados), particoes, arquivo_dados, time.perf_counter() - inicio)
+    return sum(gravados)
+
+# --- TABELA PARTICIONADA ---
+
+class TabelaParticionada:
+    """N TabelaIndexada roteadas por chave % N, com varreduras em paralelo por partição."""
+
+    def __init__(self, struct_class, campo_chave, arquivo_dados, particoes=None, campos_secundarios=(),
+                 trabalhadores=None, **opcoes):
+        # opcoes: as da TabelaIndexada (usar_mmap, tipo_indice, durabilidade, cache...), exceto
+        # os caminhos dos arquivos, que derivam do arquivo de cada partição
+        gravadas = ler_particoes(arquivo_dados)
+        if particoes is None:
+            particoes = gravadas or PARTICOES_PADRAO
+        _validar_particoes(particoes)
+        if gravadas is not None and gravadas != particoes:
+            raise ValueError(f"Erro: {arquivo_dados} tem {gravadas} partições (pedidas: {particoes}).")
+        self.struct_class = struct_class
+        self.campo_chave = campo_chave
+        self.arquivo_dados = arquivo_dados
+        self.particoes = particoes
+        self.campos_secundarios = tuple(campos_secundarios)
+        self.trabalhadores = trabalhadores
+        self.opcoes = opcoes
+        self.durabilidade = opcoes.get("durabilidade", "nenhum")
+        self.tipo_indice = opcoes.get("tipo_indice", "hash")
+
+        self.tabelas = []
+        try:
+            for particao in range(particoes):
+                self.tabelas.append(store.TabelaIndexada(
+                    struct_class, campo_chave, caminho_particao(arquivo_dados, particao),
+                    campos_secundarios=self.campos_secundarios, **opcoes))
+        except BaseException:
+            self.close()
+            raise
+        if gravadas is None:
+            _gravar_manifesto(arquivo_dados, particoes)
+
+    def _definicao(self):
+        # Trabalhadores abrem a partição sem o cache do processo pai e sem a trava entre
+        # processos: enquanto trabalham, o pai segura a trava de escrita de cada partição
+        opcoes = {nome: valor for nome, valor in self.opcoes.items() if nome not in ("cache", "multiprocesso")}
+        return (self.struct_class, self.campo_chave, self.arquivo_dados, self.campos_secundarios, opcoes)
+
+    def _paralelo(self, funcao, *argumentos):
+        # Roda funcao(definicao, particao, *argumentos) para cada partição em outro processo,
+        # com os arquivos gravados e liberados pelo store do pai (ver arquivos_liberados)
+        with contextlib.ExitStack() as pilha:
+            for tabela in self.tabelas:
+                pilha.enter_context(tabela.arquivos_liberados())
+            definicao = self._definicao()
+            return _executar(funcao, [(definicao, particao, *argumentos) for particao in range(self.particoes)],
+                             self.trabalhadores)
+
+    # --- ROTEAMENTO ---
+
+    def particao_de(self, chave):
+        return particao_da_chave(chave, self.particoes)
+
+    def tabela_de(self, chave):
+        return self.tabelas[chave % self.particoes]
+
+    def _por_particao(self, chaves):
+        # partição -> posições (em chaves) das chaves que caem nela
+        grupos = {}
+        for posicao, chave in enumerate(chaves):
+            grupos.setdefault(chave % self.particoes, []).append(posicao)
+        return grupos
+
+    def _em_lote(self, operacao, itens, chaves):
+        # Aplica operacao (get_many, insert_many...) a cada partição com os seus itens e
+        # devolve os resultados na ordem de itens
+        resultado = [None] * len(itens)
+        for particao, posicoes in self._por_particao(chaves).items():
+            tabela = self.tabelas[particao]
+            for posicao, valor in zip(posicoes, getattr(tabela, operacao)([itens[p] for p in posicoes])):
+                resultado[posicao] = valor
+        return resultado
+
+    # --- OPERAÇÕES PONTUAIS ---
+    # Endereços retornados são os da partição da chave
+
+    def insert(self, novo):
+        return self.tabela_de(getattr(novo, self.campo_chave)).insert(novo)
+
+    def get(self, id_busca):
+        return self.tabela_de(id_busca).get(id_busca)
+
+    def delete(self, id_busca):
+        return self.tabela_de(id_busca).delete(id_busca)
+
+    def get_many(self, chaves):
+        chaves = list(chaves)
+        return self._em_lote("get_many", chaves, chaves)
+
+    def insert_many(self, novos):
+        novos = list(novos)
+        return self._em_lote("insert_many", novos, [getattr(novo, self.campo_chave) for novo in novos])
+
+    def delete_many(self, chaves):
+        chaves = list(chaves)
+        return self._em_lote("delete_many", chaves, chaves)
+
+    @contextlib.contextmanager
+    def lote(self):
+        # lote() de todas as partições (uma trava de escrita e uma espera de fsync por partição)
+        with contextlib.ExitStack() as pilha:
+            for tabela in self.tabelas:
+                pilha.enter_context(tabela.lote())
+            yield self
+
+    # --- CONSULTAS ---
+
+    def scan(self, forma="registro"):
+        # Registros vivos, partição por partição (no próprio processo; ver agregar)
+        for tabela in self.tabelas:
+            yield from tabela.scan(forma=forma)
+
+    def buscar_por(self, campo, valor):
+        return [registro for tabela in self.tabelas for registro in tabela.buscar_por(campo, valor)]
+
+    def intervalo(self, inicio=None, fim=None, limite=None):
+        # Intervalo de cada partição já vem em ordem de chave: basta intercalar
+        chave = lambda registro: getattr(registro, self.campo_chave)
+        intercalados = heapq.merge(*(tabela.intervalo(inicio, fim, limite) for tabela in self.tabelas), key=chave)
+        yield from itertools.islice(intercalados, limite)
+
+    def chaves_intervalo(self, inicio=None, fim=None):
+        return list(heapq.merge(*(tabela.chaves_intervalo(inicio, fim) for tabela in self.tabelas)))
+
+    def estatisticas(self):
+        tabelas = [tabela.estatisticas() for tabela in self.tabelas]
+        return {"particoes": self.particoes,
+                "registros_fisicos": sum(atual["registros_fisicos"] for atual in tabelas),
+                "tabelas": tabelas}
+
+    # --- VARREDURAS EM PARALELO (UM PROCESSO POR PARTIÇÃO) ---
+
+    def agregar(self, funcao):
+        # funcao(registros) sobre o scan de cada partição, em paralelo. funcao é uma função de
+        # módulo (vai para outro processo) e o seu retorno volta por pickle: reduza na partição
+        # (contagens, somas...). Retorna a lista de resultados, na ordem das partições.
+        return self._paralelo(_agregar_particao, funcao)
+
+    def exportar(self, destino, formato="csv", titulo=None):
+        # Cada partição escreve os seus registros em <destino>.pNN em paralelo; as partes são
+        # juntadas em ordem entre o cabeçalho e o rodapé. Mesmo resumo de exportacao.exportar.
+        if formato not in exportacao.FORMATOS:
+            raise ValueError(f"Erro: formato deve ser um de {exportacao.FORMATOS}.")
+        inicio = time.perf_counter()
+        modo = exportacao.MODOS[formato]
+        tamanho_antes = os.path.getsize(destino) if modo == "a" and os.path.exists(destino) else 0
+        partes = [caminho_particao(destino, particao) for particao in range(self.particoes)]
+        try:
+            contagens = self._paralelo(_exportar_particao, destino, formato)
+            with exportacao.abrir_saida(destino, modo) as f_saida:
+                exportacao.escrever_cabecalho(f_saida, formato, exportacao.campos(self.struct_class),
+                                              titulo or os.path.basename(self.arquivo_dados))
+            with open(destino, "ab") as f_saida:
+                for parte in partes:
+                    with open(parte, "rb") as f_parte:
+                        shutil.copyfileobj(f_parte, f_saida, exportacao.BUFFER_SAIDA)
+            with exportacao.abrir_saida(destino, "a") as f_saida:
+                exportacao.escrever_rodape(f_saida, formato, sum(contagens))
+        finally:
+            for parte in partes:
+                if os.path.exists(parte):
+                    os.remove(parte)
+        bytes_lidos = sum(os.path.getsize(tabela.arquivo_dados) for tabela in self.tabelas)
+        return exportacao.resumo(sum(contagens), bytes_lidos, os.path.getsize(destino) - tamanho_antes,
+                                 time.perf_counter() - inicio)
+
+    def compactar_dados(self):
+        # Vacuum de cada partição em paralelo (ver TabelaIndexada.compactar_dados). Retorna o
+        # resumo somado; segundos é o tempo total, não a soma.
+        inicio = time.perf_counter()
+        resumos = self._paralelo(_compactar_particao)
+        total = {chave: sum(resumo[chave] for resumo in resumos)
+                 for chave in ("registros", "slots_liberados", "bytes_antes", "bytes_depois", "bytes_recuperados")}
+        total["segundos"] = time.perf_counter() - inicio
+        return total
+
+    def compactar_indice(self):
+        return sum(tabela.compactar_indice() for tabela in self.tabelas)
+
+    # --- CICLO DE VIDA ---
+
+    @property
+    def fechado(self):
+        return all(tabela.fechado for tabela in self.tabelas)
+
+    def flush(self):
+        for tabela in self.tabelas:
+            tabela.flush()
+
+    def checkpoint(self):
+        for tabela in self.tabelas:
+            tabela.checkpoint()
+
+    def close(self):
+        for tabela in self.tabelas:
+            tabela.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+# --- FLUXO DA TABELA PARTICIONADA ---
+# 1. carregar_em_paralelo: um processo por partição gera e grava dados e índices dela;
+#    o manifesto com N é gravado por último
+# 2. TabelaParticionada abre as N partições (N vem do manifesto)
+# 3. get/insert/delete vão à partição chave % N; os lotes são divididos por partição
+# 4. agregar/exportar/compactar_dados: o pai grava e fecha cada partição (segurando a trava
+#    de escrita), um processo por partição faz o trabalho e o pai reabre tudo
+# 5. exportar junta as partes em ordem; intervalo intercala as partições pela chave
@@ -0,0 +1,1394 @@
+import contextlib
+import ctypes
+import itertools
+import json
+import os
+import struct
+import time
+from array import array
+from . import arvore_bmais
+from . import cache_paginas
+from . import codec
+from . import concorrencia
+from . import espaco_livre
+from . import filtro_bloom
+from . import indice_secundario
+from . import logs
+from . import metricas
+from . import models
+from . import utils_parte3
+from . import wal
+
+log = logs.obter(__name__)
+
+# ================================================================================
+#                       MOTOR DE ARMAZENAMENTO (ARQUIVOS ABERTOS)
+# ================================================================================
+# As funções de utils.py abriam e fechavam hash, header e dados a cada chamada.
+# A TabelaIndexada mantém os três arquivos abertos durante toda a sua vida útil e
+# guarda a pilha de excluídos em memória (ver espaco_livre.py), gravando o header
+# apenas no flush()/close().
+#
+# Ela vale para qualquer struct ctypes de tamanho fixo com uma chave int única:
+# AplicacaoStore, FuncionarioStore, PacienteStore e VacinaStore são a mesma
+# tabela, cada uma com seus próprios arquivos de índice e header.
+#
+# Concorrência (ver concorrencia.py): leituras rodam em paralelo sob a trava de
+# leitura; inserções e remoções (pilha de excluídos e cadeias de sondagem) passam
+# uma por vez pela trava de escrita. Com multiprocesso=True a mesma trava vale entre
+# processos via fcntl.flock em <base>.lock.
+
+TIPOS_INDICE = ("hash", "bmais")
+# Operações em lote: endereços separados por até esta quantidade de registros são lidos
+# em uma única leitura (ler o buraco sai mais barato que outra chamada de E/S)
+LACUNA_MAXIMA = 8
+# Varredura (scan): registros lidos por bloco do arquivo de dados
+REGISTROS_POR_BLOCO_SCAN = 4096
+# Forma dos registros gerados pelo scan: objeto ctypes, tupla crua do codec ou uma Visao
+# reposicionada a cada registro (válida só até o próximo)
+FORMAS_SCAN = ("registro", "tupla", "visao")
+# Blocos do .dat mantidos em memória ao percorrer a pilha de excluídos (ao carregá-la)
+BLOCOS_PILHA_SCAN = 64
+# Campo chave (c_int) lido direto dos bytes, ex.: ao percorrer a pilha de excluídos
+CAMPO_CHAVE = struct.Struct("=i")
+
+def caminhos_tabela(arquivo_dados):
+    # Arquivos padrão de uma tabela, ao lado do arquivo de dados: (hash, header, árvore B+)
+    base = os.path.splitext(arquivo_dados)[0]
+    return f"{base}_hash.dat", f"{base}_header.dat", f"{base}_bmais.dat"
+
+def arquivos_tabela(arquivo_dados, arquivo_hash=None, arquivo_header=None, arquivo_bmais=None,
+                    campos_secundarios=()):
+    # Todos os arquivos que uma tabela pode ter ao lado dos dados (existentes ou não): índices
+    # primários (com a tabela anterior de um rehash), header, secundários, log, filtro, pilha
+    # gravada, trava, manifesto e temporários de uma compactação
+    hash_padrao, header_padrao, bmais_padrao = caminhos_tabela(arquivo_dados)
+    arquivo_hash = arquivo_hash or hash_padrao
+    principais = [arquivo_dados, arquivo_hash, arquivo_header or header_padrao, arquivo_bmais or bmais_padrao]
+    caminhos = principais + [arquivo_hash + ".antigo", caminho_wal(arquivo_dados), caminho_filtro(arquivo_dados),
+                             caminho_livres(arquivo_dados), caminho_trava(arquivo_dados),
+                             caminho_compactacao(arquivo_dados)]
+    caminhos.extend(_temporario_compactacao(caminho) for caminho in principais)
+    for campo in campos_secundarios:
+        caminhos.extend(indice_secundario.caminhos_indice(arquivo_dados, campo))
+    return caminhos
+
+def caminho_wal(arquivo_dados):
+    return os.path.splitext(arquivo_dados)[0] + "_wal.log"
+
+def caminho_filtro(arquivo_dados):
+    return os.path.splitext(arquivo_dados)[0] + "_filtro.dat"
+
+def caminho_livres(arquivo_dados):
+    return os.path.splitext(arquivo_dados)[0] + "_livres.dat"
+
+def _impressao_dados(arquivo_dados):
+    # (tamanho, mtime em ns) do arquivo de dados: muda com qualquer escrita na base
+    estado = os.stat(arquivo_dados)
+    return estado.st_size, estado.st_mtime_ns
+
+def caminho_trava(arquivo_dados):
+    return os.path.splitext(arquivo_dados)[0] + ".lock"
+
+def caminho_compactacao(arquivo_dados):
+    # Manifesto de uma compactação (compactar_dados) com as trocas ainda não concluídas
+    return os.path.splitext(arquivo_dados)[0] + "_compactacao.json"
+
+def _temporario_compactacao(caminho):
+    # "aplicacoes.dat" -> "aplicacoes.compactando.dat" (mesmo diretório: os.replace atômico)
+    base, extensao = os.path.splitext(caminho)
+    return f"{base}.compactando{extensao}"
+
+class TabelaIndexada:
+    """Registros ctypes de tamanho fixo com índice primário pela chave e reuso de espaço."""
+
+    def __init__(self, struct_class, campo_chave, arquivo_dados, arquivo_hash=None, arquivo_header=None,
+                 usar_mmap=False, limite_carga=None, tipo_indice="hash", arquivo_bmais=None,
+                 campos_secundarios=(), cache=None, durabilidade="nenhum", arquivo_wal=None,
+                 multiprocesso=False, sondagem=None, funcao_hash=None, filtro=None, arquivo_filtro=None):
+        self.struct_class = struct_class
+        self.campo_chave = campo_chave
+        self.tamanho_registro = ctypes.sizeof(struct_class)
+        # struct.Struct com o layout do modelo (leituras em bloco sem objetos ctypes)
+        self.codec = codec.obter(struct_class)
+        self._deslocamento_chave = getattr(struct_class, campo_chave).offset
+        self.campos_secundarios = tuple(campos_secundarios)
+        hash_padrao, header_padrao, bmais_padrao = caminhos_tabela(arquivo_dados)
+        self.arquivo_dados = arquivo_dados
+        self.arquivo_hash = arquivo_hash or hash_padrao
+        self.arquivo_header = arquivo_header or header_padrao
+        self.arquivo_bmais = arquivo_bmais or bmais_padrao
+        self.arquivo_wal = arquivo_wal or caminho_wal(arquivo_dados)
+        self.arquivo_filtro = arquivo_filtro or caminho_filtro(arquivo_dados)
+        self.arquivo_livres = caminho_livres(arquivo_dados)
+        if tipo_indice not in TIPOS_INDICE:
+            raise ValueError(f"Erro: tipo_indice deve ser um de {TIPOS_INDICE}.")
+        if durabilidade not in wal.DURABILIDADES:
+            raise ValueError(f"Erro: durabilidade deve ser uma de {wal.DURABILIDADES}.")
+        # Esquema do índice hash (None = o do arquivo existente; linear/módulo num índice novo)
+        if sondagem is not None:
+            utils_parte3.codigo_sondagem(sondagem)
+        if funcao_hash is not None:
+            utils_parte3.codigo_funcao_hash(funcao_hash)
+        if durabilidade != "nenhum" and usar_mmap:
+            # As escritas no mmap não passam pelo cache, então não entrariam no log
+            raise ValueError("Erro: usar_mmap não é compatível com o WAL (durabilidade 'op'/'grupo').")
+        # Filtro de Bloom das chaves (taxa de falsos positivos; None = sem filtro). Ele vive em
+        # memória: com vários processos cada um teria a sua cópia, desatualizada pelos outros.
+        if filtro is not None:
+            filtro_bloom.validar_taxa(filtro)
+            if multiprocesso:
+                raise ValueError("Erro: filtro não é compatível com multiprocesso.")
+        self.tipo_indice = tipo_indice
+        self.usar_mmap = usar_mmap
+        self.limite_carga = limite_carga
+        self.sondagem = sondagem
+        self.funcao_hash = funcao_hash
+        self.durabilidade = durabilidade
+        self.filtro = filtro
+        # CacheDePaginas opcional, compartilhado por dados e índices (e entre stores).
+        # Com WAL o cache é obrigatório: é nele que as páginas da transação ficam retidas.
+        if durabilidade != "nenhum" and cache is None:
+            cache = cache_paginas.CacheDePaginas()
+        self.cache = cache
+
+        # Base nova: os diretórios podem ainda não existir (importar o pacote não cria nada)
+        for caminho in (self.arquivo_dados, self.arquivo_header, self.arquivo_hash, self.arquivo_bmais):
+            _garantir_diretorio(caminho)
+
+        # Trava leitores/escritor; com multiprocesso também uma flock compartilhada entre
+        # processos, cuja geração avisa quando outro processo alterou a base
+        self.multiprocesso = multiprocesso
+        processo = concorrencia.TravaDeProcesso(caminho_trava(arquivo_dados)) if multiprocesso else None
+        self._trava = concorrencia.TravaLeituraEscrita(processo)
+        self._contexto_leitura = concorrencia.ContextoDeTrava(self._entrar_leitura, self._trava.liberar_leitura)
+        self._lsn_pendente = 0
+        self._nivel_mutacao = 0
+        # Muda a cada mutação ou recarga: quem guarda algo derivado dos dados (ex.: scan) refaz
+        self._versao = 0
+        self._f_dados = None
+        self._filtro = None
+        self._filtro_no_disco = False
+        self._livres = None
+        self._livres_no_disco = False
+        with self._trava.escrita():
+            self._abrir()
+            self._geracao = processo.geracao() if processo is not None else 0
+
+    def _abrir(self):
+        # 0. Compactação interrompida: com o manifesto gravado as trocas são concluídas;
+        #    sem ele, os temporários são descartados e a base antiga continua valendo
+        _retomar_compactacao(caminho_compactacao(self.arquivo_dados), self._arquivos_compactacao())
+
+        # Com WAL, o log é reaplicado antes de qualquer arquivo ser aberto, e os arquivos
+        # passam a ser abertos por ele (mesma interface do cache)
+        self._wal = None
+        fonte = self.cache
+        if self.durabilidade != "nenhum":
+            self._wal = fonte = wal.LogDeEscrita(self.arquivo_wal, self.cache, self.durabilidade)
+
+        # 1. Garante que dados e header existem (o índice cria o próprio arquivo)
+        if not os.path.exists(self.arquivo_header):
+            with open(self.arquivo_header, "wb") as f_criacao:
+                f_criacao.write(models.Header(topo_pilha=-1))
+        if not os.path.exists(self.arquivo_dados):
+            open(self.arquivo_dados, "wb").close()
+
+        # 2. Abre tudo uma única vez em "rb+" (dados pelo cache de páginas, se houver;
+        #    o header também, quando é preciso registrá-lo no log)
+        self._f_dados = fonte.abrir(self.arquivo_dados) if fonte is not None else open(self.arquivo_dados, "rb+")
+        self._f_header = self._wal.abrir(self.arquivo_header) if self._wal else open(self.arquivo_header, "rb+")
+        self._ler_dados = concorrencia.leitor(self._f_dados)
+
+        # Índice primário:
+        #  - "hash": sondagem via seek/read ou sobre mmap; cresce ao passar do limite_carga
+        #  - "bmais": árvore B+ (busca pontual + intervalos e ordem)
+        # Só um índice primário existe por base: ao trocar de tipo, o novo é montado a partir
+        # do antigo e o antigo é apagado (ele deixaria de ser atualizado).
+        self._converter_indice_primario()
+        if self.tipo_indice == "bmais":
+            self._indice = arvore_bmais.ArvoreBMais(self.arquivo_bmais, cache=fonte)
+        else:
+            self._indice = utils_parte3.IndiceHash(self.arquivo_hash, usar_mmap=self.usar_mmap,
+                                                   limite_carga=self.limite_carga, cache=fonte,
+                                                   sondagem=self.sondagem, funcao_hash=self.funcao_hash)
+
+        # 3. Lê o header uma vez e mantém o topo da pilha em memória
+        self._f_header.seek(0)
+        header = models.Header.from_buffer_copy(self._f_header.read(ctypes.sizeof(models.Header)))
+        self._topo_pilha = header.topo_pilha
+        self._header_sujo = False
+
+        # 4. Quantidade de registros físicos (próximo endereço de append)
+        self._f_dados.seek(0, 2)
+        self._total_registros = self._f_dados.tell() // self.tamanho_registro
+
+        # 5. Índices secundários. Se algum arquivo falta, é reconstruído a partir do primário
+        faltando = [
+            campo for campo in self.campos_secundarios
+            if not all(os.path.exists(c) for c in indice_secundario.caminhos_indice(self.arquivo_dados, campo))
+        ]
+        if faltando:
+            self._reconstruir_secundarios(faltando)
+        self._secundarios = {}
+        for campo in self.campos_secundarios:
+            caminho_hash, caminho_lista = indice_secundario.caminhos_indice(self.arquivo_dados, campo)
+            self._secundarios[campo] = indice_secundario.IndiceSecundario(
+                campo, caminho_hash, caminho_lista, usar_mmap=self.usar_mmap, cache=fonte)
+
+        # 6. Filtro das chaves: o gravado no último close, se a base não mudou desde então;
+        #    senão é montado a partir das chaves do índice primário
+        impressao = _impressao_dados(self.arquivo_dados)
+        self._filtro = None
+        self._filtro_no_disco = False
+        if self.filtro is not None:
+            self._filtro = filtro_bloom.carregar(self.arquivo_filtro, impressao, self.filtro)
+            self._filtro_no_disco = self._filtro is not None
+            if self._filtro is None:
+                self._montar_filtro()
+
+        # 7. Pilha de excluídos em memória: a gravada no último close, se vale para o .dat e o
+        #    header; sem WAL, um arquivo que não vale mais (queda no meio) faz a pilha ser
+        #    remontada do índice. Com WAL (o log já refez o encadeamento) ou multiprocesso (os
+        #    outros processos mexem nela), é lida do .dat no primeiro lote ou scan.
+        self._livres = None
+        self._livres_no_disco = False
+        if self.multiprocesso:
+            return
+        self._livres, invalido = espaco_livre.carregar(self.arquivo_livres, impressao, self._topo_pilha)
+        self._livres_no_disco = self._livres is not None
+        if self._livres is None and self._wal is None:
+            if invalido:
+                self._remontar_espaco_livre()
+            else:
+                self._espaco()
+
+    def _montar_filtro(self):
+        # Todas as chaves do índice primário (uma leitura do índice inteiro)
+        self._filtro = filtro_bloom.montar((chave for chave, _ in self._indice.itens()), self.filtro)
+        log.info("Filtro de %s montado: %d chaves.", self.arquivo_dados, self._filtro.chaves)
+
+    def _espaco(self):
+        # Pilha de excluídos em memória (percorrida no .dat uma única vez, se ainda não está)
+        if self._livres is None:
+            self._livres = espaco_livre.EspacoLivre(reversed(self._encadeamento()))
+        return self._livres
+
+    def _encadeamento(self):
+        # Endereços da pilha de excluídos, do topo para o fundo
+        return _percorrer_pilha(self._ler_dados, self._topo_pilha, self._total_registros,
+                                self.tamanho_registro, self._deslocamento_chave)
+
+    def _remontar_espaco_livre(self):
+        # Sem WAL, depois de uma queda: o header pode apontar para um slot já reusado (o topo é
+        # gravado só no flush). Livre é todo slot que nenhuma chave do índice referencia; o
+        # encadeamento do .dat e o header são regravados a partir daí.
+        self._livres = espaco_livre.a_partir_dos_vivos((endereco for _, endereco in self._indice.itens()),
+                                                        self._total_registros)
+        pilha = self._livres.pilha
+        self._gravar_registros((endereco, self._no_livre(pilha[posicao - 1] if posicao else -1))
+                               for posicao, endereco in enumerate(pilha))
+        self._topo_pilha = self._livres.topo
+        self._header_sujo = True
+        self.flush()
+        log.warning("Recuperação: pilha de excluídos de %s remontada do índice (%d slots livres).",
+                    self.arquivo_dados, len(pilha))
+
+    def _reconstruir_secundarios(self, campos):
+        # Lê os registros vivos (segundo o índice primário) em ordem de offset, uma única
+        # vez, e monta o índice de cada campo pedido
+        enderecos = sorted(endereco for _, endereco in self._indice.itens())
+        lidos = self._ler_registros(enderecos)
+        registros = [lidos[endereco] for endereco in enderecos]
+        for campo in campos:
+            caminho_hash, caminho_lista = indice_secundario.caminhos_indice(self.arquivo_dados, campo)
+            pares = [(endereco, getattr(registro, campo)) for endereco, registro in zip(enderecos, registros)]
+            indice_secundario.construir_indice_secundario(caminho_hash, caminho_lista, pares,
+                                                          self._total_registros)
+
+    def _converter_indice_primario(self):
+        if self.tipo_indice == "bmais":
+            if not os.path.exists(self.arquivo_bmais) and os.path.exists(self.arquivo_hash):
+                indice_hash = utils_parte3.IndiceHash(self.arquivo_hash)
+                arvore_bmais.construir_arvore(self.arquivo_bmais, sorted(indice_hash.itens()))
+                indice_hash.close()
+            for caminho in (self.arquivo_hash, self.arquivo_hash + ".antigo"):
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+        elif os.path.exists(self.arquivo_bmais):
+            if not os.path.exists(self.arquivo_hash):
+                arvore = arvore_bmais.ArvoreBMais(self.arquivo_bmais)
+                pares = list(arvore.itens())
+                arvore.close()
+                utils_parte3.construir_tabela_hash(self.arquivo_hash, [chave for chave, _ in pares],
+                                                   enderecos=[endereco for _, endereco in pares],
+                                                   sondagem=self.sondagem or "linear",
+                                                   funcao_hash=self.funcao_hash or "modulo")
+            os.remove(self.arquivo_bmais)
+        # Hash existente com outro esquema de sondagem/função: reconstruído com o pedido
+        if (self.tipo_indice == "hash" and (self.sondagem or self.funcao_hash)
+                and os.path.exists(self.arquivo_hash)):
+            utils_parte3.converter_esquema(self.arquivo_hash, self.sondagem, self.funcao_hash)
+
+    # --- TRANSAÇÕES (WAL) ---
+
+    def _indices_hash(self):
+        # Tabelas hash que uma mutação pode fazer crescer
+        if self.tipo_indice == "hash":
+            yield self._indice
+        for secundario in self._secundarios.values():
+            yield secundario.cabecas
+
+    def _preparar_mutacao(self):
+        # O crescimento do hash troca arquivos (rename/criação), o que não cabe no log.
+        # Com WAL ele acontece antes da transação, entre checkpoints: a migração pendente
+        # é concluída em uma transação própria e só então o arquivo é trocado.
+        for indice in self._indices_hash():
+            if indice.precisa_crescer():
+                if indice.em_rehash:
+                    with self._transacao():
+                        indice.concluir_rehash()
+                self.checkpoint()
+                indice.crescer()
+
+    @contextlib.contextmanager
+    def _transacao(self):
+        # Agrupa as escritas de uma mutação em uma transação do WAL (sem WAL, não faz nada)
+        if self._wal is None:
+            yield
+            return
+        self._wal.iniciar()
+        try:
+            yield
+            # Contadores em memória (topo da pilha, cabeçalhos dos índices) entram na transação
+            self._gravar_cabecalhos()
+            lsn = self._wal.confirmar()
+        except BaseException:
+            # Nada desta transação foi ao log: descarta as páginas e reabre pelo log
+            self._wal.descartar_transacao()
+            self._reabrir()
+            raise
+        # A espera pelo fsync fica para depois da trava (ver _mutacao): outras threads
+        # confirmam enquanto isso e entram no mesmo group commit
+        self._lsn_pendente = max(self._lsn_pendente, lsn)
+
+    # --- TRAVAS ---
+
+    def _leitura(self):
+        # Trava de leitura (with self._leitura(): ...)
+        return self._contexto_leitura
+
+    def _entrar_leitura(self):
+        # Antes de ler, recarrega o estado se outro processo alterou a base
+        processo = self._trava.processo
+        while True:
+            self._trava.adquirir_leitura()
+            if processo is None or processo.geracao() == self._geracao:
+                break
+            self._trava.liberar_leitura()
+            with self._trava.escrita():
+                self._sincronizar_geracao()
+        if self.fechado:
+            self._trava.liberar_leitura()
+            self._verificar_aberto()
+
+    @contextlib.contextmanager
+    def _mutacao(self, preparar=False):
+        # Trava de escrita em volta de uma mutação (uma transação com WAL).
+        # O fsync do log é esperado depois de liberar a trava. Mutações aninhadas (dentro
+        # de lote()) deixam geração, flush e espera para a mais externa.
+        with self._trava.escrita():
+            self._verificar_aberto()
+            processo = self._trava.processo
+            externa = self._nivel_mutacao == 0
+            self._nivel_mutacao += 1
+            self._versao += 1
+            if self._filtro_no_disco:
+                # O arquivo do filtro deixa de valer: uma queda a partir daqui força a remontagem
+                filtro_bloom.marcar_sujo(self.arquivo_filtro)
+                self._filtro_no_disco = False
+            if self._livres_no_disco:
+                # Idem para a pilha de excluídos gravada
+                espaco_livre.marcar_sujo(self.arquivo_livres)
+                self._livres_no_disco = False
+            try:
+                if externa and processo is not None:
+                    # A geração avança antes de mexer nos arquivos: se este processo cair no meio,
+                    # os outros recarregam (e reaplicam o log) em vez de confiar no que têm em memória
+                    self._sincronizar_geracao()
+                    self._geracao = processo.avancar_geracao()
+                if preparar and self._wal is not None:
+                    self._preparar_mutacao()
+                try:
+                    yield
+                finally:
+                    if externa and processo is not None:
+                        # Os outros processos reabrem a partir do disco: nada fica só neste cache
+                        self.flush()
+            finally:
+                self._nivel_mutacao -= 1
+            if not externa:
+                return
+            lsn, self._lsn_pendente = self._lsn_pendente, 0
+            # O log desta transação (uma reabertura troca self._wal, e o antigo já está sincronizado)
+            log = self._wal
+        if log is not None and lsn:
+            log.esperar(lsn)
+            if log.tamanho > wal.TAMANHO_MAXIMO_WAL:
+                self.checkpoint()
+
+    @contextlib.contextmanager
+    def lote(self):
+        # Várias mutações sob uma única trava de escrita e uma única espera pelo fsync do log
+        # (cada uma continua sendo a sua própria transação)
+        with self._mutacao():
+            yield self
+
+    def _sincronizar_geracao(self):
+        # Só com a trava de escrita: recarrega tudo do disco se outro processo mudou a base
+        processo = self._trava.processo
+        if processo is None or self.fechado:
+            return
+        geracao = processo.geracao()
+        if geracao != self._geracao:
+            self._recarregar()
+            self._geracao = geracao
+
+    def _recarregar(self):
+        # Sem nada pendente (toda mutação em multiprocesso termina com flush), fechar não grava nada
+        self._versao += 1
+        self._fechar_arquivos()
+        self._abrir()
+
+    def _fechar_arquivos(self):
+        self._indice.close()
+        for secundario in self._secundarios.values():
+            secundario.close()
+        for f in (self._f_dados, self._f_header):
+            f.close()
+        if self._wal is not None:
+            self._wal.close()
+        self._f_dados = self._f_header = None
+
+    def _reabrir(self):
+        self._wal.abandonar()
+        self._f_dados = None
+        self._abrir()
+
+    @contextlib.contextmanager
+    def arquivos_liberados(self):
+        # Grava tudo e fecha os arquivos sob a trava de escrita, reabrindo na saída: nesse meio
+        # tempo outro processo pode ler ou reescrever a base (ver particionamento.py), e as
+        # threads deste store esperam na trava
+        with self._mutacao():
+            self.flush()
+            self._gravar_auxiliares()
+            self._fechar_arquivos()
+            try:
+                yield
+            finally:
+                self._abrir()
+
+    def _gravar_cabecalhos(self):
+        if self._header_sujo:
+            concorrencia.gravar_em(self._f_header, 0, models.Header(topo_pilha=self._topo_pilha))
+            self._header_sujo = False
+        self._indice.gravar_cabecalho()
+        for secundario in self._secundarios.values():
+            secundario.cabecas.gravar_cabecalho()
+
+    def _gravar_auxiliares(self):
+        # Filtro e pilha de excluídos em memória, se mudaram. Só com a trava de escrita e depois
+        # do flush (a impressão é a do .dat já gravado)
+        gravar_filtro = self._filtro is not None and not self._filtro_no_disco
+        gravar_livres = self._livres is not None and not self._livres_no_disco and not self.multiprocesso
+        if not (gravar_filtro or gravar_livres):
+            return
+        impressao = _impressao_dados(self.arquivo_dados)
+        if gravar_filtro:
+            filtro_bloom.gravar(self.arquivo_filtro, self._filtro, impressao)
+            self._filtro_no_disco = True
+        if gravar_livres:
+            espaco_livre.gravar(self.arquivo_livres, self._livres, impressao)
+            self._livres_no_disco = True
+
+    def checkpoint(self):
+        # Com WAL: grava as páginas, sincroniza os arquivos e zera o log. Sem WAL equivale ao flush.
+        with self._trava.escrita():
+            self.flush()
+
+    # --- CICLO DE VIDA ---
+
+    @property
+    def fechado(self):
+        return self._f_dados is None
+
+    def _verificar_aberto(self):
+        if self.fechado:
+            raise ValueError(f"Erro: {type(self).__name__} já foi fechado.")
+
+    def flush(self):
+        # Grava o header (se mudou) e descarrega os buffers dos arquivos.
+        # Com WAL também sincroniza os arquivos e zera o log (checkpoint).
+        with self._trava.escrita():
+            self._verificar_aberto()
+            self._gravar_cabecalhos()
+            self._f_dados.flush()
+            self._indice.flush()
+            for secundario in self._secundarios.values():
+                secundario.flush()
+            self._f_header.flush()
+            if self._wal is not None:
+                self._wal.checkpoint()
+
+    def close(self):
+        with self._trava.escrita():
+            if self.fechado:
+                return
+            try:
+                self._sincronizar_geracao()
+                self.flush()
+                self._gravar_auxiliares()
+            finally:
+                self._fechar_arquivos()
+        if self._trava.processo is not None:
+            self._trava.processo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # --- ACESSO AO ARQUIVO DE DADOS ---
+
+    def _ler_registro(self, endereco):
+        buffer = self._ler_dados(endereco * self.tamanho_registro, self.tamanho_registro)
+        if len(buffer) < self.tamanho_registro:
+            return None
+        return self.struct_class.from_buffer_copy(buffer)
+
+    def _proximo_livre(self, endereco):
+        # Nó da pilha de excluídos (sem ela em memória): só o campo chave (próximo livre) é lido
+        buffer = self._ler_dados(endereco * self.tamanho_registro + self._deslocamento_chave, CAMPO_CHAVE.size)
+        return CAMPO_CHAVE.unpack(buffer)[0]
+
+    def _no_livre(self, proximo):
+        # Bytes de um nó da pilha: registro zerado com a chave apontando para o próximo livre
+        buffer = bytearray(self.tamanho_registro)
+        CAMPO_CHAVE.pack_into(buffer, self._deslocamento_chave, proximo)
+        return buffer
+
+    def _gravar_registro(self, endereco, registro):
+        concorrencia.gravar_em(self._f_dados, endereco * self.tamanho_registro, registro)
+
+    def _ler_registros(self, enderecos):
+        # Lê vários registros em ordem crescente de offset, uma leitura por trecho contíguo
+        # (ou com lacunas de até LACUNA_MAXIMA registros). Retorna {endereço: registro}.
+        tamanho = self.tamanho_registro
+        registros = {}
+        for inicio, fim in _trechos(sorted(set(enderecos)), LACUNA_MAXIMA):
+            buffer = self._ler_dados(inicio * tamanho, (fim - inicio) * tamanho)
+            for endereco in range(inicio, min(fim, inicio + len(buffer) // tamanho)):
+                registros[endereco] = self.struct_class.from_buffer_copy(buffer, (endereco - inicio) * tamanho)
+        return registros
+
+    def _gravar_registros(self, pares):
+        # Grava (endereço, registro) em ordem de offset, uma escrita por trecho contíguo
+        pares = sorted(pares, key=lambda par: par[0])
+        inicio = 0
+        while inicio < len(pares):
+            fim = inicio + 1
+            while fim < len(pares) and pares[fim][0] == pares[fim - 1][0] + 1:
+                fim += 1
+            concorrencia.gravar_em(self._f_dados, pares[inicio][0] * self.tamanho_registro,
+                                   b"".join(bytes(registro) for _, registro in pares[inicio:fim]))
+            inicio = fim
+
+    def _ordenar_chaves(self, chaves):
+        # Ordem de acesso ao índice: posição inicial de sondagem no hash (leituras quase
+        # sequenciais no arquivo do índice) ou a própria chave na árvore B+ (mesmas folhas)
+        if self.tipo_indice == "hash":
+            return sorted(chaves, key=self._indice.posicao_inicial)
+        return sorted(chaves)
+
+    # --- OPERAÇÕES ---
+
+    def _fora_do_filtro(self, chave):
+        # True se o filtro garante que a chave não existe (nenhuma leitura do índice)
+        filtro = self._filtro
+        if filtro is None or filtro.pode_conter(chave):
+            return False
+        if metricas.ativo:
+            metricas.contar("filtro.descartes")
+        return True
+
+    def _buscar(self, chave):
+        # Endereço da chave no índice primário (-1 se não existe), passando antes pelo filtro
+        if self._filtro is None:
+            return self._indice.buscar(chave)
+        if self._fora_do_filtro(chave):
+            return -1
+        endereco = self._indice.buscar(chave)
+        if endereco == -1:
+            self._filtro.falsos_positivos += 1
+            if metricas.ativo:
+                metricas.contar("filtro.falsos_positivos")
+        return endereco
+
+    def _adicionar_ao_filtro(self, chaves):
+        filtro = self._filtro
+        for chave in chaves:
+            filtro.adicionar(chave)
+        if filtro.cheio:
+            # Passou da capacidade (a taxa de falsos positivos subiria): remontado com folga
+            self._montar_filtro()
+
+    def insert(self, novo):
+        # Insere reutilizando o topo da pilha de excluídos, se houver.
+        # Retorna o endereço físico onde o registro foi gravado (-1 se a chave já existe).
+        chave = getattr(novo, self.campo_chave)
+        with self._mutacao(preparar=True):
+            # 0. Chave duplicada: nada é gravado (nem dado, nem índices)
+            if self._buscar(chave) != -1:
+                log.warning("Aviso: Chave %s duplicada detectada na indexação.", chave)
+                return -1
+            return self._inserir(chave, novo)
+
+    def _inserir(self, chave, novo):
+        # Só com a trava de escrita
+        with self._transacao():
+            if self._topo_pilha != -1:
+                # 1. Pop na pilha: em memória ou, sem ela carregada, pelo campo chave do registro
+                #    "lixo" (o próximo livre)
+                endereco_final = self._topo_pilha
+                if self._livres is not None:
+                    self._livres.retirar()
+                    self._topo_pilha = self._livres.topo
+                else:
+                    self._topo_pilha = self._proximo_livre(endereco_final)
+                self._header_sujo = True
+                if metricas.ativo:
+                    metricas.contar("pilha.pops")
+            else:
+                # 2. Pilha vazia: append no fim do arquivo
+                endereco_final = self._total_registros
+                self._total_registros += 1
+
+            # 3. Grava o dado e atualiza os índices (chave -> endereço físico; FKs -> endereços)
+            self._gravar_registro(endereco_final, novo)
+            self._indice.inserir(chave, endereco_final)
+            for campo, secundario in self._secundarios.items():
+                secundario.adicionar(getattr(novo, campo), endereco_final)
+            if self._filtro is not None:
+                self._adicionar_ao_filtro((chave,))
+        return endereco_final
+
+    def get(self, id_busca):
+        # Retorna o registro ou None se não existe
+        with self._leitura():
+            endereco = self._buscar(id_busca)
+            if endereco == -1:
+                return None
+            return self._ler_registro(endereco)
+
+    def delete(self, id_busca):
+        # Remove do índice e empilha o espaço liberado. Retorna True/False.
+        if self._filtro is not None:
+            # Chave certamente ausente: nem trava de escrita, nem transação, nem leitura do índice
+            with self._leitura():
+                if self._fora_do_filtro(id_busca):
+                    return False
+        with self._mutacao(), self._transacao():
+            # 1. Marca a lápide no hash, obtendo o endereço físico do registro
+            endereco_fisico = self._indice.remover(id_busca)
+            if endereco_fisico == -1:
+                return False
+
+            # 2. Retira o registro das listas dos índices secundários (precisa dos valores das FKs)
+            registro = self._ler_registro(endereco_fisico)
+            for campo, secundario in self._secundarios.items():
+                secundario.remover(getattr(registro, campo), endereco_fisico)
+
+            # 3. Push na pilha: o registro vira um nó cuja chave aponta para o topo antigo
+            self._gravar_registro(endereco_fisico, self._no_livre(self._topo_pilha))
+
+            # 4. O buraco recém-criado passa a ser o topo (em memória até o flush ou, com WAL,
+            #    até o fim da transação)
+            self._topo_pilha = endereco_fisico
+            self._header_sujo = True
+            if self._livres is not None:
+                self._livres.empilhar(endereco_fisico)
+            if metricas.ativo:
+                metricas.contar("pilha.pushes")
+            if self._filtro is not None:
+                self._filtro.remover(id_busca)
+        return True
+
+    # --- OPERAÇÕES EM LOTE ---
+    # Uma trava (e, com WAL, uma espera de fsync) para o lote inteiro. Primeiro todas as
+    # posições são resolvidas no índice, depois os registros são lidos/gravados em ordem
+    # de offset, juntando registros vizinhos em uma única leitura/escrita.
+
+    def get_many(self, chaves):
+        # Lista alinhada com chaves: o registro ou None
+        chaves = list(chaves)
+        with self._leitura():
+            # 1. Endereços de todas as chaves
+            enderecos = {chave: self._buscar(chave) for chave in self._ordenar_chaves(set(chaves))}
+            # 2. Registros lidos por trechos, em ordem de offset
+            registros = self._ler_registros(endereco for endereco in enderecos.values() if endereco != -1)
+        return [registros.get(enderecos[chave]) for chave in chaves]
+
+    def insert_many(self, novos):
+        # Lista alinhada com novos: o endereço gravado ou -1 (chave já existente ou repetida no lote)
+        novos = list(novos)
+        resultados = [-1] * len(novos)
+        with self._mutacao():
+            # 0. Descarta duplicadas (no índice ou repetidas no próprio lote)
+            vistas = set()
+            aceitos = []
+            for posicao, novo in enumerate(novos):
+                chave = getattr(novo, self.campo_chave)
+                if chave in vistas or self._buscar(chave) != -1:
+                    log.warning("Aviso: Chave %s duplicada detectada na indexação.", chave)
+                    continue
+                vistas.add(chave)
+                aceitos.append((posicao, chave, novo))
+
+            inicio = 0
+            while inicio < len(aceitos):
+                # 1. Com WAL o crescimento do hash fica fora das transações: cada transação leva
+                #    só as inserções que cabem no hash sem crescer
+                quantidade = len(aceitos)
+                if self._wal is not None:
+                    self._preparar_mutacao()
+                    quantidade = max(1, min([indice.folga() for indice in self._indices_hash()] or [quantidade]))
+                parte = aceitos[inicio:inicio + quantidade]
+                with self._transacao():
+                    for (posicao, _, _), endereco in zip(parte, self._inserir_lote(parte)):
+                        resultados[posicao] = endereco
+                inicio += quantidade
+        return resultados
+
+    def _inserir_lote(self, parte):
+        # Só com a trava de escrita, chaves já conferidas. Retorna os endereços na ordem de parte.
+        # 1. Endereços: primeiro slots da pilha de excluídos (os trechos contíguos mais longos),
+        #    depois o fim do arquivo (um trecho contíguo)
+        enderecos = []
+        if self._topo_pilha != -1:
+            espaco = self._espaco()
+            enderecos, religacoes = espaco.alocar(len(parte))
+            self._topo_pilha = espaco.topo
+            self._header_sujo = True
+            # Nós que ficaram na pilha e apontavam para um slot alocado passam a apontar para o seguinte
+            self._gravar_registros((no, self._no_livre(proximo)) for no, proximo in religacoes)
+            if metricas.ativo:
+                metricas.contar("pilha.pops", len(enderecos))
+                metricas.contar("pilha.religacoes", len(religacoes))
+        anexados = len(parte) - len(enderecos)
+        enderecos.extend(range(self._total_registros, self._total_registros + anexados))
+        self._total_registros += anexados
+
+        # 2. Dados em ordem de offset, um write por trecho contíguo
+        self._gravar_registros((endereco, novo) for (_, _, novo), endereco in zip(parte, enderecos))
+
+        # 3. Índices: primário na ordem de sondagem; secundários agrupados por valor
+        endereco_da_chave = {chave: endereco for (_, chave, _), endereco in zip(parte, enderecos)}
+        for chave in self._ordenar_chaves(endereco_da_chave):
+            self._indice.inserir(chave, endereco_da_chave[chave])
+        for campo, secundario in self._secundarios.items():
+            for valor, endereco in sorted((getattr(novo, campo), endereco)
+                                          for (_, _, novo), endereco in zip(parte, enderecos)):
+                secundario.adicionar(valor, endereco)
+        if self._filtro is not None:
+            self._adicionar_ao_filtro(endereco_da_chave)
+        return enderecos
+
+    def delete_many(self, chaves):
+        # Lista alinhada com chaves: True se a chave existia e foi removida
+        chaves = list(chaves)
+        candidatas = set(chaves)
+        if self._filtro is not None:
+            # 0. Chaves certamente ausentes ficam de fora (nenhuma, nada a fazer)
+            with self._leitura():
+                candidatas = {chave for chave in candidatas if not self._fora_do_filtro(chave)}
+            if not candidatas:
+                return [False] * len(chaves)
+        with self._mutacao(), self._transacao():
+            # 1. Lápides no índice, na ordem de sondagem (remoção não faz o hash crescer)
+            removidos = {}
+            for chave in self._ordenar_chaves(candidatas):
+                endereco = self._indice.remover(chave)
+                if endereco != -1:
+                    removidos[chave] = endereco
+            if not removidos:
+                return [False] * len(chaves)
+
+            # 2. Registros lidos por trechos para tirar os valores dos índices secundários
+            enderecos = sorted(removidos.values())
+            registros = self._ler_registros(enderecos)
+            for campo, secundario in self._secundarios.items():
+                for valor, endereco in sorted((getattr(registros[endereco], campo), endereco) for endereco in enderecos):
+                    secundario.remover(valor, endereco)
+
+            # 3. Push de todos na pilha em ordem de offset: cada buraco aponta para o anterior
+            vazios = []
+            for endereco in enderecos:
+                vazios.append((endereco, self._no_livre(self._topo_pilha)))
+                self._topo_pilha = endereco
+                if self._livres is not None:
+                    self._livres.empilhar(endereco)
+            self._gravar_registros(vazios)
+            self._header_sujo = True
+            if metricas.ativo:
+                metricas.contar("pilha.pushes", len(vazios))
+            if self._filtro is not None:
+                for chave in removidos:
+                    self._filtro.remover(chave)
+        # Como em deletes sucessivos: só a primeira ocorrência de uma chave repetida retorna True
+        vistas = set()
+        resultados = []
+        for chave in chaves:
+            resultados.append(chave in removidos and chave not in vistas)
+            vistas.add(chave)
+        return resultados
+
+    # --- VARREDURA ---
+
+    def _slots_livres(self):
+        # Bitmap (1 bit por slot) dos endereços que estão na pilha de excluídos (em memória;
+        # percorrida no .dat só se ainda não foi carregada)
+        return self._espaco().bitmap(self._total_registros)
+
+    def scan(self, registros_por_bloco=REGISTROS_POR_BLOCO_SCAN, forma="registro"):
+        # Gera os registros vivos em ordem física, lendo o .dat em blocos grandes.
+        # Os buracos da pilha de excluídos são pulados por um bitmap (memória: 1 bit por slot
+        # mais um bloco; ao montar o bitmap, até BLOCOS_PILHA_SCAN blocos). Cada bloco é lido sob a trava de leitura; se houve mutação entre
+        # dois blocos, o bitmap é refeito antes do próximo.
+        # forma (FORMAS_SCAN): "tupla" e "visao" decodificam pelo codec, sem objeto ctypes por registro.
+        if forma not in FORMAS_SCAN:
+            raise ValueError(f"Erro: forma deve ser uma de {FORMAS_SCAN}.")
+        return self._varrer(registros_por_bloco, forma)
+
+    def _varrer(self, registros_por_bloco, forma):
+        tamanho = self.tamanho_registro
+        copiar = _copiador(self.struct_class, self.codec, forma)
+        endereco = 0
+        livres = versao = None
+        while True:
+            with self._leitura():
+                if versao != self._versao:
+                    livres, versao = self._slots_livres(), self._versao
+                fim = min(endereco + registros_por_bloco, self._total_registros)
+                if endereco >= fim:
+                    return
+                buffer = self._ler_dados(endereco * tamanho, (fim - endereco) * tamanho)
+
+            # Fora da trava: o bloco já está em memória
+            yield from _registros_do_bloco(buffer, endereco, fim, livres, tamanho, forma, copiar, self.codec)
+            endereco = fim
+
+    def buscar_por(self, campo, valor):
+        # Todos os registros com campo == valor (campo: um dos campos com índice secundário).
+        # Os endereços vêm do índice secundário e são lidos em ordem crescente de offset.
+        if campo not in self.campos_secundarios:
+            raise ValueError(f"Erro: campo '{campo}' não possui índice secundário.")
+        with self._leitura():
+            enderecos = sorted(self._secundarios[campo].enderecos(valor))
+            registros = self._ler_registros(enderecos)
+        return [registros[endereco] for endereco in enderecos]
+
+    def intervalo(self, inicio=None, fim=None, limite=None):
+        # Gera os registros com inicio <= chave <= fim, em ordem de chave (no máximo limite, se dado).
+        # Com árvore B+ segue as folhas; com hash precisa varrer e ordenar o índice inteiro.
+        # Os registros são lidos sob a trava de leitura, antes do primeiro yield: quem consome
+        # o gerador pode inserir/remover sem travar a si mesmo.
+        with self._leitura():
+            pares = self._pares_intervalo(inicio, fim)
+            registros = [self._ler_registro(endereco) for _, endereco in itertools.islice(pares, limite)]
+        yield from registros
+
+    def chaves_intervalo(self, inicio=None, fim=None):
+        # Só as chaves do intervalo, em ordem (nenhum registro lido). Quem percorre um intervalo
+        # em partes resolve as chaves uma vez e lê cada parte com get_many.
+        with self._leitura():
+            return [chave for chave, _ in self._pares_intervalo(inicio, fim)]
+
+    def _pares_intervalo(self, inicio, fim):
+        # (chave, endereço) em ordem de chave; só com a trava de leitura
+        if self.tipo_indice == "bmais":
+            return self._indice.intervalo(inicio, fim)
+        return sorted(
+            (chave, endereco) for chave, endereco in self._indice.itens()
+            if (inicio is None or chave >= inicio) and (fim is None or chave <= fim)
+        )
+
+    def compactar_indice(self):
+        # Hash: remove as lápides (rehash in-place). B+: reconstrói as páginas.
+        # Retorna quantas lápides/páginas foram recuperadas.
+        with self._mutacao():
+            if self._wal is not None and self.tipo_indice == "bmais":
+                # A árvore é reconstruída em outro arquivo e trocada: fica entre dois checkpoints
+                self.checkpoint()
+                recuperadas = self._indice.compactar()
+                self.checkpoint()
+                return recuperadas
+            with self._transacao():
+                return self._indice.compactar()
+
+    # --- ESTATÍSTICAS ---
+
+    def estatisticas(self):
+        # Estado da tabela: slots no arquivo de dados, pilha de excluídos e índice primário
+        with self._leitura():
+            if self.tipo_indice == "bmais":
+                indice = {"tipo": "bmais", "chaves": self._indice.total_chaves,
+                          "altura": self._indice.altura, "paginas": self._indice.total_paginas}
+            else:
+                indice = {"tipo": "hash", "sondagem": self._indice.sondagem,
+                          "funcao_hash": self._indice.funcao_hash, "capacidade": self._indice.capacidade,
+                          "ocupados": self._indice.tabela.ocupados, "lapides": self._indice.removidos,
+                          "fator_carga": self._indice.fator_carga, "em_rehash": self._indice.em_rehash}
+            estado = {"registros_fisicos": self._total_registros, "pilha_vazia": self._topo_pilha == -1,
+                      "indice": indice}
+            if self._livres is not None:
+                estado["slots_livres"] = len(self._livres)
+            if self._filtro is not None:
+                estado["filtro"] = self._filtro.estatisticas()
+            return estado
+
+    # --- COMPACTAÇÃO DOS DADOS (VACUUM) ---
+
+    def _arquivos_compactacao(self):
+        # (temporário, definitivo) de cada arquivo reescrito pela compactação
+        temporario_dados = _temporario_compactacao(self.arquivo_dados)
+        primario = self.arquivo_bmais if self.tipo_indice == "bmais" else self.arquivo_hash
+        trocas = [
+            (temporario_dados, self.arquivo_dados),
+            (_temporario_compactacao(self.arquivo_header), self.arquivo_header),
+            (_temporario_compactacao(primario), primario),
+        ]
+        for campo in self.campos_secundarios:
+            trocas.extend(zip(indice_secundario.caminhos_indice(temporario_dados, campo),
+                              indice_secundario.caminhos_indice(self.arquivo_dados, campo)))
+        return trocas
+
+    def _registros_em_ordem(self, pares):
+        # Registros de (chave, endereço) já ordenados por chave; cada parte é lida em ordem de offset
+        for inicio in range(0, len(pares), REGISTROS_POR_BLOCO):
+            parte = pares[inicio:inicio + REGISTROS_POR_BLOCO]
+            lidos = self._ler_registros([endereco for _, endereco in parte])
+            for _, endereco in parte:
+                yield lidos[endereco]
+
+    def compactar_dados(self):
+        # Vacuum: reescreve o arquivo de dados só com os registros vivos, em ordem de chave,
+        # refaz os índices com os endereços novos e esvazia a pilha de excluídos.
+        # Tudo é montado em arquivos temporários; o manifesto marca o ponto sem volta e as
+        # trocas que uma queda interromper são concluídas na próxima abertura.
+        # Retorna um resumo: registros vivos, slots liberados, bytes antes/depois e tempo.
+        inicio = time.perf_counter()
+        with self._mutacao():
+            # 1. Base inteira no disco (com WAL: checkpoint e log zerado)
+            self.flush()
+            trocas = self._arquivos_compactacao()
+            definitivos = [definitivo for _, definitivo in trocas]
+            bytes_antes = _tamanho_total(definitivos)
+            slots_antes = self._total_registros
+
+            # 2. Registros vivos em ordem de chave -> dados, índices e header temporários
+            pares = sorted(self._indice.itens())
+            temporarios = dict(trocas)
+            esquema = {}
+            if self.tipo_indice == "hash":
+                esquema = {"sondagem": self._indice.sondagem, "funcao_hash": self._indice.funcao_hash}
+            try:
+                carregar_tabela_em_lote(
+                    self._registros_em_ordem(pares), self.struct_class, self.campo_chave,
+                    trocas[0][0], _temporario_compactacao(self.arquivo_hash), trocas[1][0],
+                    self.limite_carga or utils_parte3.LIMITE_CARGA_PADRAO, tipo_indice=self.tipo_indice,
+                    arquivo_bmais=_temporario_compactacao(self.arquivo_bmais),
+                    campos_secundarios=self.campos_secundarios, **esquema)
+                for temporario in temporarios:
+                    _sincronizar(temporario)
+                _sincronizar_diretorios(definitivos)
+            except BaseException:
+                _descartar(temporarios)
+                raise
+
+            # 3. Manifesto gravado: a partir daqui a base nova é a que vale
+            manifesto = caminho_compactacao(self.arquivo_dados)
+            _gravar_manifesto(manifesto, trocas)
+
+            # 4. Fecha, troca os arquivos e reabre sobre os novos
+            self._fechar_arquivos()
+            try:
+                _trocar_arquivos(manifesto, trocas)
+                # As chaves são as mesmas: o filtro em memória vale para a base nova; a pilha
+                # de excluídos da base nova é vazia
+                self._livres = espaco_livre.EspacoLivre()
+                self._livres_no_disco = False
+                self._gravar_auxiliares()
+            finally:
+                self._abrir()
+            bytes_depois = _tamanho_total(definitivos)
+
+        return {
+            "registros": len(pares),
+            "slots_liberados": slots_antes - len(pares),
+            "bytes_antes": bytes_antes,
+            "bytes_depois": bytes_depois,
+            "bytes_recuperados": bytes_antes - bytes_depois,
+            "segundos": time.perf_counter() - inicio,
+        }
+
+    # --- FLUXO DO STORE ---
+    # 1. Abre dados, hash e header uma única vez (hash opcionalmente via mmap)
+    # 2. Mantém topo da pilha e total de registros em memória
+    # 3. insert/get/delete reutilizam os arquivos abertos e mantêm os índices secundários
+    # 4. buscar_por consulta um índice secundário e faz seek direto em cada registro
+    # 5. flush() grava o header e descarrega os buffers; close() também fecha
+    # 6. Com WAL, cada insert/delete é uma transação: um registro no log, fsync por
+    #    operação ou em grupo, e recuperação pelo log ao reabrir
+    # 7. get_many/insert_many/delete_many: índice resolvido primeiro, dados em ordem de
+    #    offset com registros vizinhos em uma única leitura/escrita
+    # 8. scan: blocos grandes em ordem física, buracos pulados pelo bitmap da pilha;
+    #    tuplas ou visões decodificadas pelo codec em vez de um objeto ctypes por registro
+    # 9. get/buscar_por/intervalo sob a trava de leitura; mutações sob a de escrita, com o
+    #    fsync do log esperado fora dela (group commit entre threads)
+    # 10. compactar_dados: vivos em ordem de chave em arquivos temporários, manifesto e
+    #     os.replace de cada arquivo; pilha de excluídos vazia
+    # 11. Com filtro, chaves certamente ausentes (get, delete, insert de chave nova) não leem
+    #     o índice; ele é gravado no close e remontado do índice se a base mudou depois
+    # 12. Pilha de excluídos em memória: pops sem leitura, lotes em trechos contíguos de
+    #     slots livres; gravada no close e, sem WAL, remontada do índice depois de uma queda
+
+# --- VARREDURA SEM ABRIR A TABELA ---
+
+class VarreduraDados:
+    """Scan somente leitura de um .dat: só dados e header são lidos, nenhum arquivo é criado."""
+
+    # Para exportar um arquivo sem abrir a tabela (abrir uma TabelaIndexada cria índice e
+    # header que faltem). Os buracos vêm de <base>_livres.dat, se ainda vale, ou do encadeamento
+    # a partir do topo do header; sem header, todos os slots são gerados (como um .dat novo).
+
+    def __init__(self, struct_class, campo_chave, arquivo_dados, arquivo_header=None):
+        self.struct_class = struct_class
+        self.campo_chave = campo_chave
+        self.tamanho_registro = ctypes.sizeof(struct_class)
+        self.codec = codec.obter(struct_class)
+        self.arquivo_dados = arquivo_dados
+        self.arquivo_header = arquivo_header or caminhos_tabela(arquivo_dados)[1]
+        self._deslocamento_chave = getattr(struct_class, campo_chave).offset
+
+    def scan(self, registros_por_bloco=REGISTROS_POR_BLOCO_SCAN, forma="registro"):
+        # Mesmos registros e formas de TabelaIndexada.scan (sem travas: ninguém deste store escreve)
+        if forma not in FORMAS_SCAN:
+            raise ValueError(f"Erro: forma deve ser uma de {FORMAS_SCAN}.")
+        return self._varrer(registros_por_bloco, forma)
+
+    def _topo(self):
+        if not os.path.exists(self.arquivo_header):
+            return -1
+        with open(self.arquivo_header, "rb") as f_header:
+            return models.Header.from_buffer_copy(f_header.read(ctypes.sizeof(models.Header))).topo_pilha
+
+    def _varrer(self, registros_por_bloco, forma):
+        tamanho = self.tamanho_registro
+        copiar = _copiador(self.struct_class, self.codec, forma)
+        with open(self.arquivo_dados, "rb") as f_dados:
+            ler_dados = concorrencia.leitor(f_dados)
+            total = os.fstat(f_dados.fileno()).st_size // tamanho
+            topo = self._topo()
+            espaco, _ = espaco_livre.carregar(caminho_livres(self.arquivo_dados),
+                                              _impressao_dados(self.arquivo_dados), topo)
+            if espaco is None:
+                espaco = espaco_livre.EspacoLivre(_percorrer_pilha(ler_dados, topo, total, tamanho,
+                                                                   self._deslocamento_chave))
+            livres = espaco.bitmap(total)
+            for endereco in range(0, total, registros_por_bloco):
+                fim = min(endereco + registros_por_bloco, total)
+                buffer = ler_dados(endereco * tamanho, (fim - endereco) * tamanho)
+                yield from _registros_do_bloco(buffer, endereco, fim, livres, tamanho, forma, copiar, self.codec)
+
+def _percorrer_pilha(ler_dados, topo, total_registros, tamanho, deslocamento):
+    # Endereços da pilha de excluídos a partir de topo, do topo para o fundo. O encadeamento é
+    # seguido sobre blocos inteiros do .dat guardados em memória (no máximo BLOCOS_PILHA_SCAN):
+    # uma leitura por bloco em vez de uma por nó. De cada nó só o campo chave é decodificado.
+    enderecos = []
+    blocos = {}
+    while topo != -1 and len(enderecos) <= total_registros:
+        enderecos.append(topo)
+        numero, indice = divmod(topo, REGISTROS_POR_BLOCO_SCAN)
+        bloco = blocos.get(numero)
+        if bloco is None:
+            if len(blocos) >= BLOCOS_PILHA_SCAN:
+                blocos.clear()
+            inicio = numero * REGISTROS_POR_BLOCO_SCAN
+            quantidade = min(REGISTROS_POR_BLOCO_SCAN, total_registros - inicio)
+            bloco = blocos[numero] = ler_dados(inicio * tamanho, quantidade * tamanho)
+        topo = CAMPO_CHAVE.unpack_from(bloco, indice * tamanho + deslocamento)[0]
+    return enderecos
+
+def _copiador(struct_class, codec_modelo, forma):
+    # Função (buffer, deslocamento) -> registro na forma pedida do scan
+    if forma == "registro":
+        return struct_class.from_buffer_copy
+    if forma == "tupla":
+        return codec_modelo.unpack_from
+    return codec_modelo.visao().mover
+
+def _registros_do_bloco(buffer, endereco, fim, livres, tamanho, forma, copiar, codec_modelo):
+    # Registros vivos de um bloco [endereco, fim) já lido, pulando os bits marcados em livres
+    deslocamentos = range(0, len(buffer), tamanho)
+    primeiro, ultimo = endereco >> 3, (fim + 7) >> 3
+    if livres.count(0, primeiro, ultimo) == ultimo - primeiro:
+        # Bloco sem buracos: nenhum teste de bit (tuplas: o bloco inteiro de uma vez)
+        if forma == "tupla":
+            yield from codec_modelo.iter_unpack(buffer)
+        else:
+            for deslocamento in deslocamentos:
+                yield copiar(buffer, deslocamento)
+    else:
+        for atual, deslocamento in zip(itertools.count(endereco), deslocamentos):
+            if not livres[atual >> 3] >> (atual & 7) & 1:
+                yield copiar(buffer, deslocamento)
+
+def _trechos(enderecos, lacuna):
+    # Agrupa endereços ordenados em intervalos [inicio, fim) com buracos de até lacuna registros
+    trechos = []
+    for endereco in enderecos:
+        if trechos and endereco - trechos[-1][1] <= lacuna:
+            trechos[-1][1] = endereco + 1
+        else:
+            trechos.append([endereco, endereco + 1])
+    return trechos
+
+# --- TROCA DE ARQUIVOS DA COMPACTAÇÃO ---
+
+def _garantir_diretorio(caminho):
+    # Cria o diretório de um arquivo se ainda não existe (nada é criado ao importar o pacote)
+    diretorio = os.path.dirname(caminho)
+    if diretorio and not os.path.isdir(diretorio):
+        os.makedirs(diretorio, exist_ok=True)
+
+def _tamanho_total(caminhos):
+    return sum(os.path.getsize(caminho) for caminho in caminhos if os.path.exists(caminho))
+
+def _sincronizar(caminho):
+    # fsync de um arquivo já fechado
+    fd = os.open(caminho, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _sincronizar_diretorios(caminhos):
+    # fsync dos diretórios: criações e renames passam a sobreviver a uma queda
+    for diretorio in set(os.path.dirname(os.path.abspath(caminho)) for caminho in caminhos):
+        try:
+            _sincronizar(diretorio)
+        except OSError:
+            # Alguns sistemas (ex.: Windows) não abrem diretórios; lá o rename já é durável
+            pass
+
+def _descartar(caminhos):
+    for caminho in caminhos:
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+def _gravar_manifesto(manifesto, trocas):
+    # Gravado em um temporário e trocado: o manifesto existe inteiro ou não existe
+    temporario = manifesto + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(trocas, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, manifesto)
+    _sincronizar_diretorios([manifesto])
+
+def _trocar_arquivos(manifesto, trocas):
+    # Temporário -> definitivo. Já trocados (queda no meio) são pulados. O manifesto só
+    # sai depois da última troca sincronizada.
+    for temporario, definitivo in trocas:
+        if os.path.exists(temporario):
+            os.replace(temporario, definitivo)
+    _sincronizar_diretorios([definitivo for _, definitivo in trocas])
+    os.remove(manifesto)
+
+def _retomar_compactacao(manifesto, trocas):
+    if os.path.exists(manifesto):
+        with open(manifesto, encoding="utf-8") as f:
+            _trocar_arquivos(manifesto, json.load(f))
+        log.warning("Recuperação: compactação concluída a partir de %s.", manifesto)
+    else:
+        _descartar([temporario for temporario, _ in trocas] + [manifesto + ".tmp"])
+
+# --- TABELAS DO PROJETO ---
+
+class AplicacaoStore(TabelaIndexada):
+    """Aplicações indexadas por cod_aplicacao, com índices secundários nas FKs."""
+
+    def __init__(self, arquivo_dados=None, arquivo_hash=None, arquivo_header=None, usar_mmap=False,
+                 limite_carga=None, tipo_indice="hash", arquivo_bmais=None, cache=None,
+                 durabilidade="nenhum", arquivo_wal=None, multiprocesso=False, sondagem=None,
+                 funcao_hash=None, filtro=None, arquivo_filtro=None):
+        super().__init__(models.AplicacaoVacina, "cod_aplicacao", arquivo_dados or models.FILE_APLICACOES,
+                         arquivo_hash or models.FILE_HASH, arquivo_header or models.FILE_HEADER,
+                         usar_mmap, limite_carga, tipo_indice, arquivo_bmais or models.FILE_BMAIS,
+                         indice_secundario.CAMPOS_SECUNDARIOS_APLICACAO, cache, durabilidade, arquivo_wal,
+                         multiprocesso, sondagem, funcao_hash, filtro, arquivo_filtro)
+
+class FuncionarioStore(TabelaIndexada):
+    """Funcionários indexados por cod."""
+
+    def __init__(self, arquivo_dados=None, **opcoes):
+        super().__init__(models.Funcionario, "cod", arquivo_dados or models.FILE_FUNCIONARIOS, **opcoes)
+
+class PacienteStore(TabelaIndexada):
+    """Pacientes indexados por cod_paciente."""
+
+    def __init__(self, arquivo_dados=None, **opcoes):
+        super().__init__(models.Paciente, "cod_paciente", arquivo_dados or models.FILE_PACIENTES, **opcoes)
+
+class VacinaStore(TabelaIndexada):
+    """Vacinas indexadas por cod_vacina."""
+
+    def __init__(self, arquivo_dados=None, **opcoes):
+        super().__init__(models.Vacina, "cod_vacina", arquivo_dados or models.FILE_VACINAS, **opcoes)
+
+# ================================================================================
+#                       CARGA EM LOTE (BULK LOAD)
+# ================================================================================
+# Cria uma base nova a partir de um iterável de registros (instâncias da struct ou
+# tuplas na ordem de _fields_). Os dados são gravados em blocos grandes e o índice
+# é montado inteiro em memória e gravado de uma vez, em vez de um inserir_na_hash
+# (seek/read/write) por registro.
+
+# Mesmo layout de AplicacaoVacina: 4 ints + char[11] + 1 byte de alinhamento (o codec do
+# modelo chega ao mesmo formato; mantido para quem já o passa em formato=)
+FORMATO_APLICACAO = struct.Struct("=4i11sx")
+REGISTROS_POR_BLOCO = 65536
+
+def carregar_tabela_em_lote(linhas, struct_class, campo_chave, arquivo_dados, arquivo_hash=None,
+                            arquivo_header=None, limite_carga=utils_parte3.LIMITE_CARGA_PADRAO,
+                            registros_por_bloco=REGISTROS_POR_BLOCO, tipo_indice="hash",
+                            arquivo_bmais=None, campos_secundarios=(), formato=None, sondagem="linear",
+                            funcao_hash="modulo"):
+    # Substitui dados, índices e header de uma TabelaIndexada. Retorna o número de registros indexados
+    # (linhas com chave repetida ocupam um slot do .dat, mas vão para a pilha de excluídos).
+    # formato: struct.Struct equivalente à struct ctypes para empacotar as tuplas (padrão: o codec do
+    # modelo, montado a partir de _fields_); nenhuma tupla vira objeto ctypes.
+    # sondagem/funcao_hash: esquema do índice hash primário (ver utils_parte3.SONDAGENS).
+    hash_padrao, header_padrao, bmais_padrao = caminhos_tabela(arquivo_dados)
+    arquivo_hash = arquivo_hash or hash_padrao
+    arquivo_header = arquivo_header or header_padrao
+    arquivo_bmais = arquivo_bmais or bmais_padrao
+
+    tamanho = ctypes.sizeof(struct_class)
+    formato = formato or codec.obter(struct_class).struct
+    posicoes = {nome: indice for indice, (nome, _) in enumerate(struct_class._fields_)}
+    posicao_chave = posicoes[campo_chave]
+    posicoes_secundarias = [(campo, posicoes[campo]) for campo in campos_secundarios]
+
+    chaves = array("i")
+    valores_secundarios = {campo: array("i") for campo in campos_secundarios}
+    bloco = bytearray(registros_por_bloco * tamanho)
+    no_bloco = 0
+
+    for caminho in (arquivo_dados, arquivo_hash, arquivo_header, arquivo_bmais):
+        _garantir_diretorio(caminho)
+
+    with open(arquivo_dados, "wb") as f_dados:
+        for linha in linhas:
+            # 1. Serializa direto no bloco (objeto ctypes é copiado como bytes)
+            inicio = no_bloco * tamanho
+            if isinstance(linha, struct_class):
+                bloco[inicio:inicio + tamanho] = bytes(linha)
+                chaves.append(getattr(linha, campo_chave))
+                for campo, _ in posicoes_secundarias:
+                    valores_secundarios[campo].append(getattr(linha, campo))
+            else:
+                formato.pack_into(bloco, inicio, *(
+                    valor.encode("utf-8") if isinstance(valor, str) else valor for valor in linha))
+                chaves.append(linha[posicao_chave])
+                for campo, posicao in posicoes_secundarias:
+                    valores_secundarios[campo].append(linha[posicao])
+            no_bloco += 1
+
+            # 2. Bloco cheio: uma única escrita grande
+            if no_bloco == registros_por_bloco:
+                f_dados.write(bloco)
+                no_bloco = 0
+        if no_bloco:
+            f_dados.write(memoryview(bloco)[:no_bloco * tamanho])
+
+    # 3. Índice primário montado em memória e gravado em uma passada (o outro tipo é apagado)
+    if tipo_indice == "bmais":
+        # Árvore construída de baixo para cima a partir das chaves ordenadas; nas duplicatas
+        # fica a primeira ocorrência (menor endereço), como no hash
+        pares = sorted((chave, endereco) for endereco, chave in enumerate(chaves))
+        unicos = [par for indice, par in enumerate(pares) if indice == 0 or pares[indice - 1][0] != par[0]]
+        duplicadas = sorted(set(endereco for _, endereco in pares) - set(endereco for _, endereco in unicos))
+        arvore_bmais.construir_arvore(arquivo_bmais, unicos)
+        for caminho in (arquivo_hash, arquivo_hash + ".antigo"):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+    else:
+        duplicadas = utils_parte3.construir_tabela_hash(arquivo_hash, chaves, limite_carga,
+                                                        sondagem=sondagem, funcao_hash=funcao_hash)
+        if os.path.exists(arquivo_bmais):
+            os.remove(arquivo_bmais)
+    if duplicadas:
+        log.warning("Aviso: %d chaves duplicadas ignoradas na indexação.", len(duplicadas))
+
+    # 4. Índices secundários (registros duplicados não entram, como no primário)
+    ignorados = set(duplicadas)
+    for campo in campos_secundarios:
+        caminho_hash, caminho_lista = indice_secundario.caminhos_indice(arquivo_dados, campo)
+        pares = ((endereco, valor) for endereco, valor in enumerate(valores_secundarios[campo])
+                 if endereco not in ignorados)
+        indice_secundario.construir_indice_secundario(caminho_hash, caminho_lista, pares,
+                                                      len(chaves), limite_carga)
+
+    # 5. Slots das duplicatas viram nós da pilha de excluídos (do menor endereço para o maior,
+    #    como a pilha remontada), senão o scan e as exportações os veriam como registros vivos
+    duplicadas = sorted(duplicadas)
+    if duplicadas:
+        deslocamento = getattr(struct_class, campo_chave).offset
+        no = bytearray(tamanho)
+        with open(arquivo_dados, "rb+") as f_dados:
+            for indice, endereco in enumerate(duplicadas):
+                proximo = duplicadas[indice + 1] if indice + 1 < len(duplicadas) else -1
+                CAMPO_CHAVE.pack_into(no, deslocamento, proximo)
+                f_dados.seek(endereco * tamanho)
+                f_dados.write(no)
+
+    # 6. Base nova: pilha só com as duplicatas, nenhum log antigo a reaplicar e nenhum filtro
+    #    das chaves antigas (o próximo store com filtro o monta)
+    with open(arquivo_header, "wb") as f_header:
+        f_header.write(models.Header(topo_pilha=duplicadas[0] if duplicadas else -1))
+    for caminho in (caminho_wal(arquivo_dados), caminho_filtro(arquivo_dados), caminho_livres(arquivo_dados)):
+        if os.path.exists(caminho):
+            os.remove(caminho)
+    return len(chaves) - len(duplicadas)
+
+def carregar_em_lote(linhas, arquivo_dados=None, arquivo_hash=None, arquivo_header=None,
+                     limite_carga=utils_parte3.LIMITE_CARGA_PADRAO, registros_por_bloco=REGISTROS_POR_BLOCO,
+                     tipo_indice="hash", arquivo_bmais=None, sondagem="linear", funcao_hash="modulo"):
+    # Aplicações: AplicacaoVacina ou tuplas (cod, cod_pac, cod_vac, cod_func, data)
+    return carregar_tabela_em_lote(
+        linhas, models.AplicacaoVacina, "cod_aplicacao", arquivo_dados or models.FILE_APLICACOES,
+        arquivo_hash or models.FILE_HASH, arquivo_header or models.FILE_HEADER, limite_carga,
+        registros_por_bloco, tipo_indice, arquivo_bmais or models.FILE_BMAIS,
+        indice_secundario.CAMPOS_SECUNDARIOS_APLICACAO, FORMATO_APLICACAO, sondagem, funcao_hash)
+
+# --- FLUXO DA CARGA EM LOTE ---
+# 1. Serializa cada linha direto em um bloco pré-alocado (tuplas pelo codec do modelo)
+# 2. Grava o bloco quando cheio (escritas grandes e sequenciais)
+# 3. Monta o índice em memória e grava cabeçalho + posições de uma vez
+# 4. Monta os índices secundários (FKs) da mesma forma
+# 5. Encadeia os slots das chaves repetidas como pilha de excluídos
+# 6. Reinicia o header (topo = primeira duplicata, ou pilha vazia)
@@ -1,118 +1,179 @@
-import ctypes
+import atexit
+import functools
 import random
 import os
+import threading
+from . import cache_paginas
+from . import config
+from . import exportacao
+from . import indice_secundario
+from . import logs
+from . import metricas
 from . import models
-from . import utils_parte3
+from . import particionamento
+from . import store
+
+log = logs.obter(__name__)
 
 # --- DADOS MOCK ---
 NOMES = ["Ana", "Carlos", "Bruno", "Daniela", "Eduardo", "Fernanda", "Gabriel", "Helena"]
 VACINAS = ["Pfizer", "Coronavac", "AstraZeneca", "Janssen"]
 
-# --- FUNÇÃO GENÉRICA DE EXPORTAÇÃO (PRINT) ---
+# --- FUNÇÕES DE EXPORTAÇÃO (LOG, CSV, JSON LINES) ---
 
 def exportar_base_para_log(arquivo_bin, struct_class, titulo):
-    """Lê um arquivo binário sequencialmente e escreve o __str__ no log txt."""
-    
-    tamanho_registro = ctypes.sizeof(struct_class)
+    """Varre os registros vivos do arquivo binário (em blocos) e escreve o __str__ no log txt."""
     
-    print(f"Exportando {titulo} para {models.LOG_DUMP}...")
+    log.info("Exportando %s para %s...", titulo, models.LOG_DUMP)
     
-    try:
-        with open(arquivo_bin, "rb") as f_in, open(models.LOG_DUMP, "a", encoding="utf-8") as f_log:
-            f_log.write(f"\n{'='*40}\nRELATÓRIO: {titulo}\n{'='*40}\n")
-            
-            contador = 0
-            while True:
-                buffer = f_in.read(tamanho_registro)
-                if not buffer:
-                    break
-                
-                registro = struct_class.from_buffer_copy(buffer)
-                f_log.write(str(registro) + "\n")
-                contador += 1
-            
-            f_log.write(f"\nTotal de registros: {contador}\n")
-            print(f"-> Sucesso. {contador} registros exportados.")
-            
-    except FileNotFoundError:
-        print(f"Erro: Arquivo {arquivo_bin} não encontrado.")
+    nome = _tabela_do_arquivo(arquivo_bin)
+    particionada = nome is not None and particionamento.ler_particoes(arquivo_bin) is not None
+    if not os.path.exists(arquivo_bin) and not particionada:
+        log.error("Erro: Arquivo %s não encontrado.", arquivo_bin)
+        return
+
+    # Store padrão já aberto (índice e pilha em memória) ou tabela particionada: exporta por ele.
+    # Senão o .dat é varrido somente leitura, sem abrir a tabela (nenhum índice ou header criado)
+    if particionada or _store_aberto(nome) is not None:
+        tabela = obter_store(nome)
+    else:
+        tabela = store.VarreduraDados(struct_class, struct_class._fields_[0][0], arquivo_bin, _arquivo_header(nome))
+    resultado = _exportar(tabela, models.LOG_DUMP, "texto", titulo)
+    log.info("-> Sucesso. %d registros exportados (%.1f MB/s).", resultado["registros"], resultado["mb_por_s"])
+
+def _exportar(tabela, destino, formato, titulo):
+    # Tabela particionada: uma parte por partição, escritas em paralelo
+    if isinstance(tabela, particionamento.TabelaParticionada):
+        return tabela.exportar(destino, formato, titulo)
+    return exportacao.exportar(tabela, destino, formato, titulo)
+
+def exportar_tabela(destino, tabela="aplicacoes", formato="csv"):
+    # Exporta os registros vivos de uma tabela padrão para CSV, JSON Lines ou texto
+    resultado = _exportar(obter_store(tabela), destino, formato, tabela.upper())
+    log.info("-> %d registros de %s exportados para %s (%.1f MB/s).",
+             resultado["registros"], tabela, destino, resultado["mb_por_s"])
+    return resultado
+
+def scan(tabela="aplicacoes"):
+    # Gera os registros vivos de uma tabela padrão, em ordem física
+    return obter_store(tabela).scan()
 
 # --- FUNÇÕES DE CRIAÇÃO DA BASE (POPULATE) ---
 
-def gerar_base_funcionarios():
-    print(f"Gerando {models.FILE_FUNCIONARIOS_SIZE} Funcionários...")
-    with open(models.FILE_FUNCIONARIOS, "wb") as f:
-        for i in range(1, models.FILE_FUNCIONARIOS_SIZE + 1):
-            func = models.Funcionario(
-                cod=i,
-                nome=random.choice(NOMES),
-                cpf=f"{random.randint(100,999)}.000.000-00",
-                data_nascimento="01/01/1990",
-                salario=random.uniform(2000, 5000)
-            )
-            f.write(func)
-
-def gerar_base_pacientes():
-    print(f"Gerando {models.FILE_PACIENTES_SIZE} Pacientes...")
-    with open(models.FILE_PACIENTES, "wb") as f:
-        for i in range(1, models.FILE_PACIENTES_SIZE + 1):
-            pac = models.Paciente(
-                cod=i,
-                nome=random.choice(NOMES),
-                cpf=f"{random.randint(100,999)}.111.222-33",
-                data_nascimento="15/05/1985",
-                endereco="Rua Exemplo, 123"
-            )
-            f.write(pac)
-
-def gerar_base_vacinas():
-    print(f"Gerando {models.FILE_VACINAS_SIZE} Vacinas...")
-    with open(models.FILE_VACINAS, "wb") as f:
-        for i in range(1, models.FILE_VACINAS_SIZE + 1):
-            vac = models.Vacina(
-                cod=i,
-                nome_fabricante=random.choice(VACINAS),
-                lote=f"LOTE-{random.randint(1000,9999)}",
-                data_validade="31/12/2030",
-                descricao="Vacina Viral"
-            )
-            f.write(vac)
-
-def gerar_base_aplicacoes():
+# As bases são gravadas pela carga em lote, que também monta o índice e o header de cada tabela.
+# Com particoes=N cada tabela vira N partições (chave % N), geradas em paralelo, um processo
+# por partição (ver particionamento.py); as linhas vêm de funções de módulo para isso.
+
+def _chaves(total, particao=0, particoes=1):
+    # Chaves 1..total da partição (chave % particoes == particao)
+    return range(particao or particoes, total + 1, particoes)
+
+def linhas_funcionarios(total, particao=0, particoes=1):
+    return (
+        models.Funcionario(
+            cod=i,
+            nome=random.choice(NOMES),
+            cpf=f"{random.randint(100,999)}.000.000-00",
+            data_nascimento="01/01/1990",
+            salario=random.uniform(2000, 5000)
+        )
+        for i in _chaves(total, particao, particoes)
+    )
+
+def linhas_pacientes(total, particao=0, particoes=1):
+    return (
+        models.Paciente(
+            cod=i,
+            nome=random.choice(NOMES),
+            cpf=f"{random.randint(100,999)}.111.222-33",
+            data_nascimento="15/05/1985",
+            endereco="Rua Exemplo, 123"
+        )
+        for i in _chaves(total, particao, particoes)
+    )
+
+def linhas_vacinas(total, particao=0, particoes=1):
+    return (
+        models.Vacina(
+            cod=i,
+            nome_fabricante=random.choice(VACINAS),
+            lote=f"LOTE-{random.randint(1000,9999)}",
+            data_validade="31/12/2030",
+            descricao="Vacina Viral"
+        )
+        for i in _chaves(total, particao, particoes)
+    )
+
+def linhas_aplicacoes(total, particao=0, particoes=1):
+    # Tuplas (sem objetos ctypes): a carga em lote empacota direto pelo codec do modelo
+    return (
+        (i, random.randint(1, 100), random.randint(1, 20), random.randint(1, 100), "20/01/2026")
+        for i in _chaves(total, particao, particoes)
+    )
+
+def _carregar_particionada(tabela, linhas, total, particoes):
+    struct_class, campo_chave, campos_secundarios = ESTRUTURAS[tabela]
+    formato = store.FORMATO_APLICACAO if tabela == "aplicacoes" else None
+    particionamento.carregar_em_paralelo(functools.partial(linhas, total), struct_class, campo_chave,
+                                         _arquivos_dados()[tabela], particoes,
+                                         campos_secundarios=campos_secundarios, formato=formato)
+
+def gerar_base_funcionarios(particoes=None):
+    log.info("Gerando %d Funcionários...", models.FILE_FUNCIONARIOS_SIZE)
+    fechar_store("funcionarios")
+    if particoes:
+        _carregar_particionada("funcionarios", linhas_funcionarios, models.FILE_FUNCIONARIOS_SIZE, particoes)
+        return
+    store.carregar_tabela_em_lote(linhas_funcionarios(models.FILE_FUNCIONARIOS_SIZE), models.Funcionario,
+                                  "cod", models.FILE_FUNCIONARIOS)
+
+def gerar_base_pacientes(particoes=None):
+    log.info("Gerando %d Pacientes...", models.FILE_PACIENTES_SIZE)
+    fechar_store("pacientes")
+    if particoes:
+        _carregar_particionada("pacientes", linhas_pacientes, models.FILE_PACIENTES_SIZE, particoes)
+        return
+    store.carregar_tabela_em_lote(linhas_pacientes(models.FILE_PACIENTES_SIZE), models.Paciente,
+                                  "cod_paciente", models.FILE_PACIENTES)
+
+def gerar_base_vacinas(particoes=None):
+    log.info("Gerando %d Vacinas...", models.FILE_VACINAS_SIZE)
+    fechar_store("vacinas")
+    if particoes:
+        _carregar_particionada("vacinas", linhas_vacinas, models.FILE_VACINAS_SIZE, particoes)
+        return
+    store.carregar_tabela_em_lote(linhas_vacinas(models.FILE_VACINAS_SIZE), models.Vacina,
+                                  "cod_vacina", models.FILE_VACINAS)
+
+def gerar_base_aplicacoes(particoes=None):
     # Requer que as outras bases existam para simular FKs validas (opcional, aqui é aleatorio)
     # * = Diferenças desta função para a da parte II
-    print(f"Gerando {models.FILE_APLICACOES_SIZE} Aplicações...")
-    # * inicialização do hashmap
-    utils_parte3.inicializar_hash_vazia()
-    with open(models.FILE_APLICACOES, "wb") as f:
-        # * abertura do arquivo de hashmap
-        with open(models.FILE_HASH, "rb+") as f_hash:
-            for i in range(1, models.FILE_APLICACOES_SIZE + 1):
-                app = models.AplicacaoVacina(
-                    cod=i,
-                    cod_pac=random.randint(1, 100),
-                    cod_vac=random.randint(1, 20),
-                    cod_func=random.randint(1, 100),
-                    data="20/01/2026"
-                )
-                f.write(app)
-                # * criar a base de aplicações também gera seu hashmap
-                utils_parte3.inserir_na_hash(i, i-1, f_hash)
+    log.info("Gerando %d Aplicações...", models.FILE_APLICACOES_SIZE)
+    # Os arquivos serão recriados: o store padrão não pode manter handles antigos
+    fechar_store("aplicacoes")
+    if particoes:
+        _carregar_particionada("aplicacoes", linhas_aplicacoes, models.FILE_APLICACOES_SIZE, particoes)
+        return
+    # * carga em lote: dados em blocos grandes e hashmap montado em memória (uma escrita)
+    store.carregar_em_lote(linhas_aplicacoes(models.FILE_APLICACOES_SIZE))
 
 # Função Wrapper para rodar tudo
-def recriar_bases():
-    if os.path.isfile(models.FILE_APLICACOES):
-        print("Erro: As bases já existem!")
+def recriar_bases(particoes=None):
+    # particoes=N: cada tabela em N partições, geradas em paralelo (None = um arquivo por tabela)
+    if os.path.isfile(models.FILE_APLICACOES) or particionamento.ler_particoes(models.FILE_APLICACOES):
+        log.error("Erro: As bases já existem!")
     else:    
+        config.obter().garantir_diretorios()
+
         # Limpa log antigo
         if os.path.exists(models.LOG_DUMP):
             os.remove(models.LOG_DUMP)
 
         # Gera Binários
-        gerar_base_funcionarios()
-        gerar_base_pacientes()
-        gerar_base_vacinas()
-        gerar_base_aplicacoes()
+        gerar_base_funcionarios(particoes)
+        gerar_base_pacientes(particoes)
+        gerar_base_vacinas(particoes)
+        gerar_base_aplicacoes(particoes)
 
         # Gera header
         models.inicializar_header()
@@ -126,199 +187,268 @@ def recriar_bases():
 #                                   NOVAS FUNÇÕES 
 # ================================================================================
 
+# --- INSTÂNCIAS PADRÃO DO MOTOR ---
+# As funções abaixo são wrappers finos sobre stores compartilhados (um por tabela),
+# que mantêm hash, header e dados abertos entre as chamadas. Uma tabela gerada com
+# particoes é aberta como TabelaParticionada (mesma interface, roteada por chave).
+
+TABELAS = {
+    "aplicacoes": store.AplicacaoStore,
+    "funcionarios": store.FuncionarioStore,
+    "pacientes": store.PacienteStore,
+    "vacinas": store.VacinaStore,
+}
+
+# Tabela padrão -> (struct, campo chave, campos secundários), para abrir as particionadas
+ESTRUTURAS = {
+    "aplicacoes": (models.AplicacaoVacina, "cod_aplicacao", indice_secundario.CAMPOS_SECUNDARIOS_APLICACAO),
+    "funcionarios": (models.Funcionario, "cod", ()),
+    "pacientes": (models.Paciente, "cod_paciente", ()),
+    "vacinas": (models.Vacina, "cod_vacina", ()),
+}
+
+_stores_padrao = {}
+# Opções repassadas a todos os stores padrão (ex.: durabilidade="grupo")
+_opcoes_padrao = {}
+# Cache de páginas compartilhado por todos os stores padrão (dados e índices)
+_cache_padrao = None
+# Abrir/fechar os stores padrão é serializado; as operações usam as travas de cada store
+_trava_stores = threading.RLock()
+
+def obter_cache():
+    global _cache_padrao
+    with _trava_stores:
+        if _cache_padrao is None:
+            _cache_padrao = cache_paginas.CacheDePaginas()
+        return _cache_padrao
+
+def configurar_cache(max_paginas=None, max_bytes=None, politica="lru"):
+    # Troca o cache dos stores padrão (fecha os abertos, que gravam as páginas sujas)
+    global _cache_padrao
+    with _trava_stores:
+        fechar_store()
+        _cache_padrao = cache_paginas.CacheDePaginas(max_paginas, max_bytes, politica=politica)
+        return _cache_padrao
+
+def configurar_base(configuracao=None, **opcoes):
+    # Passo explícito de configuração: diretório de dados/logs, tamanhos e capacidade inicial do
+    # hash (ver config.Configuracao). Fecha os stores padrão; reabrem sobre os arquivos novos.
+    with _trava_stores:
+        fechar_store()
+        return config.configurar(configuracao, **opcoes)
+
+def configurar_stores(**opcoes):
+    # Troca as opções dos stores padrão (fecha os abertos; reabrem na próxima chamada).
+    # Ex.: configurar_stores(multiprocesso=True) para vários processos sobre o mesmo files/
+    with _trava_stores:
+        fechar_store()
+        _opcoes_padrao.clear()
+        _opcoes_padrao.update(opcoes)
+
+def _arquivos_dados():
+    # Arquivo de dados de cada tabela padrão (lido de models a cada chamada)
+    return {
+        "aplicacoes": models.FILE_APLICACOES,
+        "funcionarios": models.FILE_FUNCIONARIOS,
+        "pacientes": models.FILE_PACIENTES,
+        "vacinas": models.FILE_VACINAS,
+    }
+
+def _arquivo_header(tabela):
+    # Header das tabelas padrão: o das aplicações é header.dat; as demais usam <tabela>_header.dat
+    return models.FILE_HEADER if tabela == "aplicacoes" else None
+
+def arquivos_tabela(tabela="aplicacoes"):
+    # Todos os arquivos de uma tabela padrão (existentes ou não), inclusive partições e manifesto
+    arquivo_dados = _arquivos_dados()[tabela]
+    caminhos = store.arquivos_tabela(arquivo_dados, arquivo_header=_arquivo_header(tabela),
+                                     campos_secundarios=ESTRUTURAS[tabela][2])
+    caminhos.append(particionamento.caminho_manifesto(arquivo_dados))
+    for particao in range(particionamento.ler_particoes(arquivo_dados) or 0):
+        caminhos.extend(particionamento.arquivos_particao(arquivo_dados, particao))
+    return caminhos
+
+def _tabela_do_arquivo(arquivo_dados):
+    # Nome da tabela padrão cujo arquivo de dados é arquivo_dados (None se nenhuma)
+    for nome, arquivo in _arquivos_dados().items():
+        if os.path.abspath(arquivo) == os.path.abspath(arquivo_dados):
+            return nome
+    return None
+
+def _store_aberto(tabela):
+    # Store padrão da tabela, se já foi aberto e não fechado (None senão)
+    atual = _stores_padrao.get(tabela)
+    return atual if atual is not None and not atual.fechado else None
+
+def obter_store(tabela="aplicacoes"):
+    # Abre (uma única vez) e retorna o store padrão da tabela sobre os arquivos de models
+    atual = _stores_padrao.get(tabela)
+    if atual is not None and not atual.fechado:
+        return atual
+    with _trava_stores:
+        atual = _stores_padrao.get(tabela)
+        if atual is None or atual.fechado:
+            atual = _stores_padrao[tabela] = _abrir_store(tabela)
+        return atual
+
+def _abrir_store(tabela):
+    arquivo_dados = _arquivos_dados()[tabela]
+    if particionamento.ler_particoes(arquivo_dados) is not None:
+        struct_class, campo_chave, campos_secundarios = ESTRUTURAS[tabela]
+        return particionamento.TabelaParticionada(struct_class, campo_chave, arquivo_dados,
+                                                  campos_secundarios=campos_secundarios,
+                                                  cache=obter_cache(), **_opcoes_padrao)
+    return TABELAS[tabela](cache=obter_cache(), **_opcoes_padrao)
+
+def _descarregar(store_padrao):
+    # Descarrega a cada mutação para que o disco reflita a operação (ex.: getsize no main).
+    # Com WAL a operação já está no log; o checkpoint fica para o close().
+    if store_padrao.durabilidade == "nenhum":
+        store_padrao.flush()
+
+def fechar_store(tabela=None):
+    # Grava o header pendente e fecha os arquivos do store padrão (de todas as tabelas se None)
+    with _trava_stores:
+        for nome in ([tabela] if tabela is not None else list(_stores_padrao)):
+            atual = _stores_padrao.pop(nome, None)
+            if atual is not None:
+                atual.close()
+
+atexit.register(fechar_store)
+
+@metricas.medir("inserir_aplicacao")
 def inserir_aplicacao(nova_app):
-    # Insere uma aplicação gerenciando manualmente o Header de espaços vazios.
-    
-    print(f"--- Inserindo Aplicação ID {nova_app.cod_aplicacao} ---")
-    
-    # 0. Garante que o Header existe (criação manual se não existir)
-    if not os.path.exists(models.FILE_HEADER):
-        with open(models.FILE_HEADER, "wb") as f_criacao:
-            h_init = models.Header(topo_pilha=-1)
-            f_criacao.write(h_init)
-
-    endereco_final = -1
-
-    # 1. Abrir e Ler o Header
-    # "rb+" pois pode precisar atualizar o topo depois
-    with open(models.FILE_HEADER, "rb+") as f_header:
-        # Ler o que há no header
-        f_header.seek(0)
-        header = models.Header.from_buffer_copy(f_header.read(ctypes.sizeof(models.Header)))
-        
-        # 2. Verificar se há espaço na Pilha de Excluídos
-        # se header for -1, ignora e escreve no fim
-        if header.topo_pilha != -1:
-            print(f"-> Header aponta para índice {header.topo_pilha}. Reutilizando espaço...")
-            
-            # --- Lógica de reutilização - pop no stack ---
-            endereco_reutilizado = header.topo_pilha
-            
-            with open(models.FILE_APLICACOES, "rb+") as f_dados:
-                # 3. Abrir arquivo de aplicações e ir até o registro que será sobrescrito
-                offset = endereco_reutilizado * models.RECORD_SIZE_APLIC
-                f_dados.seek(offset)
-                
-                # 4. Ler o ponteiro para o próximo
-                # O registro antigo guarda no campo 'cod_aplicacao' o próximo índice livre
-                buffer_lixo = f_dados.read(models.RECORD_SIZE_APLIC)
-                registro_lixo = models.AplicacaoVacina.from_buffer_copy(buffer_lixo)
-                proximo_na_pilha = registro_lixo.cod_aplicacao
-                
-                # Mudança vs lógica do desafio 5: O registro é propositalmente tratado como lixo 
-                # porque se o header aponta para cá, sabe-se que é lixo
-                
-                # Logo, se lê o código que estaria na estrutura "AplicacaoVacina" e o trata como o "endereçamento" do próximo bloco livre
-                # Isso continua até que o cod_aplicacao seja "-1"
-
-                # 5. Sobrescrever com o novo dado
-                f_dados.seek(offset)
-                f_dados.write(nova_app)
-            
-            # 6. Devolver ao header o que havia no registro
-            header.topo_pilha = proximo_na_pilha
-            
-            # Atualiza o arquivo header fisicamente
-            f_header.seek(0)
-            f_header.write(header)
-            
-            # 7. Endereço para inserção encontrado
-            endereco_final = endereco_reutilizado
-
-        else:
-            print("-> Header indica pilha vazia (-1). Inserindo no final (Append)...")
-            
-            # --- Lógida de append ao EOF Padrão ---
-            with open(models.FILE_APLICACOES, "ab") as f_dados_append:
-                # Pega a posição atual (fim do arquivo) para saber o índice
-                f_dados_append.seek(0, 2) # Fim
-                bytes_total = f_dados_append.tell()
-                endereco_final = bytes_total // models.RECORD_SIZE_APLIC
-                
-                f_dados_append.write(nova_app)
-                # O header não muda aqui, continua -1
-
-    # 8. Atualizar a Tabela Hash
-    # Chave -> Novo Endereço Físico
-    if endereco_final != -1:
-        print(f"-> Atualizando Hash: Chave {nova_app.cod_aplicacao} -> Endereço {endereco_final}")
-        with open(models.FILE_HASH, "rb+") as f_hash:
-            # A chave permanece a mesma que existia antes
-            utils_parte3.inserir_na_hash(nova_app.cod_aplicacao, endereco_final, f_hash)
-
-    # --- FLUXO DE INSERÇÃO ---
-    # 1. Abrir e Ler o Header
-    # 2. Verificar se há espaço na Pilha de Excluídos
-    # 3. Abrir arquivo de aplicações e ir até o registro que será sobrescrito
-    # 4. Ler o ponteiro para o próximo
-    # 5. Sobrescrever com o novo dado
-    # 6. Devolver ao header o que havia no registro
-    # 7. Endereço para inserção encontrado
-    # 8. Atualizar a Tabela Hash
+    # Insere uma aplicação reutilizando a pilha de excluídos (ver AplicacaoStore.insert)
+    log.debug("--- Inserindo Aplicação ID %s ---", nova_app.cod_aplicacao)
 
+    store_padrao = obter_store()
+    endereco_final = store_padrao.insert(nova_app)
+    if endereco_final == -1:
+        return -1
+    _descarregar(store_padrao)
+
+    log.debug("-> Atualizando Hash: Chave %s -> Endereço %d", nova_app.cod_aplicacao, endereco_final)
+    return endereco_final
 
 # Retorna None se não existe
+@metricas.medir("buscar_aplicacao")
 def buscar_aplicacao(id_busca):
-    print(f"--- Iniciando busca pelo ID: {id_busca} ---")
-    
-    endereco_fisico_encontrado = -1
-
-    # 1. Abre o arquivo de hash para consulta
-    with open(models.FILE_HASH, "rb") as f_hash:
-        # 2. Delega a lógica de busca (Linear Probing/Estados) para a função interna
-        # A função já retorna o endereço físico ou -1 se não encontrar
-        endereco_fisico_encontrado = utils_parte3.buscar_na_hash(id_busca, f_hash)
-
-    # 3. Verifica se o endereço físico foi encontrado
-    if endereco_fisico_encontrado != -1:
-        print(f"-> Registro encontrado! Endereço físico: {endereco_fisico_encontrado}")
-        
-        # 4. Acesso Direto ao Arquivo de Dados (Seek Direto)
-        with open(models.FILE_APLICACOES, "rb") as f_dados:
-            # 5. Calcula o deslocamento (offset) baseado no endereço recuperado
-            offset_dados = endereco_fisico_encontrado * ctypes.sizeof(models.AplicacaoVacina)
-            f_dados.seek(offset_dados)
-            
-            # 6. Lê e reconstrói o objeto AplicacaoVacina
-            buffer_dados = f_dados.read(ctypes.sizeof(models.AplicacaoVacina))
-            if buffer_dados:
-                return models.AplicacaoVacina.from_buffer_copy(buffer_dados)
-    
-    print(f"-> ID {id_busca} não localizado na base de dados.")
-    return None
+    log.debug("--- Iniciando busca pelo ID: %s ---", id_busca)
 
-# --- FLUXO DA FUNÇÃO ---
-# 1. Abre arquivo de hash
-# 2. Delega busca para buscar_na_hash()
-# 3. Recebe o endereço físico (ou -1)
-# 4. Se encontrou, abre o arquivo de aplicações
-# 5. Realiza o seek direto no endereço físico
-# 6. Retorna o objeto encontrado
+    registro = obter_store().get(id_busca)
+    if registro is not None:
+        return registro
+
+    log.debug("-> ID %s não localizado na base de dados.", id_busca)
+    return None
 
+@metricas.medir("remover_aplicacao")
 def remover_aplicacao(id_busca):
-    print(f"--- Iniciando remoção do ID: {id_busca} ---")
-    
-    # 1. Localizar o endereço físico antes de remover do hash
-    # Precisa saber onde o dado está no .dat para poder marcar como livre
-    endereco_fisico = -1
-    with open(models.FILE_HASH, "rb") as f_hash_leitura:
-        # busca pelo proprio hashmap
-        endereco_fisico = utils_parte3.buscar_na_hash(id_busca, f_hash_leitura)
-    
-    if endereco_fisico == -1:
-        print(f"Erro: ID {id_busca} não encontrado na base.")
-        return False
+    log.debug("--- Iniciando remoção do ID: %s ---", id_busca)
 
-    # 2. Atualizar o Hashmap
-    # Abre o hashmap em modo de escrita para usar a função remover_da_hash
-    with open(models.FILE_HASH, "rb+") as f_hash_escrita:
-        sucesso_hash = utils_parte3.remover_da_hash(id_busca, f_hash_escrita)
-    
-    if not sucesso_hash:
+    store_padrao = obter_store()
+    if not store_padrao.delete(id_busca):
+        log.warning("Erro: ID %s não encontrado na base.", id_busca)
         return False
+    _descarregar(store_padrao)
 
-    # 3. Gerenciamento de Espaço (Pilha de Excluídos)
-    # Rrealizar o Push deste endereço na pilha de vazios
-    
-    # 4. Abrir o Header para pegar o topo atual
-    if not os.path.exists(models.FILE_HEADER):
-        with open(models.FILE_HEADER, "wb") as f_init:
-            f_init.write(models.Header(topo_pilha=-1))
-
-    with open(models.FILE_HEADER, "rb+") as f_header:
-        f_header.seek(0)
-        header = models.Header.from_buffer_copy(f_header.read(ctypes.sizeof(models.Header)))
-        topo_antigo = header.topo_pilha
-        
-        # 5. Ir ao arquivo de aplicações e transformar o registro em um "nó" da pilha
-        with open(models.FILE_APLICACOES, "rb+") as f_dados:
-            offset = endereco_fisico * ctypes.sizeof(models.AplicacaoVacina)
-            f_dados.seek(offset)
-            
-            # 6. Criar um registro vazio onde o ID armazena o "endereço" para o próximo buraco
-            registro_vazio = models.AplicacaoVacina()
-            registro_vazio.cod_aplicacao = topo_antigo # O campo cod vira o ponteiro de endereço
-            registro_vazio.cod_funcionario_fk = 0
-            registro_vazio.cod_paciente_fk = 0
-            registro_vazio.cod_vacina_fk = 0
-            # Zera todos os registros para identificar que é um registro vazio
-            
-            f_dados.write(registro_vazio)
-            
-        # 7. Atualizar o Header para que o novo buraco seja o topo
-        header.topo_pilha = endereco_fisico
-        f_header.seek(0)
-        f_header.write(header)
-
-    print(f"-> Sucesso: Espaço no índice {endereco_fisico} liberado e adicionado à pilha.")
+    log.debug("-> Sucesso: ID %s removido e espaço adicionado à pilha.", id_busca)
     return True
 
-# --- FLUXO DE REMOÇÃO ---
-# 1. Localizar o endereço físico antes de remover do hash
-# 2. Atualizar o Hashmap
-# 3. Gerenciamento de Espaço (Pilha de Excluídos)
-# 4. Abrir o Header para pegar o topo atual
-# 5. Ir ao arquivo de aplicações e transformar o registro em um "nó" da pilha
-# 6. Criar um registro vazio onde o ID armazena o "endereço" para o próximo buraco
-# 7. Atualizar o Header para que o novo buraco seja o topo
+# --- OPERAÇÕES EM LOTE ---
+# Um acesso ao store para o lote inteiro: índice resolvido primeiro e registros lidos/gravados
+# em ordem de offset (ver TabelaIndexada.get_many/insert_many/delete_many)
+
+@metricas.medir("inserir_aplicacoes")
+def inserir_aplicacoes(novas_apps):
+    # Retorna os endereços (-1 para chave já existente), na ordem de novas_apps
+    novas_apps = list(novas_apps)
+    log.debug("--- Inserindo %d Aplicações em lote ---", len(novas_apps))
+
+    store_padrao = obter_store()
+    enderecos = store_padrao.insert_many(novas_apps)
+    _descarregar(store_padrao)
+
+    log.info("-> %d inseridas.", sum(1 for endereco in enderecos if endereco != -1))
+    return enderecos
+
+@metricas.medir("buscar_aplicacoes")
+def buscar_aplicacoes(ids_busca):
+    # Retorna os registros (None onde o ID não existe), na ordem de ids_busca
+    ids_busca = list(ids_busca)
+    log.debug("--- Buscando %d IDs em lote ---", len(ids_busca))
+    return obter_store().get_many(ids_busca)
+
+@metricas.medir("remover_aplicacoes")
+def remover_aplicacoes(ids_busca):
+    # Retorna True/False por ID, na ordem de ids_busca
+    ids_busca = list(ids_busca)
+    log.debug("--- Removendo %d IDs em lote ---", len(ids_busca))
+
+    store_padrao = obter_store()
+    removidos = store_padrao.delete_many(ids_busca)
+    _descarregar(store_padrao)
+
+    for id_busca, removido in zip(ids_busca, removidos):
+        if not removido:
+            log.warning("Erro: ID %s não encontrado na base.", id_busca)
+    log.info("-> Sucesso: %d IDs removidos e espaços adicionados à pilha.", sum(removidos))
+    return removidos
+
+# --- MÉTRICAS ---
+# Desligadas por padrão (metricas.ativar() ou iniciar_despejo_metricas() para ligar)
+
+def stats():
+    # Contadores e histogramas (metricas.py), cache de páginas e estado de cada store padrão aberto
+    resultado = metricas.stats()
+    resultado["cache"] = _cache_padrao.estatisticas() if _cache_padrao is not None else None
+    resultado["tabelas"] = {nome: atual.estatisticas() for nome, atual in list(_stores_padrao.items())
+                            if not atual.fechado}
+    return resultado
+
+def iniciar_despejo_metricas(intervalo=metricas.INTERVALO_DESPEJO, caminho=None):
+    # Liga as métricas e acrescenta stats() em Logs/metricas.jsonl a cada intervalo segundos.
+    # Retorna o Despejo (despejo.parar() encerra e grava um último registro).
+    if caminho is None:
+        config.obter().garantir_diretorios()
+    return metricas.iniciar_despejo(caminho or os.path.join(models.LOGS_PATH, "metricas.jsonl"),
+                                    intervalo, fonte=stats)
+
+# --- COMPACTAÇÃO (VACUUM) ---
+
+def compactar_tabela(tabela="aplicacoes"):
+    # Reescreve a tabela só com os registros vivos (ver TabelaIndexada.compactar_dados)
+    log.info("Compactando %s...", tabela)
+    resumo = obter_store(tabela).compactar_dados()
+    log.info("-> %d registros vivos, %d slots liberados, %d bytes recuperados em %.2f s.",
+             resumo["registros"], resumo["slots_liberados"], resumo["bytes_recuperados"], resumo["segundos"])
+    return resumo
+
+# --- CONSULTAS PELOS ÍNDICES SECUNDÁRIOS ---
+
+def buscar_aplicacoes_por_paciente(cod_paciente):
+    return obter_store().buscar_por("cod_paciente_fk", cod_paciente)
+
+def buscar_aplicacoes_por_vacina(cod_vacina):
+    return obter_store().buscar_por("cod_vacina_fk", cod_vacina)
+
+def buscar_aplicacoes_por_funcionario(cod_funcionario):
+    return obter_store().buscar_por("cod_funcionario_fk", cod_funcionario)
+
+# --- ACESSO PELA CHAVE NAS DEMAIS TABELAS ---
+
+def buscar_funcionario(cod):
+    return obter_store("funcionarios").get(cod)
+
+def buscar_paciente(cod_paciente):
+    return obter_store("pacientes").get(cod_paciente)
+
+def buscar_vacina(cod_vacina):
+    return obter_store("vacinas").get(cod_vacina)
 
+def resolver_aplicacao(aplicacao):
+    # Resolve as FKs de uma aplicação pelo índice de cada tabela (sem varrer os .dat).
+    # Retorna (paciente, vacina, funcionario); None onde a FK não existe.
+    return (buscar_paciente(aplicacao.cod_paciente_fk),
+            buscar_vacina(aplicacao.cod_vacina_fk),
+            buscar_funcionario(aplicacao.cod_funcionario_fk))
@@ -1,75 +1,1046 @@
 import os
+import math
+import mmap
+from array import array
+from modules import concorrencia
+from modules import logs
+from modules import metricas
 from modules import models
 import ctypes
 
+log = logs.obter(__name__)
+
 #         ("cod_chave", ctypes.c_int),      # Chave de busca (ID da aplicação)
 #         ("endereco_dados", ctypes.c_int), # Índice físico no arquivo .dat (0, 1, 2...)
 #         ("estado", ctypes.c_int)          # 0=Livre, 1=Ocupado, 2=Removido
 
-def inicializar_hash_vazia():
+# --- FORMATO DO ARQUIVO DE HASH ---
+# [CabecalhoHash][RegistroHash 0][RegistroHash 1]...[RegistroHash capacidade-1]
+# A capacidade é lida do cabeçalho; TAMANHO_HASH_TABLE só define a capacidade inicial.
+# Arquivos antigos (sem cabeçalho) continuam legíveis: a capacidade vem do tamanho do arquivo.
+
+MAGIC_HASH = 0x48534831 # "HSH1"
+VERSAO_HASH = 1
+LIMITE_CARGA_PADRAO = 0.7
+PASSO_REHASH_PADRAO = 64 # Posições da tabela antiga migradas por operação de escrita
+
+TAMANHO_CABECALHO_HASH = ctypes.sizeof(models.CabecalhoHash)
+TAMANHO_REGISTRO_HASH = ctypes.sizeof(models.RegistroHash)
+CAMPOS_POR_REGISTRO = TAMANHO_REGISTRO_HASH // ctypes.sizeof(ctypes.c_int)
+
+# --- ESQUEMAS DE SONDAGEM E FUNÇÕES DE HASH ---
+# Gravados no cabeçalho (campos sondagem e funcao_hash; o código é a posição na tupla).
+# Arquivos anteriores têm zeros ali, ou seja, linear + módulo: o comportamento original.
+#   linear      h, h+1, h+2, ...
+#   quadratica  h, h+1, h-1, h+4, h-4, ... (capacidade prima ≡ 3 mod 4: visita todas as posições)
+#   dupla       h, h+p, h+2p, ... com passo p = 1 + h2(chave) % (capacidade - 1) (capacidade prima)
+#   robin_hood  sequência linear; na inserção a chave mais longe de casa fica com a posição,
+#               a busca para ao encontrar uma chave mais perto de casa que a distância atual
+#               e a remoção puxa as chaves seguintes uma posição para trás (sem lápides)
+# Funções da posição inicial h:
+#   modulo      chave % capacidade
+#   mistura     finalizador do MurmurHash3 (multiplicações e xor-shifts) % capacidade:
+#               chaves sequenciais deixam de ocupar posições vizinhas
+
+SONDAGENS = ("linear", "quadratica", "dupla", "robin_hood")
+FUNCOES_HASH = ("modulo", "mistura")
+SONDAGEM_LINEAR, SONDAGEM_QUADRATICA, SONDAGEM_DUPLA, SONDAGEM_ROBIN_HOOD = range(len(SONDAGENS))
+HASH_MODULO, HASH_MISTURA = range(len(FUNCOES_HASH))
+
+def codigo_sondagem(nome):
+    if nome not in SONDAGENS:
+        raise ValueError(f"Erro: sondagem deve ser uma de {SONDAGENS}.")
+    return SONDAGENS.index(nome)
+
+def codigo_funcao_hash(nome):
+    if nome not in FUNCOES_HASH:
+        raise ValueError(f"Erro: funcao_hash deve ser uma de {FUNCOES_HASH}.")
+    return FUNCOES_HASH.index(nome)
+
+def misturar(chave):
+    # Finalizador de 32 bits do MurmurHash3
+    h = chave & 0xFFFFFFFF
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & 0xFFFFFFFF
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & 0xFFFFFFFF
+    return h ^ (h >> 16)
+
+def primo_para(minimo, sondagem=SONDAGEM_LINEAR):
+    # Menor primo >= minimo; na sondagem quadrática, também ≡ 3 (mod 4)
+    primo = models.find_closest_prime(minimo)
+    while sondagem == SONDAGEM_QUADRATICA and primo % 4 != 3:
+        primo = models.find_closest_prime(primo + 1)
+    return primo
+
+def criar_tabela_hash(caminho, capacidade, limite_carga=LIMITE_CARGA_PADRAO, cursor_rehash=-1,
+                      sondagem="linear", funcao_hash="modulo"):
+    # Cria um arquivo de hash vazio com cabeçalho.
+    # As posições são preenchidas por truncate (zeros): estado 0 já significa Livre,
+    # então criar uma tabela de qualquer tamanho não exige escrever posição por posição.
+    codigo = codigo_sondagem(sondagem)
+    if codigo in (SONDAGEM_QUADRATICA, SONDAGEM_DUPLA):
+        # Essas sequências só passam por todas as posições com capacidade prima
+        capacidade = primo_para(capacidade, codigo)
+    cabecalho = models.CabecalhoHash(
+        magic=MAGIC_HASH,
+        versao=VERSAO_HASH,
+        capacidade=capacidade,
+        ocupados=0,
+        removidos=0,
+        cursor_rehash=cursor_rehash,
+        limite_carga=limite_carga,
+        sondagem=codigo,
+        funcao_hash=codigo_funcao_hash(funcao_hash)
+    )
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as f:
+        f.write(cabecalho)
+        f.truncate(TAMANHO_CABECALHO_HASH + capacidade * TAMANHO_REGISTRO_HASH)
+    # Troca atômica: nunca existe um arquivo de hash pela metade
+    os.replace(temporario, caminho)
+
+def capacidade_para(total_chaves, limite_carga=LIMITE_CARGA_PADRAO, sondagem=SONDAGEM_LINEAR):
+    # Primo próximo ao dobro das chaves (mesma regra de TAMANHO_HASH_TABLE), respeitando o limite
+    minimo = max(models.TAMANHO_HASH_TABLE, 2 * total_chaves, math.ceil(total_chaves / limite_carga) + 1)
+    return primo_para(minimo, sondagem)
+
+def construir_tabela_hash(caminho, chaves, limite_carga=LIMITE_CARGA_PADRAO, enderecos=None,
+                          sondagem="linear", funcao_hash="modulo"):
+    # Constrói o índice inteiro em memória e grava em uma única passada sequencial.
+    # chaves[i] é a chave do registro no endereço físico i (ou enderecos[i], se informado).
+    # Retorna os endereços das duplicatas ignoradas (a primeira ocorrência é a indexada).
+    codigo = codigo_sondagem(sondagem)
+    funcao = codigo_funcao_hash(funcao_hash)
+    capacidade = capacidade_para(len(chaves), limite_carga, codigo)
+    duplicadas = []
+
+    if codigo == SONDAGEM_LINEAR:
+        # 1. Posições como inteiros planos [cod_chave, endereco_dados, estado, ...] (zeros = livres)
+        campos = array("i", bytes(capacidade * TAMANHO_REGISTRO_HASH))
+        ocupados = 0
+        mistura = funcao == HASH_MISTURA
+
+        # 2. Sondagem linear em memória, sem nenhuma ida ao disco
+        for indice, chave in enumerate(chaves):
+            endereco_fisico = indice if enderecos is None else enderecos[indice]
+            posicao = (misturar(chave) if mistura else chave) % capacidade
+            while True:
+                base = posicao * CAMPOS_POR_REGISTRO
+                if campos[base + 2] == 0:
+                    campos[base] = chave
+                    campos[base + 1] = endereco_fisico
+                    campos[base + 2] = 1
+                    ocupados += 1
+                    break
+                if campos[base] == chave:
+                    duplicadas.append(endereco_fisico)
+                    break
+                posicao += 1
+                if posicao >= capacidade:
+                    posicao = 0
+    else:
+        # Demais esquemas: a mesma lógica da tabela em disco, sobre uma tabela em memória
+        tabela = TabelaHashMemoria(capacidade, limite_carga, codigo, funcao)
+        for indice, chave in enumerate(chaves):
+            endereco_fisico = indice if enderecos is None else enderecos[indice]
+            if tabela._sondar(chave)[0] != -1:
+                duplicadas.append(endereco_fisico)
+            else:
+                tabela._colocar(chave, endereco_fisico)
+        campos = tabela.campos
+        ocupados = tabela.ocupados
+
+    # 3. Cabeçalho + posições em uma escrita sequencial, com troca atômica
+    cabecalho = models.CabecalhoHash(
+        magic=MAGIC_HASH,
+        versao=VERSAO_HASH,
+        capacidade=capacidade,
+        ocupados=ocupados,
+        removidos=0,
+        cursor_rehash=-1,
+        limite_carga=limite_carga,
+        sondagem=codigo,
+        funcao_hash=funcao
+    )
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as f:
+        f.write(cabecalho)
+        f.write(campos)
+    os.replace(temporario, caminho)
+    # A tabela nova tem cursor_rehash = -1: uma tabela antiga que sobrou não é mais usada
+    if os.path.exists(caminho + ".antigo"):
+        os.remove(caminho + ".antigo")
+    return duplicadas
+
+def esquema_do_arquivo(caminho):
+    # (sondagem, funcao_hash) gravados no cabeçalho de um arquivo de hash
+    with open(caminho, "rb") as f:
+        tabela = TabelaHashArquivo(f)
+        return SONDAGENS[tabela.sondagem], FUNCOES_HASH[tabela.funcao_hash]
+
+def converter_esquema(caminho, sondagem=None, funcao_hash=None):
+    # Reconstrói o arquivo de hash com outro esquema (None mantém o atual), com as mesmas
+    # chaves e endereços. Retorna False se o arquivo já usa o esquema pedido.
+    atual = esquema_do_arquivo(caminho)
+    pedido = (sondagem or atual[0], funcao_hash or atual[1])
+    if pedido == atual:
+        return False
+    indice = IndiceHash(caminho)
+    pares = list(indice.itens())
+    limite_carga = indice.tabela.limite_carga
+    indice.close()
+    construir_tabela_hash(caminho, [chave for chave, _ in pares], limite_carga,
+                          [endereco for _, endereco in pares], *pedido)
+    log.info("Índice %s convertido de %s/%s para %s/%s.", caminho, *atual, *pedido)
+    return True
+
+def inicializar_hash_vazia(caminho=None):
     # Cria o arquivo de hash preenchido com registros vazios (estado=0)"""
-    print(f"Inicializando Tabela Hash com {models.TAMANHO_HASH_TABLE} posições...")
-    registro_vazio = models.RegistroHash(0, -1, 0) # estado 0 = Livre
-    
-    with open(models.FILE_HASH, "wb") as f:
-        for _ in range(models.TAMANHO_HASH_TABLE):
-            f.write(registro_vazio)
+    log.info("Inicializando Tabela Hash com %d posições...", models.TAMANHO_HASH_TABLE)
+    caminho = caminho or models.FILE_HASH
+    # Uma tabela antiga de um rehash anterior não pertence à base nova
+    if os.path.exists(caminho + ".antigo"):
+        os.remove(caminho + ".antigo")
+    criar_tabela_hash(caminho, models.TAMANHO_HASH_TABLE)
+
+def hash_function(chave, tamanho=None, funcao_hash=HASH_MODULO):
+    # Retorna a posição inicial: resto da divisão (da chave ou da chave misturada)
+    if funcao_hash == HASH_MISTURA:
+        chave = misturar(chave)
+    return chave % (tamanho or models.TAMANHO_HASH_TABLE)
+
+# ================================================================================
+#                       TABELA HASH (UM ARQUIVO FÍSICO)
+# ================================================================================
+# A lógica de sondagem fica na classe base; as subclasses só sabem ler e gravar
+# uma posição (via seek/read ou direto sobre um mmap).
+
+class TabelaHash:
+    """Tabela hash de endereçamento aberto gravada em um único arquivo."""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self._carregar_cabecalho()
+
+    def _carregar_cabecalho(self):
+        self.arquivo.seek(0, 2)
+        tamanho_arquivo = self.arquivo.tell()
+        self.arquivo.seek(0)
+        buffer = self.arquivo.read(TAMANHO_CABECALHO_HASH)
+
+        cabecalho = None
+        if len(buffer) == TAMANHO_CABECALHO_HASH:
+            cabecalho = models.CabecalhoHash.from_buffer_copy(buffer)
+
+        if cabecalho is not None and cabecalho.magic == MAGIC_HASH:
+            self.legado = False
+            self._offset = TAMANHO_CABECALHO_HASH
+            self.capacidade = cabecalho.capacidade
+            self.ocupados = cabecalho.ocupados
+            self.removidos = cabecalho.removidos
+            self.cursor_rehash = cabecalho.cursor_rehash
+            self.limite_carga = cabecalho.limite_carga
+            self.sondagem = cabecalho.sondagem
+            self.funcao_hash = cabecalho.funcao_hash
+            if not (0 <= self.sondagem < len(SONDAGENS) and 0 <= self.funcao_hash < len(FUNCOES_HASH)):
+                raise ValueError(f"Erro: esquema de hash desconhecido no cabeçalho "
+                                 f"(sondagem {self.sondagem}, função {self.funcao_hash}).")
+        else:
+            # Formato antigo: só posições, sem contadores persistidos
+            self.legado = True
+            self._offset = 0
+            self.capacidade = tamanho_arquivo // TAMANHO_REGISTRO_HASH
+            self.ocupados = 0
+            self.removidos = 0
+            self.cursor_rehash = -1
+            self.limite_carga = LIMITE_CARGA_PADRAO
+            self.sondagem = SONDAGEM_LINEAR
+            self.funcao_hash = HASH_MODULO
+        self._cabecalho_sujo = False
+
+    def cabecalho(self):
+        return models.CabecalhoHash(
+            magic=MAGIC_HASH,
+            versao=VERSAO_HASH,
+            capacidade=self.capacidade,
+            ocupados=self.ocupados,
+            removidos=self.removidos,
+            cursor_rehash=self.cursor_rehash,
+            limite_carga=self.limite_carga,
+            sondagem=self.sondagem,
+            funcao_hash=self.funcao_hash
+        )
+
+    @property
+    def fator_carga(self):
+        # Lápides também alongam as sondagens, por isso entram na conta
+        return (self.ocupados + self.removidos) / self.capacidade
+
+    def recontar(self):
+        # Recalcula ocupados/removidos varrendo a tabela (usado em arquivos legados)
+        self.ocupados = 0
+        self.removidos = 0
+        for posicao in range(self.capacidade):
+            estado = self._ler(posicao)[2]
+            if estado == 1:
+                self.ocupados += 1
+            elif estado == 2:
+                self.removidos += 1
+        self._cabecalho_sujo = True
+
+    # --- ACESSO A UMA POSIÇÃO (implementado pelas subclasses) ---
+
+    def _ler(self, posicao):
+        # Retorna (cod_chave, endereco_dados, estado)
+        raise NotImplementedError
+
+    def _gravar(self, posicao, chave, endereco_fisico, estado):
+        raise NotImplementedError
+
+    def _gravar_cabecalho(self):
+        raise NotImplementedError
+
+    # --- SONDAGEM ---
+
+    def posicao_inicial(self, chave):
+        if self.funcao_hash == HASH_MISTURA:
+            return misturar(chave) % self.capacidade
+        return chave % self.capacidade
+
+    def _distancia(self, chave, posicao):
+        # Quantas posições depois da posição inicial a chave está (sequência linear)
+        return (posicao - self.posicao_inicial(chave)) % self.capacidade
+
+    def _inicio_e_passo(self, chave):
+        # Posição inicial e passo da sequência (passo 0 = quadrática, que usa ±k² a partir do início)
+        capacidade = self.capacidade
+        if self.funcao_hash == HASH_MISTURA:
+            inicio = misturar(chave) % capacidade
+        else:
+            inicio = chave % capacidade
+        if self.sondagem == SONDAGEM_QUADRATICA:
+            return inicio, 0
+        if self.sondagem == SONDAGEM_DUPLA and capacidade > 2:
+            segundo = misturar(chave) // capacidade if self.funcao_hash == HASH_MISTURA else chave
+            return inicio, 1 + segundo % (capacidade - 1)
+        return inicio, 1
+
+    def _sequencia(self, chave):
+        # Posições na ordem de sondagem da chave: capacidade posições, todas distintas
+        # (_sondar e inserir repetem o avanço em linha, sem o custo do gerador)
+        capacidade = self.capacidade
+        inicio, passo = self._inicio_e_passo(chave)
+        posicao = inicio
+        for visitadas in range(1, capacidade + 1):
+            yield posicao
+            if passo:
+                posicao += passo
+                if posicao >= capacidade:
+                    posicao -= capacidade
+            else:
+                k = (visitadas + 1) >> 1
+                posicao = (inicio + k * k if visitadas & 1 else inicio - k * k) % capacidade
+
+    def _sondar(self, chave):
+        # Retorna (posição ocupada pela chave ou -1, posições visitadas, lápides atravessadas)
+        capacidade = self.capacidade
+        inicio, passo = self._inicio_e_passo(chave)
+        robin_hood = self.sondagem == SONDAGEM_ROBIN_HOOD
+        ler = self._ler
+        posicao = inicio
+        sondagens = lapides = 0
+        while True:
+            # 1. Lê o registro da posição
+            cod_chave, _, estado = ler(posicao)
+            sondagens += 1
+
+            # 2. Espaço virgem -> a chave certamente não existe
+            if estado == 0:
+                break
+            if estado == 1:
+                if cod_chave == chave:
+                    return posicao, sondagens, lapides
+                # 3. Robin Hood: uma chave mais perto de casa que a distância atual -> não existe
+                if robin_hood and self._distancia(cod_chave, posicao) < sondagens - 1:
+                    break
+            else:
+                lapides += 1
+
+            # 4. Percorreu a sequência inteira e não achou
+            if sondagens >= capacidade:
+                break
+
+            # 5. Lápide ou outra chave: colisão, tenta a próxima posição da sequência
+            if passo:
+                posicao += passo
+                if posicao >= capacidade:
+                    posicao -= capacidade
+            else:
+                k = (sondagens + 1) >> 1
+                posicao = (inicio + k * k if sondagens & 1 else inicio - k * k) % capacidade
+        return -1, sondagens, lapides
+
+    def _posicao_da_chave(self, chave):
+        # Retorna a posição ocupada pela chave, ou -1
+        posicao, sondagens, lapides = self._sondar(chave)
+        if metricas.ativo:
+            metricas.sondagem("busca", sondagens, lapides)
+        return posicao
+
+    def buscar(self, chave):
+        # Retorna o endereço físico (índice no .dat) ou -1
+        posicao = self._posicao_da_chave(chave)
+        if posicao == -1:
+            return -1
+        return self._ler(posicao)[1]
+
+    def inserir(self, chave, endereco_fisico):
+        # Grava chave -> endereço. Retorna False se a chave já estava indexada.
+        # A chave vai para a primeira lápide da sequência, mas a sequência é percorrida
+        # até uma posição livre para garantir que a chave não existe mais adiante.
+        if self.sondagem == SONDAGEM_ROBIN_HOOD:
+            return self._inserir_robin_hood(chave, endereco_fisico, checar_duplicata=True)
+        capacidade = self.capacidade
+        inicio, passo = self._inicio_e_passo(chave)
+        ler = self._ler
+        posicao = inicio
+        destino = primeira_lapide = -1
+        sondagens = lapides = 0
+        while True:
+            cod_chave, _, estado = ler(posicao)
+            sondagens += 1
+
+            # 1. Livre (0): fim da sequência, a chave não existe
+            if estado == 0:
+                destino = posicao
+                break
+
+            # 2. Removido (2): guarda a primeira lápide como destino e continua
+            if estado == 2:
+                lapides += 1
+                if primeira_lapide == -1:
+                    primeira_lapide = posicao
+
+            # 3. Ocupado com a mesma chave
+            elif cod_chave == chave:
+                if metricas.ativo:
+                    metricas.sondagem("insercao", sondagens, lapides)
+                log.warning("Aviso: Chave %s duplicada detectada na indexação.", chave)
+                return False
+
+            # 4. Colisão: próxima posição da sequência (até percorrer a sequência inteira)
+            if sondagens >= capacidade:
+                break
+            if passo:
+                posicao += passo
+                if posicao >= capacidade:
+                    posicao -= capacidade
+            else:
+                k = (sondagens + 1) >> 1
+                posicao = (inicio + k * k if sondagens & 1 else inicio - k * k) % capacidade
+        if metricas.ativo:
+            metricas.sondagem("insercao", sondagens, lapides)
+
+        # 5. Grava na lápide (se houve) ou na posição livre que encerrou a sequência
+        if primeira_lapide != -1:
+            destino = primeira_lapide
+            self.removidos -= 1
+        elif destino == -1:
+            raise Exception("Erro: Tabela Hash está cheia! Aumente o TAMANHO_HASH_TABLE.")
+        self._gravar(destino, chave, endereco_fisico, 1)
+        self.ocupados += 1
+        self._cabecalho_sujo = True
+        return True
+
+    def _inserir_robin_hood(self, chave, endereco_fisico, checar_duplicata):
+        # Percorre a sequência linear levando a chave. Onde a chave residente está mais perto
+        # de casa que a levada, as duas trocam de lugar e a residente passa a ser levada.
+        if self.ocupados >= self.capacidade:
+            raise Exception("Erro: Tabela Hash está cheia! Aumente o TAMANHO_HASH_TABLE.")
+        medir = checar_duplicata and metricas.ativo
+        capacidade = self.capacidade
+        posicao = self.posicao_inicial(chave)
+        distancia = sondagens = 0
+        while True:
+            cod_chave, endereco, estado = self._ler(posicao)
+            sondagens += 1
+
+            # 1. Posição livre (ou lápide da migração do rehash): a chave levada fica aqui
+            if estado != 1:
+                self._gravar(posicao, chave, endereco_fisico, 1)
+                if estado == 2:
+                    self.removidos -= 1
+                break
+
+            # 2. Até a primeira troca a chave nova ainda pode estar adiante
+            if checar_duplicata and cod_chave == chave:
+                if medir:
+                    metricas.sondagem("insercao", sondagens, 0)
+                log.warning("Aviso: Chave %s duplicada detectada na indexação.", chave)
+                return False
+
+            # 3. Residente mais perto de casa: cede a posição
+            residente = self._distancia(cod_chave, posicao)
+            if residente < distancia:
+                self._gravar(posicao, chave, endereco_fisico, 1)
+                chave, endereco_fisico, distancia = cod_chave, endereco, residente
+                checar_duplicata = False
+
+            posicao = posicao + 1 if posicao + 1 < capacidade else 0
+            distancia += 1
+        if medir:
+            metricas.sondagem("insercao", sondagens, 0)
+        self.ocupados += 1
+        self._cabecalho_sujo = True
+        return True
+
+    def _colocar(self, chave, endereco_fisico):
+        # Inserção sem checagem de duplicata (rehash/compactação: a chave é única)
+        if self.sondagem == SONDAGEM_ROBIN_HOOD:
+            self._inserir_robin_hood(chave, endereco_fisico, checar_duplicata=False)
+            return
+        for posicao in self._sequencia(chave):
+            estado = self._ler(posicao)[2]
+            if estado != 1:
+                self._gravar(posicao, chave, endereco_fisico, 1)
+                self.ocupados += 1
+                if estado == 2:
+                    self.removidos -= 1
+                self._cabecalho_sujo = True
+                return
+        raise Exception("Erro: Tabela Hash está cheia! Aumente o TAMANHO_HASH_TABLE.")
+
+    def _marcar_removido(self, posicao, chave, endereco_fisico, deslocar=True):
+        # Libera a posição de uma chave removida:
+        #  - Robin Hood: as chaves seguintes voltam uma posição (sem lápide). Só numa tabela
+        #    sem lápides: a tabela antiga de um rehash recebe lápides (deslocar=False)
+        #  - linear: se a próxima posição está livre nenhuma sequência passa por aqui, então
+        #    a lápide (e as lápides imediatamente anteriores) viram posições livres
+        #  - demais: lápide (outras sequências podem passar por esta posição)
+        self.ocupados -= 1
+        self._cabecalho_sujo = True
+        if self.sondagem == SONDAGEM_ROBIN_HOOD and deslocar and self.removidos == 0:
+            self._deslocar_para_tras(posicao)
+            return
+        proxima = posicao + 1 if posicao + 1 < self.capacidade else 0
+        if self.sondagem != SONDAGEM_LINEAR or self._ler(proxima)[2] != 0:
+            self._gravar(posicao, chave, endereco_fisico, 2)
+            self.removidos += 1
+            return
+
+        self._gravar(posicao, 0, 0, 0)
+        anterior = posicao - 1 if posicao > 0 else self.capacidade - 1
+        while anterior != posicao and self._ler(anterior)[2] == 2:
+            self._gravar(anterior, 0, 0, 0)
+            self.removidos -= 1
+            anterior = anterior - 1 if anterior > 0 else self.capacidade - 1
+
+    def _deslocar_para_tras(self, posicao):
+        # Robin Hood: puxa para a posição liberada cada chave seguinte que não está em casa
+        while True:
+            proxima = posicao + 1 if posicao + 1 < self.capacidade else 0
+            cod_chave, endereco_fisico, estado = self._ler(proxima)
+            if estado != 1 or self.posicao_inicial(cod_chave) == proxima:
+                break
+            self._gravar(posicao, cod_chave, endereco_fisico, 1)
+            posicao = proxima
+        self._gravar(posicao, 0, 0, 0)
+
+    def atualizar(self, chave, endereco_fisico):
+        # Troca o endereço de uma chave já indexada. Retorna False se ela não existe.
+        posicao = self._posicao_da_chave(chave)
+        if posicao == -1:
+            return False
+        self._gravar(posicao, chave, endereco_fisico, 1)
+        return True
+
+    def remover(self, chave):
+        # Marca lápide (estado 2) e retorna o endereço físico removido, ou -1
+        posicao = self._posicao_da_chave(chave)
+        if posicao == -1:
+            return -1
+        cod_chave, endereco_fisico, _ = self._ler(posicao)
+        self._marcar_removido(posicao, cod_chave, endereco_fisico)
+        return endereco_fisico
+
+    def retirar_posicao(self, posicao):
+        # Usado pelo rehash: devolve (chave, endereço) da posição ocupada e a marca como removida
+        chave, endereco_fisico, estado = self._ler(posicao)
+        if estado != 1:
+            return None
+        # A migração percorre as posições em ordem: deslocar chaves para trás do cursor as perderia
+        self._marcar_removido(posicao, chave, endereco_fisico, deslocar=False)
+        return chave, endereco_fisico
+
+    def compactar(self):
+        # Rehash in-place: elimina todas as lápides e reconstrói as cadeias de sondagem.
+        # Retorna quantas lápides foram recuperadas.
+        recuperadas = self.removidos
+        if recuperadas == 0:
+            return 0
+
+        # 1. Toda lápide vira posição livre (isso pode "cortar" cadeias).
+        #    O início da varredura tem que ser uma posição que JÁ era livre: nenhuma
+        #    cadeia atravessa uma posição livre original (uma lápide pode estar no meio de uma).
+        inicio = -1
+        for posicao in range(self.capacidade):
+            estado = self._ler(posicao)[2]
+            if estado == 0 and inicio == -1:
+                inicio = posicao
+            elif estado == 2:
+                self._gravar(posicao, 0, 0, 0)
+        self.removidos = 0
+        self._cabecalho_sujo = True
+
+        if inicio == -1 or self.sondagem != SONDAGEM_LINEAR:
+            # Tabela sem nenhuma posição livre original, ou sondagem não linear (o passo 2
+            # só vale para a sequência linear): reconstrói a partir da memória
+            itens = list(self.itens())
+            for posicao in range(self.capacidade):
+                self._gravar(posicao, 0, 0, 0)
+            self.ocupados = 0
+            for chave, endereco_fisico in itens:
+                self._colocar(chave, endereco_fisico)
+            return recuperadas
+
+        # 2. A partir dessa posição, percorre uma volta completa na ordem de
+        #    sondagem: cada chave sobe para a primeira posição livre a partir da sua
+        #    posição inicial. As chaves anteriores da cadeia já estão no lugar certo.
+        for passo in range(1, self.capacidade + 1):
+            posicao = (inicio + passo) % self.capacidade
+            chave, endereco_fisico, estado = self._ler(posicao)
+            if estado != 1:
+                continue
+            destino = self.posicao_inicial(chave)
+            while destino != posicao and self._ler(destino)[2] != 0:
+                destino = destino + 1 if destino + 1 < self.capacidade else 0
+            if destino != posicao:
+                # Grava no destino antes de liberar a posição atual
+                self._gravar(destino, chave, endereco_fisico, 1)
+                self._gravar(posicao, 0, 0, 0)
+        return recuperadas
+
+    # --- FLUXO DA COMPACTAÇÃO ---
+    # 1. Lápides viram posições livres
+    # 2. Começa em uma posição que já era livre (nenhuma cadeia a atravessa)
+    # 3. Cada chave ocupada é movida para a primeira posição livre da sua sondagem
+    # 4. Ao final não há lápides e as cadeias estão íntegras
+
+    def itens(self):
+        # Gera (chave, endereço físico) de todas as posições ocupadas
+        for posicao in range(self.capacidade):
+            chave, endereco_fisico, estado = self._ler(posicao)
+            if estado == 1:
+                yield chave, endereco_fisico
+
+    def gravar_cabecalho(self):
+        # Grava os contadores pendentes sem descarregar o arquivo
+        if self._cabecalho_sujo and not self.legado:
+            self._gravar_cabecalho()
+        self._cabecalho_sujo = False
+
+    def flush(self):
+        self.gravar_cabecalho()
+
+    def close(self):
+        # Não fecha o arquivo recebido: quem abriu é quem fecha
+        self.flush()
+
+class TabelaHashArquivo(TabelaHash):
+    """Tabela hash acessada por seek + read em um arquivo aberto em 'rb+'."""
+
+    def __init__(self, arquivo):
+        super().__init__(arquivo)
+        self._ler_em = concorrencia.leitor(arquivo)
 
-def hash_function(chave):
-    # Retorna a posição inicial baseada no resto da divisão
-    return chave % models.TAMANHO_HASH_TABLE
+    def _ler(self, posicao):
+        registro = models.RegistroHash.from_buffer_copy(
+            self._ler_em(self._offset + posicao * TAMANHO_REGISTRO_HASH, TAMANHO_REGISTRO_HASH))
+        return registro.cod_chave, registro.endereco_dados, registro.estado
+
+    def _gravar(self, posicao, chave, endereco_fisico, estado):
+        concorrencia.gravar_em(self.arquivo, self._offset + posicao * TAMANHO_REGISTRO_HASH,
+                               models.RegistroHash(chave, endereco_fisico, estado))
+
+    def _gravar_cabecalho(self):
+        concorrencia.gravar_em(self.arquivo, 0, self.cabecalho())
+
+    def flush(self):
+        super().flush()
+        self.arquivo.flush()
+
+class TabelaHashMapeada(TabelaHash):
+    """Tabela hash mapeada em memória: sondagem in-place, sem cópia por posição."""
+
+    def __init__(self, arquivo):
+        super().__init__(arquivo)
+        # 1. Mapeia o arquivo inteiro (já aberto em 'rb+')
+        self._mm = mmap.mmap(arquivo.fileno(), 0)
+
+        # 2. Visões sobre o mapeamento (nenhuma copia bytes):
+        #    - array de RegistroHash para acesso estruturado
+        #    - inteiros planos [cod_chave, endereco_dados, estado, ...] para o laço de sondagem
+        self.registros = (models.RegistroHash * self.capacidade).from_buffer(self._mm, self._offset)
+        self._campos = memoryview(self._mm)[self._offset:].cast("i")
+
+    def _ler(self, posicao):
+        base = posicao * CAMPOS_POR_REGISTRO
+        campos = self._campos
+        return campos[base], campos[base + 1], campos[base + 2]
+
+    def _gravar(self, posicao, chave, endereco_fisico, estado):
+        # Grava direto no mapeamento; o estado por último
+        base = posicao * CAMPOS_POR_REGISTRO
+        campos = self._campos
+        campos[base] = chave
+        campos[base + 1] = endereco_fisico
+        campos[base + 2] = estado
+
+    def _gravar_cabecalho(self):
+        self._mm[0:TAMANHO_CABECALHO_HASH] = bytes(self.cabecalho())
+
+    def flush(self):
+        # As escritas já estão no mapeamento; aqui elas são sincronizadas com o arquivo
+        super().flush()
+        self._mm.flush()
+
+    def close(self):
+        if self._mm.closed:
+            return
+        self.flush()
+        # As visões exportadas precisam ser liberadas antes de fechar o mmap
+        self._campos.release()
+        del self.registros
+        self._mm.close()
+
+    # --- FLUXO DO MODO MMAP ---
+    # 1. Mapeia o arquivo de hash inteiro em memória
+    # 2. Sonda lendo inteiros direto do mapeamento (sem seek/read/from_buffer_copy)
+    # 3. Escreve in-place no mapeamento
+    # 4. flush() sincroniza explicitamente com o disco
+
+class TabelaHashMemoria(TabelaHash):
+    """Tabela em memória (inteiros planos), gravada de uma vez por construir_tabela_hash."""
+
+    def __init__(self, capacidade, limite_carga=LIMITE_CARGA_PADRAO, sondagem=SONDAGEM_LINEAR,
+                 funcao_hash=HASH_MODULO):
+        self.arquivo = None
+        self.legado = False
+        self._offset = 0
+        self.capacidade = capacidade
+        self.ocupados = 0
+        self.removidos = 0
+        self.cursor_rehash = -1
+        self.limite_carga = limite_carga
+        self.sondagem = sondagem
+        self.funcao_hash = funcao_hash
+        self._cabecalho_sujo = False
+        self.campos = array("i", bytes(capacidade * TAMANHO_REGISTRO_HASH))
+
+    def _ler(self, posicao):
+        base = posicao * CAMPOS_POR_REGISTRO
+        campos = self.campos
+        return campos[base], campos[base + 1], campos[base + 2]
+
+    def _gravar(self, posicao, chave, endereco_fisico, estado):
+        base = posicao * CAMPOS_POR_REGISTRO
+        campos = self.campos
+        campos[base] = chave
+        campos[base + 1] = endereco_fisico
+        campos[base + 2] = estado
+
+    def _gravar_cabecalho(self):
+        # O cabeçalho é escrito junto com as posições, por quem grava a tabela
+        pass
+
+# ================================================================================
+#                       ÍNDICE COM CRESCIMENTO E REHASH INCREMENTAL
+# ================================================================================
+# Quando (ocupados + removidos) / capacidade passa do limite_carga, o arquivo atual
+# vira "<hash>.antigo" e um novo arquivo com o próximo primo >= 2 * capacidade é
+# criado. A cada escrita, passo_rehash posições da tabela antiga são migradas;
+# buscas consultam a nova e, se preciso, a antiga. O cursor da migração fica no
+# cabeçalho da tabela nova, então o rehash continua após reabrir a base.
+
+class IndiceHash:
+    """Índice hash persistente que cresce e faz rehash incremental."""
+
+    def __init__(self, caminho=None, usar_mmap=False, limite_carga=None,
+                 passo_rehash=PASSO_REHASH_PADRAO, capacidade_inicial=None, cache=None,
+                 sondagem=None, funcao_hash=None):
+        self.caminho = caminho or models.FILE_HASH
+        self.caminho_antigo = self.caminho + ".antigo"
+        self.usar_mmap = usar_mmap
+        # CacheDePaginas opcional (só no modo arquivo: o mmap já é o próprio cache)
+        self.cache = cache
+        self.passo_rehash = passo_rehash
+
+        # 1. Queda entre o rename e a criação da tabela nova: volta para a antiga
+        if not os.path.exists(self.caminho) and os.path.exists(self.caminho_antigo):
+            os.replace(self.caminho_antigo, self.caminho)
+        # O esquema (sondagem/funcao_hash) só vale para um arquivo novo: o de um arquivo
+        # existente vem do cabeçalho (para trocá-lo, converter_esquema)
+        if not os.path.exists(self.caminho):
+            criar_tabela_hash(self.caminho, capacidade_inicial or models.TAMANHO_HASH_TABLE,
+                              limite_carga or LIMITE_CARGA_PADRAO, sondagem=sondagem or "linear",
+                              funcao_hash=funcao_hash or "modulo")
+
+        # 2. Arquivos sem cabeçalho são convertidos (mesmas posições, mesma capacidade)
+        self.tabela = self._abrir(self.caminho)
+        if self.tabela.legado:
+            self._fechar(self.tabela)
+            self._converter_legado()
+            self.tabela = self._abrir(self.caminho)
+
+        if limite_carga is not None and limite_carga != self.tabela.limite_carga:
+            self.tabela.limite_carga = limite_carga
+            self.tabela._cabecalho_sujo = True
+
+        # 3. Rehash em andamento? (tabelas antigas já migradas só são apagadas no flush)
+        self.antiga = None
+        self._aposentadas = []
+        if self.tabela.cursor_rehash != -1:
+            if os.path.exists(self.caminho_antigo):
+                self.antiga = self._abrir(self.caminho_antigo)
+            else:
+                # A migração terminou mas o cabeçalho não chegou a ser atualizado
+                self.tabela.cursor_rehash = -1
+                self.tabela._cabecalho_sujo = True
+        elif os.path.exists(self.caminho_antigo):
+            # Migração concluída e gravada, mas o arquivo antigo não chegou a ser apagado
+            os.remove(self.caminho_antigo)
+
+    # --- ARQUIVOS ---
+
+    def _abrir(self, caminho):
+        if self.usar_mmap:
+            return TabelaHashMapeada(open(caminho, "rb+"))
+        if self.cache is not None:
+            return TabelaHashArquivo(self.cache.abrir(caminho))
+        return TabelaHashArquivo(open(caminho, "rb+"))
+
+    def _fechar(self, tabela):
+        tabela.close()
+        tabela.arquivo.close()
+
+    def _converter_legado(self):
+        # Reescreve o arquivo antigo com cabeçalho, mantendo as posições
+        with open(self.caminho, "rb") as f_antigo:
+            legado = TabelaHashArquivo(f_antigo)
+            legado.recontar()
+            cabecalho = legado.cabecalho()
+            temporario = self.caminho + ".tmp"
+            with open(temporario, "wb") as f_novo:
+                f_novo.write(cabecalho)
+                f_antigo.seek(0)
+                f_novo.write(f_antigo.read(legado.capacidade * TAMANHO_REGISTRO_HASH))
+        os.replace(temporario, self.caminho)
+
+    # --- INFORMAÇÕES ---
+
+    @property
+    def capacidade(self):
+        return self.tabela.capacidade
+
+    @property
+    def fator_carga(self):
+        return self.tabela.fator_carga
+
+    @property
+    def removidos(self):
+        return self.tabela.removidos
+
+    @property
+    def em_rehash(self):
+        return self.antiga is not None
+
+    @property
+    def sondagem(self):
+        return SONDAGENS[self.tabela.sondagem]
+
+    @property
+    def funcao_hash(self):
+        return FUNCOES_HASH[self.tabela.funcao_hash]
+
+    def posicao_inicial(self, chave):
+        # Posição inicial da chave na tabela atual (ordem de acesso para operações em lote)
+        return self.tabela.posicao_inicial(chave)
+
+    # --- OPERAÇÕES ---
+
+    def buscar(self, chave):
+        endereco = self.tabela.buscar(chave)
+        if endereco == -1 and self.antiga is not None:
+            endereco = self.antiga.buscar(chave)
+        return endereco
+
+    def inserir(self, chave, endereco_fisico):
+        # 1. Crescimento/limpeza antes de passar do limite de carga
+        if self.precisa_crescer():
+            self.crescer()
+
+        # 2. Durante o rehash (inclusive o que acabou de começar) a chave pode ainda estar
+        #    só na tabela antiga
+        if self.antiga is not None and self.antiga.buscar(chave) != -1:
+            log.warning("Aviso: Chave %s duplicada detectada na indexação.", chave)
+            return False
+
+        inserido = self.tabela.inserir(chave, endereco_fisico)
+        # 3. Cada escrita paga um pedaço do rehash
+        self._migrar_passo()
+        return inserido
+
+    def atualizar(self, chave, endereco_fisico):
+        # Troca o endereço de uma chave existente (sem mexer na sondagem)
+        if self.tabela.atualizar(chave, endereco_fisico):
+            return True
+        return self.antiga is not None and self.antiga.atualizar(chave, endereco_fisico)
+
+    def itens(self):
+        # (chave, endereço físico) de todas as chaves, inclusive as ainda não migradas
+        yield from self.tabela.itens()
+        if self.antiga is not None:
+            yield from self.antiga.itens()
+
+    def remover(self, chave):
+        # Retorna o endereço físico removido, ou -1
+        endereco = self.tabela.remover(chave)
+        if endereco == -1 and self.antiga is not None:
+            endereco = self.antiga.remover(chave)
+        self._migrar_passo()
+        return endereco
+
+    # --- CRESCIMENTO ---
+
+    def precisa_crescer(self):
+        # A próxima inserção passaria do limite de carga?
+        tabela = self.tabela
+        return tabela.ocupados + tabela.removidos + 1 > tabela.limite_carga * tabela.capacidade
+
+    def folga(self):
+        # Quantas inserções cabem antes de precisa_crescer(), descontando as chaves que a
+        # migração ainda vai trazer da tabela antiga
+        tabela = self.tabela
+        pendentes = self.antiga.ocupados if self.antiga is not None else 0
+        return max(0, int(tabela.limite_carga * tabela.capacidade) - tabela.ocupados - tabela.removidos - pendentes)
+
+    def crescer(self):
+        # Só existe uma migração por vez: termina a atual antes de crescer de novo
+        if self.antiga is not None:
+            self.concluir_rehash()
+        self._descartar_aposentadas()
+
+        # Se a carga vem das lápides (chaves vivas < metade do limite), o rehash mantém a
+        # capacidade e só descarta as lápides; senão a tabela dobra.
+        tabela = self.tabela
+        if 2 * (tabela.ocupados + 1) <= tabela.limite_carga * tabela.capacidade:
+            nova_capacidade = tabela.capacidade
+        else:
+            nova_capacidade = primo_para(2 * tabela.capacidade + 1, tabela.sondagem)
+        limite_carga = tabela.limite_carga
+        esquema = SONDAGENS[tabela.sondagem], FUNCOES_HASH[tabela.funcao_hash]
+
+        # 1. A tabela atual passa a ser a antiga
+        self._fechar(self.tabela)
+        os.replace(self.caminho, self.caminho_antigo)
+
+        # 2. Tabela nova vazia (mesmo esquema), com o cursor de migração no início
+        criar_tabela_hash(self.caminho, nova_capacidade, limite_carga, 0, *esquema)
+        self.tabela = self._abrir(self.caminho)
+        self.antiga = self._abrir(self.caminho_antigo)
+
+    def _migrar_passo(self, passo=None):
+        if self.antiga is None:
+            return
+        tabela = self.tabela
+        inicio = tabela.cursor_rehash
+        fim = min(inicio + (passo or self.passo_rehash), self.antiga.capacidade)
+
+        # 1. Move as chaves ocupadas do trecho [inicio, fim) para a tabela nova
+        for posicao in range(inicio, fim):
+            item = self.antiga.retirar_posicao(posicao)
+            if item is not None:
+                tabela._colocar(*item)
+
+        # 2. Avança o cursor (persistido no cabeçalho da tabela nova)
+        tabela.cursor_rehash = fim
+        tabela._cabecalho_sujo = True
+
+        # 3. Tabela antiga percorrida por completo: o arquivo é apagado no próximo flush,
+        #    depois que a tabela nova (com cursor -1) estiver gravada
+        if fim >= self.antiga.capacidade:
+            self._aposentadas.append(self.antiga)
+            self.antiga = None
+            tabela.cursor_rehash = -1
+
+    def concluir_rehash(self):
+        while self.antiga is not None:
+            self._migrar_passo(self.antiga.capacidade)
+
+    def _descartar_aposentadas(self):
+        for tabela in self._aposentadas:
+            self._fechar(tabela)
+            if os.path.exists(self.caminho_antigo):
+                os.remove(self.caminho_antigo)
+        self._aposentadas = []
+
+    def compactar(self):
+        # Compactação sob demanda: conclui um rehash pendente e remove as lápides in-place.
+        # Retorna quantas lápides foram recuperadas.
+        self.concluir_rehash()
+        return self.tabela.compactar()
+
+    # --- CICLO DE VIDA ---
+
+    def gravar_cabecalho(self):
+        # Contadores e cursor das tabelas nas páginas, sem descarregar os arquivos
+        self.tabela.gravar_cabecalho()
+        if self.antiga is not None:
+            self.antiga.gravar_cabecalho()
+
+    def flush(self):
+        # Tabela nova primeiro: o cursor gravado nunca fica à frente das chaves migradas
+        self.tabela.flush()
+        if self.antiga is not None:
+            self.antiga.flush()
+        self._descartar_aposentadas()
+
+    def close(self):
+        self.flush()
+        if self.antiga is not None:
+            self._fechar(self.antiga)
+            self.antiga = None
+        self._fechar(self.tabela)
+
+    # --- FLUXO DO CRESCIMENTO ---
+    # 1. Inserção que passaria do limite_carga inicia o crescimento
+    # 2. Tabela atual -> "<hash>.antigo"; nova tabela com o próximo primo >= 2 * capacidade
+    #    (ou com a mesma capacidade, se a carga vier principalmente de lápides)
+    # 3. Cada inserção/remoção migra passo_rehash posições da antiga para a nova
+    # 4. Buscas consultam a nova e depois a antiga
+    # 5. Ao final da migração o arquivo antigo é removido (no flush seguinte)
+
+# ================================================================================
+#                       FUNÇÕES SOBRE UM ARQUIVO ABERTO
+# ================================================================================
+# Mantidas para quem já tem o arquivo de hash aberto. Não fazem crescimento:
+# a capacidade é a do arquivo (cabeçalho ou, no formato antigo, o tamanho).
 
 # Desenvolvimento: Esta função assume que o arquivo que recebe referência já está aberto com a permissão "rb+"
 def inserir_na_hash(chave, endereco_fisico, f_hash):
-    
+
     # Tenta inserir uma chave na tabela hash.
     # Usa tentativa linear para colisões.
-    
-    posicao_inicial = hash_function(chave)
-    posicao = posicao_inicial
-    
+
     if f_hash.closed:
-        print("Erro! Passe um arquivo aberto como 'rb+' !")
+        log.error("Erro! Passe um arquivo aberto como 'rb+' !")
     else:
-        while True:
-            # 1. Vai até a posição calculada
-            f_hash.seek(posicao * ctypes.sizeof(models.RegistroHash))
-                
-            # 2. Lê o registro que está lá
-            buffer = f_hash.read(ctypes.sizeof(models.RegistroHash))
-            registro = models.RegistroHash.from_buffer_copy(buffer)
-                
-            # 3. Verifica se está livre
-            # (estado 0 = Livre, estado 2 = Removido -> Ambos são vagas úteis)
-            if registro.estado == 0 or registro.estado == 2:
-                # Está livre, grava aqui
-                
-                # Caso principal para a primeira incialização do hashmap
-
-                novo_registro = models.RegistroHash(chave, endereco_fisico, 1) # 1 = Ocupado
-                    
-                # Volta o ponteiro para o início desse registro para sobrescrever
-                f_hash.seek(posicao * ctypes.sizeof(models.RegistroHash))
-                f_hash.write(novo_registro)
-                return # Sucesso, sai da função
-                
-            # 4. Colisão: A posição está ocupada (estado 1)
-            # Verificamos se não é a mesma chave (atualização) - opcional
-            if registro.cod_chave == chave:
-                print(f"Aviso: Chave {chave} duplicada detectada na indexação.")
-                return
+        tabela = TabelaHashArquivo(f_hash)
+        tabela.inserir(chave, endereco_fisico)
+        # Persiste os contadores do cabeçalho
+        tabela.flush()
 
-            # 5. Tenta a próxima posição (Linear Probing)
-            posicao += 1
-                
-            # 6. Se chegou no fim do arquivo, volta para o começo (Circular)
-            if posicao >= models.TAMANHO_HASH_TABLE:
-                posicao = 0
-                
-            # 7. Se deu a volta completa e voltou ao início, a tabela está cheia
-            if posicao == posicao_inicial:
-                raise Exception("Erro: Tabela Hash está cheia! Aumente o TAMANHO_HASH_TABLE.")
-            
     # 1. Vai até a posição calculada com hash_function(chave)
     # 2. Lê o registro da posição
     # 3. Verifica o estado da posição. Se livre grava ali.
@@ -82,40 +1053,10 @@ def buscar_na_hash(chave_busca, f_hash):
     # Busca uma chave na tabela hash e retorna o endereco_fisico (índice no .dat).
     # Retorna -1 se não encontrar para indicar escrita EOF.
 
-    posicao_inicial = hash_function(chave_busca)
-    posicao = posicao_inicial
     if f_hash.closed:
-        print("Erro! Passe um arquivo aberto como 'rb+' !")
-    else:
-        while True:
-            # 1. Posiciona e lê o registro
-            f_hash.seek(posicao * ctypes.sizeof(models.RegistroHash))
-            buffer = f_hash.read(ctypes.sizeof(models.RegistroHash))
-
-            if not buffer: 
-                break # Fim de arquivo inesperado
-                
-            registro = models.RegistroHash.from_buffer_copy(buffer)
-            
-            # 2. Análise do Estado
-            if registro.estado == 0:
-                # Encontrou espaço virgem -> A chave certamente não existe
-                return -1
-            
-            if registro.estado == 1 and registro.cod_chave == chave_busca:
-                # Encontrou Ocupado e a chave bate! Retorna onde está o dado real.
-                return registro.endereco_dados
-            
-            # 3. Se for estado 2 (Removido) ou estado 1 com chave diferente, é uma colisão
-            # 4. Continua procurando na próxima posição (Linear Probing)
-            
-            posicao += 1
-            if posicao >= models.TAMANHO_HASH_TABLE:
-                posicao = 0 # 5. Circular
-            
-            # 6. Se deu a volta completa e não achou
-            if posicao == posicao_inicial:
-                return -1
+        log.error("Erro! Passe um arquivo aberto como 'rb+' !")
+        return -1
+    return TabelaHashArquivo(f_hash).buscar(chave_busca)
 
     # 1. Posiciona e lê o registro
     # 2. Análise do Estado
@@ -123,54 +1064,29 @@ def buscar_na_hash(chave_busca, f_hash):
     # 4. Continua procurando na próxima posição (Linear Probing)
     # 5. Circular
     # 6. Se deu a volta completa e não achou
-    
+
 def remover_da_hash(chave_busca, f_hash):
-    
+
     # Busca a chave e marca o estado como 2 (Removido).
     # Não apaga o registro fisicamente, apenas lógica.
-    
-    posicao_inicial = hash_function(chave_busca)
-    posicao = posicao_inicial
-    
+
     # 1. Abrir como "r+b" para leitura e escrita
     if f_hash.closed:
-        print("Erro! Passe um arquivo aberto como 'rb+' !")
-    else:
-        while True:
-            # 2. Ir até a posição que deve ser removida
-            f_hash.seek(posicao * ctypes.sizeof(models.RegistroHash))
-            # 3. Ler da posição
-            buffer = f_hash.read(ctypes.sizeof(models.RegistroHash))
-            registro = models.RegistroHash.from_buffer_copy(buffer)
-            
-            if registro.estado == 0:
-                # 4. Chegou num vazio, a chave não existe
-                print(f"Erro: Chave {chave_busca} não encontrada para remoção.")
-                return False
-            
-            if registro.estado == 1 and registro.cod_chave == chave_busca:
-                # 5. Encontrado!
-                registro.estado = 2 # Marca como Removido
-                
-                # 6. Volta para o começo do registro e grava a alteração
-                f_hash.seek(posicao * ctypes.sizeof(models.RegistroHash))
-                f_hash.write(registro)
-                print(f"Sucesso: Chave {chave_busca} removida (Lápide criada).")
-                return True
-            
-            # 7. Colisão: tenta o próximo
-            posicao += 1
-            if posicao >= models.TAMANHO_HASH_TABLE:
-                posicao = 0
-            
-            if posicao == posicao_inicial:
-                print("Erro: Tabela varrida completamente e chave não encontrada.")
-                return False
-            
+        log.error("Erro! Passe um arquivo aberto como 'rb+' !")
+        return False
+
+    tabela = TabelaHashArquivo(f_hash)
+    if tabela.remover(chave_busca) == -1:
+        log.warning("Erro: Chave %s não encontrada para remoção.", chave_busca)
+        return False
+    tabela.flush()
+    log.debug("Sucesso: Chave %s removida (Lápide criada).", chave_busca)
+    return True
+
     # 1. Abrir como "r+b" para leitura e escrita
     # 2. Ir até a posição que deve ser removida
     # 3. Ler da posição
     # 4. Se chegou num vazio, a chave não existe
     # 5. Se encontrado, marca como removido
     # 6. Volta para o começo do registro e grava a alteração
-    # 7. Se colisão, tenta o próximo
\ No newline at end of file
+    # 7. Se colisão, tenta o próximo
@@ -0,0 +1,260 @@
+import os
+import struct
+import threading
+import zlib
+from . import cache_paginas
+from . import logs
+
+log = logs.obter(__name__)
+
+# ================================================================================
+#                       LOG DE ESCRITA ANTECIPADA (WAL) COM GROUP COMMIT
+# ================================================================================
+# Uma inserção/remoção altera vários arquivos (dados, header, hash, índices
+# secundários). Sem log, uma queda no meio deixa ponteiros da pilha ou posições do
+# hash pela metade. Com o WAL, cada mutação é uma transação:
+#
+#   1. As escritas vão para páginas do CacheDePaginas, que ficam fixadas (não saem
+#      para o disco) enquanto a transação não termina
+#   2. Na confirmação, as imagens "depois" de todas as escritas viram um único
+#      registro no log (com CRC), e as páginas recebem o LSN do registro
+#   3. A durabilidade depende do modo:
+#        "op"    fsync do log a cada mutação
+#        "grupo" group commit: quem confirma espera o fsync, e um único fsync cobre
+#                todas as transações anexadas até ele (várias threads, um fsync)
+#   4. Uma página só vai ao disco depois que o log até o seu LSN foi sincronizado
+#   5. No checkpoint as páginas são gravadas, os arquivos sincronizados e o log zerado
+#
+# Ao abrir a base, recuperar() reaplica os registros íntegros do log (na ordem) e
+# descarta o final incompleto: o estado volta a ser o da última transação confirmada.
+#
+# Formato de um registro: [lsn:Q][tamanho:I][crc32:I][escritas...]
+# Cada escrita: [tamanho do nome:H][offset:Q][tamanho dos dados:I][nome][dados]
+
+DURABILIDADES = ("op", "grupo", "nenhum")
+# Checkpoint automático quando o log passa deste tamanho
+TAMANHO_MAXIMO_WAL = 16 * 1024 * 1024
+
+CABECALHO_REGISTRO = struct.Struct("<QII")
+CABECALHO_ESCRITA = struct.Struct("<HQI")
+
+def recuperar(caminho):
+    # Reaplica as transações confirmadas do log. Retorna quantas foram reaplicadas.
+    if not os.path.exists(caminho) or os.path.getsize(caminho) == 0:
+        return 0
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    with open(caminho, "rb") as f_log:
+        conteudo = f_log.read()
+
+    abertos = {}
+    reaplicadas = 0
+    posicao = 0
+    try:
+        # 1. Percorre os registros; um cabeçalho truncado ou CRC errado marca o fim do log
+        while posicao + CABECALHO_REGISTRO.size <= len(conteudo):
+            _, tamanho, crc = CABECALHO_REGISTRO.unpack_from(conteudo, posicao)
+            inicio = posicao + CABECALHO_REGISTRO.size
+            corpo = conteudo[inicio:inicio + tamanho]
+            if len(corpo) < tamanho or zlib.crc32(corpo) != crc:
+                break
+
+            # 2. Imagens "depois" gravadas direto nos arquivos (idempotente)
+            cursor = 0
+            while cursor < tamanho:
+                tamanho_nome, offset, tamanho_dados = CABECALHO_ESCRITA.unpack_from(corpo, cursor)
+                cursor += CABECALHO_ESCRITA.size
+                nome = corpo[cursor:cursor + tamanho_nome].decode("utf-8")
+                cursor += tamanho_nome
+                dados = corpo[cursor:cursor + tamanho_dados]
+                cursor += tamanho_dados
+
+                arquivo = abertos.get(nome)
+                if arquivo is None:
+                    caminho_arquivo = os.path.join(diretorio, nome)
+                    if not os.path.exists(caminho_arquivo):
+                        # Arquivo já descartado (ex.: tabela antiga de um rehash concluído)
+                        continue
+                    arquivo = abertos[nome] = open(caminho_arquivo, "rb+")
+                arquivo.seek(offset)
+                arquivo.write(dados)
+            reaplicadas += 1
+            posicao = inicio + tamanho
+
+        # 3. Arquivos sincronizados antes de zerar o log
+        for arquivo in abertos.values():
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+    finally:
+        for arquivo in abertos.values():
+            arquivo.close()
+
+    with open(caminho, "wb") as f_log:
+        os.fsync(f_log.fileno())
+    if reaplicadas:
+        log.warning("Recuperação: %d transações reaplicadas a partir de %s.", reaplicadas, caminho)
+    return reaplicadas
+
+class LogDeEscrita:
+    """WAL de uma tabela: transações sobre páginas do cache, com fsync por operação ou em grupo."""
+
+    def __init__(self, caminho, cache=None, durabilidade="grupo"):
+        if durabilidade not in ("op", "grupo"):
+            raise ValueError("Erro: o WAL só é usado com durabilidade 'op' ou 'grupo'.")
+        self.caminho = caminho
+        self.diretorio = os.path.dirname(os.path.abspath(caminho))
+        self.cache = cache or cache_paginas.CacheDePaginas()
+        self.durabilidade = durabilidade
+
+        # 1. Log anterior reaplicado antes de qualquer arquivo da tabela ser aberto
+        recuperar(caminho)
+        self._fd = os.open(caminho, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.tamanho = os.fstat(self._fd).st_size
+
+        # 2. LSNs: último anexado ao log e último garantidamente no disco
+        self.lsn_escrito = 0
+        self.lsn_duravel = 0
+        self._condicao = threading.Condition()
+        self._sincronizando = False
+        self.sincronizacoes = 0
+
+        self._arquivos = []
+        self._escritas = None
+        self._fixadas = None
+
+    # --- ARQUIVOS ---
+
+    def abrir(self, caminho):
+        # Mesma interface do CacheDePaginas: os índices recebem o WAL no lugar do cache
+        arquivo = self.cache.abrir(caminho)
+        arquivo.wal = self
+        arquivo.nome_log = os.path.relpath(os.path.abspath(caminho), self.diretorio)
+        self._arquivos.append(arquivo)
+        return arquivo
+
+    def _arquivos_abertos(self):
+        self._arquivos = [arquivo for arquivo in self._arquivos if not arquivo.closed]
+        return self._arquivos
+
+    # --- TRANSAÇÕES ---
+
+    @property
+    def em_transacao(self):
+        return self._escritas is not None
+
+    def iniciar(self):
+        self._escritas = []
+        self._fixadas = []
+
+    def registrar_escrita(self, arquivo, pagina, posicao, dados):
+        # Chamado pelo ArquivoEmCache a cada write()
+        if self._escritas is None:
+            return
+        self._escritas.append((arquivo.nome_log, posicao, bytes(dados)))
+        if not pagina.fixada:
+            pagina.fixada = True
+            self._fixadas.append(pagina)
+
+    def confirmar(self):
+        # Anexa a transação ao log (sem fsync) e libera as páginas. Retorna o LSN (0 = nada a gravar).
+        escritas, fixadas = self._escritas, self._fixadas
+        self._escritas = self._fixadas = None
+        if not escritas:
+            return 0
+
+        # 1. Um registro com todas as escritas
+        partes = []
+        for nome, posicao, dados in escritas:
+            nome = nome.encode("utf-8")
+            partes.append(CABECALHO_ESCRITA.pack(len(nome), posicao, len(dados)))
+            partes.append(nome)
+            partes.append(dados)
+        corpo = b"".join(partes)
+        lsn = self.lsn_escrito + 1
+        os.write(self._fd, CABECALHO_REGISTRO.pack(lsn, len(corpo), zlib.crc32(corpo)) + corpo)
+        self.lsn_escrito = lsn
+        self.tamanho += CABECALHO_REGISTRO.size + len(corpo)
+
+        # 2. As páginas podem sair do cache, mas só depois do log até este LSN
+        for pagina in fixadas:
+            pagina.lsn = lsn
+            pagina.fixada = False
+        return lsn
+
+    def descartar_transacao(self):
+        # Transação interrompida: nada vai para o log. As páginas continuam fixadas
+        # até quem chamou abandonar os arquivos (o estado volta pelo log na reabertura).
+        self._escritas = self._fixadas = None
+
+    # --- DURABILIDADE ---
+
+    def esperar(self, lsn):
+        # Retorna quando o log até lsn está no disco
+        if lsn == 0 or self.lsn_duravel >= lsn:
+            return
+        if self.durabilidade == "op":
+            self._sincronizar(self.lsn_escrito)
+            return
+
+        # Group commit: uma thread (líder) faz o fsync; as outras esperam por ele.
+        # Tudo o que foi anexado antes do fsync começar fica durável com ele.
+        with self._condicao:
+            while self.lsn_duravel < lsn:
+                if self._sincronizando:
+                    self._condicao.wait()
+                    continue
+                self._sincronizando = True
+                alvo = self.lsn_escrito
+                self._condicao.release()
+                try:
+                    os.fsync(self._fd)
+                finally:
+                    self._condicao.acquire()
+                    self._sincronizando = False
+                self.sincronizacoes += 1
+                self.lsn_duravel = max(self.lsn_duravel, alvo)
+                self._condicao.notify_all()
+
+    def garantir(self, lsn):
+        # Regra do WAL (chamada pelo cache antes de gravar uma página)
+        if self.lsn_duravel < lsn:
+            self.esperar(lsn)
+
+    def _sincronizar(self, alvo):
+        os.fsync(self._fd)
+        self.sincronizacoes += 1
+        with self._condicao:
+            self.lsn_duravel = max(self.lsn_duravel, alvo)
+
+    # --- CHECKPOINT ---
+
+    def checkpoint(self):
+        # Páginas no disco (cada uma depois do seu log), arquivos sincronizados e log zerado
+        self.esperar(self.lsn_escrito)
+        for arquivo in self._arquivos_abertos():
+            arquivo.sincronizar()
+        os.ftruncate(self._fd, 0)
+        os.fsync(self._fd)
+        self.tamanho = 0
+
+    def abandonar(self):
+        # Fecha os arquivos sem gravar páginas sujas (usado após uma transação interrompida)
+        self.esperar(self.lsn_escrito)
+        for arquivo in self._arquivos_abertos():
+            arquivo.abandonar()
+        self._arquivos = []
+        os.close(self._fd)
+        self._fd = None
+
+    def close(self):
+        if self._fd is None:
+            return
+        self.checkpoint()
+        os.close(self._fd)
+        self._fd = None
+
+    # --- FLUXO DO WAL ---
+    # 1. iniciar(): as escritas nas páginas passam a ser registradas e as páginas fixadas
+    # 2. confirmar(): um registro com CRC no log; páginas liberadas com o LSN
+    # 3. esperar(): fsync por operação ou um fsync para o grupo inteiro
+    # 4. checkpoint(): páginas e arquivos no disco, log zerado
+    # 5. Na abertura, recuperar() reaplica o que foi confirmado
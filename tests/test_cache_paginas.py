@@ -0,0 +1,65 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import cache_paginas
+from modules import models
+from modules import store
+
+# ================================================================================
+#                       CACHE DE PÁGINAS: ESCRITAS MAIORES QUE O CACHE
+# ================================================================================
+# Uma escrita que atravessa mais páginas do que o cache comporta descarta páginas
+# sujas da própria escrita no meio do laço; elas precisam chegar inteiras ao disco.
+#
+# Uso: python -m unittest tests.test_cache_paginas
+
+class TestEscritaMaiorQueCache(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+    def test_escrita_em_varias_paginas(self):
+        for politica in cache_paginas.POLITICAS:
+            caminho = os.path.join(self.diretorio, f"{politica}.dat")
+            open(caminho, "wb").close()
+            cache = cache_paginas.CacheDePaginas(2, politica=politica)
+            dados = random.Random(1).randbytes(3 * cache.tamanho_pagina)
+            arquivo = cache.abrir(caminho)
+            arquivo.write(dados)
+            arquivo.close()
+            with open(caminho, "rb") as f_disco:
+                self.assertEqual(f_disco.read(), dados, politica)
+
+    def test_insert_many_com_cache_pequeno(self):
+        arquivos = {
+            "arquivo_dados": os.path.join(self.diretorio, "aplicacoes.dat"),
+            "arquivo_hash": os.path.join(self.diretorio, "aplicacoes_hash.dat"),
+            "arquivo_header": os.path.join(self.diretorio, "header.dat"),
+            "arquivo_bmais": os.path.join(self.diretorio, "aplicacoes_bmais.dat"),
+        }
+        chaves = range(1, 3001)
+        tabela = store.AplicacaoStore(cache=cache_paginas.CacheDePaginas(16), **arquivos)
+        tabela.insert_many(models.AplicacaoVacina(chave, 1, 1, 1, "01/01/2026") for chave in chaves)
+        tabela.close()
+
+        tabela = store.AplicacaoStore(**arquivos)
+        try:
+            # Registro perdido volta zerado do disco (cod_aplicacao 0), não como None
+            lidos = [tabela.get(chave) for chave in chaves]
+            self.assertEqual([chave for chave, lido in zip(chaves, lidos)
+                              if lido is None or lido.cod_aplicacao != chave], [])
+            self.assertEqual(sorted(lido.cod_aplicacao for lido in tabela.scan()), list(chaves))
+        finally:
+            tabela.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import models
+from modules import store
+
+# ================================================================================
+#                       CARGA EM LOTE: CHAVES REPETIDAS
+# ================================================================================
+# A primeira ocorrência de cada chave é a indexada; as repetidas ficam na pilha de
+# excluídos (invisíveis ao scan, reusadas pelo próximo insert).
+#
+# Uso: python -m unittest tests.test_carga_em_lote
+
+class TestCargaComDuplicatas(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp()
+        self.arquivos = {
+            "arquivo_dados": os.path.join(self.diretorio, "aplicacoes.dat"),
+            "arquivo_hash": os.path.join(self.diretorio, "aplicacoes_hash.dat"),
+            "arquivo_header": os.path.join(self.diretorio, "header.dat"),
+            "arquivo_bmais": os.path.join(self.diretorio, "aplicacoes_bmais.dat"),
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+    def test_duplicatas_vao_para_a_pilha(self):
+        linhas = [(1, 10, 1, 1, "01/01/2026"), (2, 20, 2, 2, "02/01/2026"), (1, 30, 3, 3, "03/01/2026"),
+                  (3, 40, 4, 4, "04/01/2026"), (2, 50, 5, 5, "05/01/2026")]
+        for tipo_indice in store.TIPOS_INDICE:
+            self.assertEqual(store.carregar_em_lote(linhas, tipo_indice=tipo_indice, **self.arquivos), 3)
+            tabela = store.AplicacaoStore(tipo_indice=tipo_indice, **self.arquivos)
+            try:
+                self.assertEqual(sorted((app.cod_aplicacao, app.cod_paciente_fk) for app in tabela.scan()),
+                                 [(1, 10), (2, 20), (3, 40)], tipo_indice)
+                self.assertEqual(tabela.get(1).cod_paciente_fk, 10)
+                # O próximo insert reusa um slot de duplicata em vez de crescer o arquivo
+                self.assertIn(tabela.insert(models.AplicacaoVacina(4, 60, 6, 6, "06/01/2026")), (2, 4))
+                self.assertEqual(sorted(app.cod_aplicacao for app in tabela.scan()), [1, 2, 3, 4])
+            finally:
+                tabela.close()
+
+if __name__ == "__main__":
+    unittest.main()